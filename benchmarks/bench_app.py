@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Startup, page-turn and notes-saving benchmarks driving the real BookNoteTakingApp
+
+The app runs with a withdrawn root window, so a display is still needed; on a
+headless machine run it under a virtual one (xvfb-run python benchmarks/bench_app.py).
+Books of 10, 1,000 and 10,000 pages are generated once and reused. Everything
+the app writes to data/ goes to a scratch directory, never to the repository.
+
+Measured per book size:
+  cold_start       a fresh process restoring the book, from startup_timing
+  load_book        opening the book (read by a worker) and showing its first page
+  show_page        page-turn latency (p50/p95/p99) at several zoom levels,
+                   reading forwards and jumping around
+Measured once:
+  save_notes       time to write the notes file against the number of noted pages
+  typing           cost per keystroke and per auto-save of the current page
+
+Usage:
+  python benchmarks/bench_app.py [--pages 10,1000,10000] [--output results.json]
+  python benchmarks/bench_app.py --baseline baseline.json [--tolerance 0.15]
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+sys.path.insert(0, SRC_DIR)
+
+PDF_CACHE = os.path.join(tempfile.gettempdir(), "mynotes-bench-pdfs")
+ZOOM_LEVELS = (1.0, 1.5, 2.5)
+PAGE_TURNS = 60
+TIMEOUT = 60
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, max(0, int(round(fraction * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def summarize(samples_ms):
+    return {
+        'count': len(samples_ms),
+        'p50_ms': round(percentile(samples_ms, 0.50), 2),
+        'p95_ms': round(percentile(samples_ms, 0.95), 2),
+        'p99_ms': round(percentile(samples_ms, 0.99), 2),
+        'max_ms': round(max(samples_ms), 2),
+    }
+
+
+def make_book(pages):
+    """A text-heavy PDF with the given number of pages, generated once per machine"""
+    import fitz  # PyMuPDF
+
+    os.makedirs(PDF_CACHE, exist_ok=True)
+    path = os.path.join(PDF_CACHE, f"book-{pages}.pdf")
+    if os.path.exists(path):
+        return path
+
+    doc = fitz.open()
+    line = "The quick brown fox jumps over the lazy dog while the reader takes notes. "
+    for page_num in range(pages):
+        page = doc.new_page()
+        page.insert_text((50, 60), f"Chapter {page_num // 20 + 1}, page {page_num + 1}", fontsize=16)
+        page.insert_textbox(fitz.Rect(50, 90, 545, 790), line * 40, fontsize=10)
+        page.draw_rect(fitz.Rect(50, 700, 250, 780), color=(0.2, 0.4, 0.8), fill=(0.85, 0.9, 1.0))
+    doc.save(path + ".tmp", garbage=3, deflate=True)
+    doc.close()
+    os.replace(path + ".tmp", path)
+    return path
+
+
+class AppHarness:
+    """A BookNoteTakingApp on a withdrawn root, with its data/ in a scratch directory"""
+
+    def __init__(self, workdir):
+        import tkinter as tk
+        from app import BookNoteTakingApp
+
+        self.previous_cwd = os.getcwd()
+        os.chdir(workdir)
+        self.root = tk.Tk()
+        self.root.withdraw()
+        self.app = BookNoteTakingApp(self.root)
+        # Page turns are measured in single-page mode with the settings a new user gets
+        self.app.continuous_mode = False
+        self.app.tiled_rendering = True
+
+    def pump_until(self, condition, timeout=TIMEOUT):
+        deadline = time.perf_counter() + timeout
+        while not condition():
+            if time.perf_counter() > deadline:
+                raise TimeoutError("the app did not finish in time")
+            self.root.update()
+            time.sleep(0.0005)
+
+    def open_book(self, book):
+        """Open a book the way the app does, a worker reads it and the Tk thread switches to it"""
+        self.app.open_book(book)
+        self.pump_until(lambda: self.app.open_ticket is None and getattr(self.app, 'doc', None) is not None
+                        and self.app.doc.file_path == book)
+
+    def page_displayed(self, page_num):
+        app = self.app
+        if app.tiled_page:
+            return app.tiled_page[:2] == (page_num, app.zoom_level) and bool(app.tile_items)
+        result = app.displayed_result
+        return bool(result) and result.page_num == page_num and result.zoom == app.zoom_level
+
+    def close(self):
+        self.app.cleanup_and_exit()
+        self.root.destroy()
+        os.chdir(self.previous_cwd)
+
+
+def bench_cold_start(book, workdir):
+    """Start a fresh interpreter that restores the book, as the app does on launch"""
+    data_dir = os.path.join(workdir, "data")
+    os.makedirs(data_dir, exist_ok=True)
+    with open(os.path.join(data_dir, "app_state.json"), 'w') as f:
+        json.dump({'last_book_path': book, 'last_page': 0}, f)
+    report_path = os.path.join(data_dir, "startup_timing.json")
+    if os.path.exists(report_path):
+        os.remove(report_path)
+
+    subprocess.run([sys.executable, os.path.abspath(__file__), "--cold-start-child"], cwd=workdir,
+                   check=True, timeout=TIMEOUT * 2, stdout=subprocess.DEVNULL)
+    with open(report_path, 'r') as f:
+        return json.load(f)['timings_ms']
+
+
+def cold_start_child():
+    """Runs in the child process: mirrors main.py, then quits once the first page is on screen"""
+    import startup_timing
+    startup_timing.mark("start")
+
+    import tkinter as tk
+    from app import BookNoteTakingApp
+    startup_timing.mark("imports")
+
+    root = tk.Tk()
+    app = BookNoteTakingApp(root)
+    startup_timing.mark("window_built")
+    root.after_idle(startup_timing.window_shown)
+
+    def quit_when_reported():
+        if os.path.exists(startup_timing.REPORT_PATH):
+            app.cleanup_and_exit()
+        else:
+            root.after(10, quit_when_reported)
+
+    root.after(10, quit_when_reported)
+    root.mainloop()
+    root.destroy()
+
+
+def bench_book(harness, book, pages):
+    app = harness.app
+    results = {}
+
+    start = time.perf_counter()
+    harness.open_book(book)
+    loaded = time.perf_counter()
+    harness.pump_until(lambda: harness.page_displayed(0))
+    shown = time.perf_counter()
+    results['load_book'] = {'open_ms': round((loaded - start) * 1000, 2),
+                            'first_page_ms': round((shown - start) * 1000, 2)}
+
+    random.seed(pages)
+    results['show_page'] = {}
+    for zoom in ZOOM_LEVELS:
+        app.zoom_level = zoom
+        for pattern in ('forward', 'jump'):
+            app.page_cache.clear()
+            app.prefetcher.clear()
+            if pattern == 'forward':
+                sequence = [n % pages for n in range(1, PAGE_TURNS + 1)]
+            else:
+                sequence = [random.randrange(pages) for _ in range(PAGE_TURNS)]
+
+            samples = []
+            for page_num in sequence:
+                start = time.perf_counter()
+                app.show_page(page_num)
+                harness.pump_until(lambda: harness.page_displayed(page_num))
+                samples.append((time.perf_counter() - start) * 1000)
+                # Leave the prefetcher the idle time a reader would
+                harness.root.update()
+            results['show_page'][f"zoom_{zoom}_{pattern}"] = summarize(samples)
+    return results
+
+
+def bench_save_notes(harness, book, workdir):
+    from notes_journal import NotesJournal
+    from notes_store import memory_notes
+
+    app = harness.app
+    harness.open_book(book)
+    pages = app.total_pages
+    notes_path = os.path.join(workdir, "bench_notes.json")
+    app.notes_file_path = notes_path
+    app.notes_journal = NotesJournal(notes_path)
+
+    results = {}
+    text = "A paragraph of notes about this page, with a quote and a thought or two. " * 6
+    for noted_pages in (10, 100, 1000, 10000):
+        if noted_pages > pages:
+            break
+        # The mapping a JSON notes file is kept in while open, so the real save path is timed
+        app.current_notes = memory_notes(book, {str(page_num): text for page_num in range(noted_pages)})
+        samples = []
+        for _ in range(5):
+            start = time.perf_counter()
+            app.save_notes(silent=True)
+            samples.append((time.perf_counter() - start) * 1000)
+        results[f"pages_{noted_pages}"] = {'file_bytes': os.path.getsize(notes_path),
+                                           'best_ms': round(min(samples), 2)}
+    return results
+
+
+def bench_typing(harness, book, workdir):
+    """Per-keystroke handler cost and the cost of auto-saving (journaling) the page being typed on"""
+    from notes_journal import NotesJournal
+
+    app = harness.app
+    harness.open_book(book)
+    harness.pump_until(lambda: harness.page_displayed(0))
+    app.notes_file_path = os.path.join(workdir, "bench_typing.json")
+    app.notes_journal = NotesJournal(app.notes_file_path)
+
+    keystrokes = []
+    saves = []
+    for round_num in range(20):
+        for char in "typing a note ":
+            app.notes_text.insert("end", char)
+            start = time.perf_counter()
+            app.on_notes_change()
+            keystrokes.append((time.perf_counter() - start) * 1000)
+        start = time.perf_counter()
+        app.save_current_notes(silent=True)
+        saves.append((time.perf_counter() - start) * 1000)
+    if app.auto_save_id:
+        harness.root.after_cancel(app.auto_save_id)
+    return {'keystroke': summarize(keystrokes), 'auto_save': summarize(saves)}
+
+
+def run(page_counts):
+    import fitz
+
+    results = {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'pymupdf': fitz.VersionBind,
+            'recorded': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        'books': {},
+    }
+
+    books = {pages: make_book(pages) for pages in page_counts}
+    workdir = tempfile.mkdtemp(prefix="mynotes-bench-")
+    try:
+        for pages, book in books.items():
+            results['books'][str(pages)] = {'cold_start_ms': bench_cold_start(book, os.path.join(workdir, "cold"))}
+
+        harness = AppHarness(workdir)
+        try:
+            for pages, book in books.items():
+                results['books'][str(pages)].update(bench_book(harness, book, pages))
+            largest = books[max(books)]
+            results['save_notes'] = bench_save_notes(harness, largest, workdir)
+            results['typing'] = bench_typing(harness, largest, workdir)
+        finally:
+            harness.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def flatten(results, prefix=""):
+    """Numeric leaves as dotted paths, for comparing runs"""
+    flat = {}
+    for key, value in results.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, path))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool) and path.endswith("_ms"):
+            flat[path] = value
+    return flat
+
+
+def compare(results, baseline, tolerance):
+    """Print every timing against the baseline, returns the ones that got slower than the tolerance"""
+    current = flatten({k: v for k, v in results.items() if k != 'meta'})
+    previous = flatten({k: v for k, v in baseline.items() if k != 'meta'})
+    regressions = []
+    for path in sorted(current):
+        if path not in previous:
+            continue
+        before, after = previous[path], current[path]
+        change = (after - before) / before if before else 0.0
+        flag = ""
+        # Sub-millisecond timings are too noisy to fail a run on
+        if change > tolerance and after - before > 1.0:
+            flag = "  REGRESSION"
+            regressions.append(path)
+        print(f"{path:<55} {before:10.2f} -> {after:10.2f} ms  {change:+7.1%}{flag}")
+    return regressions
+
+
+def main():
+    if "--cold-start-child" in sys.argv:
+        cold_start_child()
+        return
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", default="10,1000,10000", help="comma separated book sizes")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="compare against results saved earlier with --output")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed slowdown before flagging")
+    args = parser.parse_args()
+
+    try:
+        import tkinter as tk
+        tk.Tk().destroy()
+    except Exception as e:
+        print(f"A display is needed ({e}); on a headless machine run under xvfb-run")
+        sys.exit(2)
+
+    results = run([int(pages) for pages in args.pages.split(",")])
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} timings regressed by more than {args.tolerance:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Memory allocated per page turn on the way from a rendered fitz.Pixmap to the Tk photo
+
+Compares the PIL path the viewer used before (samples -> Image.frombytes ->
+ImageTk.PhotoImage) with the PPM path it uses now (pix.tobytes("ppm") ->
+PhotoImage -data), including the pickling between the render worker and the
+UI process. Every stage is measured, not computed: tracemalloc's peak shows
+what Python allocated, and growth of the resident set catches what PIL, Tcl
+and Tk allocate outside Python's allocator. Each stage's result is kept
+alive until the end so its memory is not reused by the next one. When a
+display is available the Tk stages are measured and timed as well.
+
+Usage: python benchmarks/bench_display_copies.py [--width 3000 --height 4000] [--json]
+"""
+
+import argparse
+import gc
+import json
+import os
+import pickle
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+
+def make_page(width, height):
+    doc = fitz.open()
+    page = doc.new_page(width=width, height=height)
+    for i in range(0, height, 40):
+        page.insert_text((20, i + 30), "The quick brown fox jumps over the lazy dog " * 8, fontsize=14)
+    return doc, page
+
+
+def timed(function, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return value, best * 1000
+
+
+def resident_bytes():
+    """Current resident set size, or None where /proc is not available"""
+    try:
+        with open("/proc/self/statm", 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def allocated(function):
+    """(result, {'python_peak': bytes, 'rss_growth': bytes or None}) of running function once"""
+    gc.collect()
+    rss_before = resident_bytes()
+    tracemalloc.start()
+    try:
+        value = function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    rss_after = resident_bytes()
+    growth = rss_after - rss_before if rss_before is not None and rss_after is not None else None
+    return value, {'python_peak': peak, 'rss_growth': growth}
+
+
+def stage_bytes(measured):
+    """The larger of the two measurements, each one misses what the other sees"""
+    return max(measured['python_peak'], measured['rss_growth'] or 0)
+
+
+def measure(width, height, repeat):
+    doc, page = make_page(width, height)
+    pix = page.get_pixmap(alpha=False)
+    tk_root = open_tk()
+    kept = []
+
+    # Before: raw samples, pickled across, rebuilt as a PIL image and blitted by ImageTk
+    before = {}
+    samples, before['pixmap_to_bytes'] = allocated(lambda: pix.samples)
+    pickled, before['worker_pickle'] = allocated(lambda: pickle.dumps(samples))
+    unpickled, before['ui_unpickle'] = allocated(lambda: pickle.loads(pickled))
+    image, before['Image.frombytes'] = allocated(lambda: Image.frombytes("RGB", (pix.width, pix.height), unpickled))
+    kept += [samples, pickled, unpickled, image]
+    if tk_root:
+        from PIL import ImageTk
+        photo, before['ImageTk.PhotoImage'] = allocated(lambda: ImageTk.PhotoImage(image))
+        kept.append(photo)
+
+    # After: MuPDF writes the PPM once and Tk decodes it straight into the photo
+    after = {}
+    ppm, after['pixmap_to_ppm'] = allocated(lambda: pix.tobytes("ppm"))
+    pickled_ppm, after['worker_pickle'] = allocated(lambda: pickle.dumps(ppm))
+    unpickled_ppm, after['ui_unpickle'] = allocated(lambda: pickle.loads(pickled_ppm))
+    kept += [ppm, pickled_ppm, unpickled_ppm]
+    if tk_root:
+        import tkinter as tk
+
+        def ppm_photo():
+            photo = tk.PhotoImage()
+            photo.configure(width=pix.width, height=pix.height, data=unpickled_ppm, format="ppm")
+            return photo
+        photo, after['PhotoImage_ppm'] = allocated(ppm_photo)
+        kept.append(photo)
+
+    # Stages that run in the UI process, the rest happen in the render worker
+    ui_before = ('ui_unpickle', 'Image.frombytes', 'ImageTk.PhotoImage')
+    ui_after = ('ui_unpickle', 'PhotoImage_ppm')
+
+    timings = {
+        'before_ms': {
+            'pixmap_to_bytes': timed(lambda: pix.samples, repeat)[1],
+            'pickle': timed(lambda: pickle.loads(pickle.dumps(samples)), repeat)[1],
+            'Image.frombytes': timed(lambda: Image.frombytes("RGB", (pix.width, pix.height), samples), repeat)[1],
+        },
+        'after_ms': {
+            'pixmap_to_ppm': timed(lambda: pix.tobytes("ppm"), repeat)[1],
+            'pickle': timed(lambda: pickle.loads(pickle.dumps(ppm)), repeat)[1],
+        },
+    }
+    if tk_root:
+        timings.update(measure_tk(pix, image, ppm, repeat))
+        tk_root.destroy()
+    else:
+        timings['tk'] = "skipped, no display"
+    del kept
+    doc.close()
+
+    return {
+        'page': [pix.width, pix.height],
+        'before': before,
+        'after': after,
+        'before_total': sum(stage_bytes(m) for m in before.values()),
+        'after_total': sum(stage_bytes(m) for m in after.values()),
+        'ui_process_before': sum(stage_bytes(m) for stage, m in before.items() if stage in ui_before),
+        'ui_process_after': sum(stage_bytes(m) for stage, m in after.items() if stage in ui_after),
+        'timings': timings,
+    }
+
+
+def open_tk():
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+        root.withdraw()
+        return root
+    except Exception:
+        return None
+
+
+def measure_tk(pix, image, ppm, repeat):
+    import tkinter as tk
+    from PIL import ImageTk
+
+    photo = tk.PhotoImage()
+    _, imagetk_ms = timed(lambda: ImageTk.PhotoImage(image), repeat)
+    _, ppm_photo_ms = timed(lambda: photo.configure(width=pix.width, height=pix.height, data=ppm, format="ppm"),
+                            repeat)
+    return {'tk_ms': {'ImageTk.PhotoImage': imagetk_ms, 'PhotoImage_ppm_reused': ppm_photo_ms}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--width", type=int, default=3000, help="page width in pixels")
+    parser.add_argument("--height", type=int, default=4000, help="page height in pixels")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    results = measure(args.width, args.height, args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    mb = 1024 * 1024
+    print(f"Page: {results['page'][0]} x {results['page'][1]}")
+    for label in ('before', 'after'):
+        print(f"\n{label.capitalize()}:{'':<17}python peak   RSS growth")
+        for stage, measured in results[label].items():
+            growth = measured['rss_growth']
+            growth = f"{growth / mb:8.1f} MB" if growth is not None else "     n/a"
+            print(f"  {stage:<22} {measured['python_peak'] / mb:8.1f} MB  {growth}")
+        print(f"  {'total':<22} {results[f'{label}_total'] / mb:8.1f} MB"
+              f"  (UI process: {results[f'ui_process_{label}'] / mb:.1f} MB)")
+    print("\nTimings (best of %d):" % args.repeat)
+    print(json.dumps(results['timings'], indent=2))
+
+
+if __name__ == "__main__":
+    main()
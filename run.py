@@ -4,6 +4,7 @@ Runner script for My Notes Application
 """
 
 import sys
+import multiprocessing
 import os
 
 # Add src directory to Python path
@@ -12,4 +13,6 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 from main import main
 
 if __name__ == "__main__":
+    # Needed by the render worker processes in the frozen build
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
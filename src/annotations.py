@@ -0,0 +1,133 @@
+"""
+Highlights and sticky notes anchored to PDF page coordinates
+
+Annotations are kept in page space (unzoomed points, like the search index), so
+they are drawn at any zoom level by scaling. Each page has a uniform grid of
+the annotations overlapping each cell, so hit-testing the pointer only looks
+at the handful in one cell however many the page has. A book's annotations
+are saved in data/annotations/, one JSON file per book.
+"""
+
+import os
+
+from book_data import BookDataStore
+
+ANNOTATIONS_DIR = os.path.join("data", "annotations")
+# Grid cell size in points, about a line of text tall and a word or two wide
+GRID_CELL = 48
+# Sticky notes are a square of this many points, so they scale with the page
+NOTE_SIZE = 16
+
+
+class Annotation:
+    """A highlight (a rectangle over the page) or a sticky note (a small square with text)"""
+
+    def __init__(self, annotation_id, page, kind, rect, color, text=""):
+        self.id = annotation_id
+        self.page = page
+        self.kind = kind
+        self.rect = tuple(rect)
+        self.color = color
+        self.text = text
+
+    def contains(self, x, y):
+        x0, y0, x1, y1 = self.rect
+        return x0 <= x <= x1 and y0 <= y <= y1
+
+    def to_json(self):
+        return {'id': self.id, 'page': self.page, 'kind': self.kind, 'rect': [round(v, 2) for v in self.rect],
+                'color': self.color, 'text': self.text}
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(data['id'], data['page'], data['kind'], data['rect'], data['color'], data.get('text', ""))
+
+
+class GridIndex:
+    """Uniform grid over one page, cell -> ids of the annotations overlapping it"""
+
+    def __init__(self, cell=GRID_CELL):
+        self.cell = cell
+        self.cells = {}
+
+    def cells_of(self, rect):
+        x0, y0, x1, y1 = rect
+        for cx in range(int(x0 // self.cell), int(x1 // self.cell) + 1):
+            for cy in range(int(y0 // self.cell), int(y1 // self.cell) + 1):
+                yield cx, cy
+
+    def insert(self, annotation_id, rect):
+        for key in self.cells_of(rect):
+            self.cells.setdefault(key, set()).add(annotation_id)
+
+    def remove(self, annotation_id, rect):
+        for key in self.cells_of(rect):
+            ids = self.cells.get(key)
+            if ids:
+                ids.discard(annotation_id)
+                if not ids:
+                    del self.cells[key]
+
+    def query_point(self, x, y):
+        return self.cells.get((int(x // self.cell), int(y // self.cell)), ())
+
+
+class AnnotationStore(BookDataStore):
+    """Every annotation of one book, indexed per page and written back shortly after each change"""
+
+    items_key = 'annotations'
+
+    def __init__(self, root, book_path, directory=ANNOTATIONS_DIR, write_interval=2000):
+        super().__init__(root, book_path, directory, write_interval)
+        self.annotations = {}  # id -> Annotation
+        self.pages = {}  # page -> (annotations in drawing order by id, GridIndex)
+        self.load()
+
+    def insert_json(self, entry):
+        annotation = Annotation.from_json(entry)
+        self._insert(annotation)
+        return annotation.id
+
+    def items_json(self):
+        return [annotation.to_json() for annotation in self.annotations.values()]
+
+    def _insert(self, annotation):
+        self.annotations[annotation.id] = annotation
+        on_page, grid = self.pages.setdefault(annotation.page, ({}, GridIndex()))
+        on_page[annotation.id] = annotation
+        grid.insert(annotation.id, annotation.rect)
+
+    def add(self, page, kind, rect, color, text=""):
+        annotation = Annotation(self.new_id(), page, kind, rect, color, text)
+        self._insert(annotation)
+        self.schedule_write()
+        return annotation
+
+    def update_text(self, annotation_id, text):
+        self.annotations[annotation_id].text = text
+        self.schedule_write()
+
+    def remove(self, annotation_id):
+        annotation = self.annotations.pop(annotation_id, None)
+        if annotation is None:
+            return
+        on_page, grid = self.pages[annotation.page]
+        del on_page[annotation.id]
+        grid.remove(annotation.id, annotation.rect)
+        if not on_page:
+            del self.pages[annotation.page]
+        self.schedule_write()
+
+    def on_page(self, page):
+        """Annotations of a page, oldest first so newer ones are drawn on top"""
+        entry = self.pages.get(page)
+        return entry[0].values() if entry else ()
+
+    def hit_test(self, page, x, y):
+        """The topmost annotation at a point of a page, or None"""
+        entry = self.pages.get(page)
+        if not entry:
+            return None
+        on_page, grid = entry
+        hits = [annotation_id for annotation_id in grid.query_point(x, y) if on_page[annotation_id].contains(x, y)]
+        return on_page[max(hits)] if hits else None
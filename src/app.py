@@ -1,13 +1,33 @@
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox, colorchooser
-import fitz  # PyMuPDF
+from tkinter import ttk, filedialog, messagebox
 import json
+import multiprocessing
 import os
+import sqlite3
+import time
 import datetime
 from datetime import datetime, timedelta
-import calendar as cal_module
-from PIL import Image, ImageTk
-import webbrowser
+
+from page_cache import PageCache
+from fileio import atomic_write_json
+from notes_journal import NotesJournal
+from notes_store import PageNotes, SqliteNotesStore, memory_notes
+from usage import UsageTracker
+from app_state import AppState
+from search import SearchIndex, SearchIndexer, index_path_for
+from notes_index import NotesIndex, NotesSearchWindow, book_key
+from rich_text import FORMAT_TAGS, plain_text, read_widget, tag_batches
+from notes_editors import EditorCache
+from export import FORMATS, NotesExport
+from annotations import NOTE_SIZE, AnnotationStore
+from marks import KINDS, MarkStore
+from page_layout import PageLayout
+from prefetch import Prefetcher
+from tiles import needs_tiling, tile_clip, visible_tiles
+from render_engine import RenderEngine
+from thumbnails import ThumbnailStrip
+import perf
+import startup_timing
 
 
 class BookNoteTakingApp:
@@ -30,52 +50,182 @@ class BookNoteTakingApp:
         self.dark_mode = False
         self.current_view = "main"
 
-        # Application state
-        self.app_state = self.load_app_state()
+        # Application state, written out in the background as it changes
+        self.app_state = AppState(self.root)
 
         # Current book and notes data
         self.current_book_path = self.app_state.get('last_book_path')
-        self.current_notes = {}
+        self.current_notes = memory_notes(self.current_book_path)
         self.current_page = self.app_state.get('last_page', 0)
         self.total_pages = 0
         self.book_title = "No Book Loaded"
-        self.zoom_level = self.app_state.get('zoom_level', 1.5)
+        self.zoom_level = round(self.app_state.get('zoom_level', 1.5), 2)
 
         # Text formatting
-        self.current_font_family = "Segoe UI"
-        self.current_font_size = 11
+        self.current_font_family = self.app_state.get('font_family', "Segoe UI")
+        self.current_font_size = self.app_state.get('font_size', 11)
         self.current_font_color = "#2c3e50"
         self.current_bg_color = "#ffffff"
+        self.current_highlight_color = "#ffff00"
+
+        # Notes navigation, bookmarks and highlights of the whole book with the ids shown in each list's rows
+        self.mark_store = None
+        self.mark_rows = {kind: [] for kind in KINDS}
 
-        # Notes navigation
-        self.bookmarks = {}
-        self.highlights = {}
+        # Formatting of the page being shown, applied a batch of tags at a time
+        self.tag_load = None
+        self.tag_load_id = None
 
         # Auto-save tracking
         self.notes_modified = False
         self.auto_save_triggered = False
 
-        # Track usage for calendar
-        self.usage_data = self.load_usage_data()
-
-        # Create the main interface
+        # Edits to an open notes file are journaled and periodically compacted into it
+        self.notes_journal = None
+        self.compaction_interval = 600
+        self.last_compaction = time.monotonic()
+
+        # Optional notes library, every book's notes in one SQLite database
+        self.notes_store = SqliteNotesStore() if self.app_state.get('notes_library') else None
+
+        # Notes of every book, searchable from one window
+        self.notes_index = NotesIndex()
+        self.notes_search_window = None
+
+        # Export of the open book's notes to Markdown, HTML or PDF, written a page at a time
+        self.notes_export = None
+
+        # Track usage for calendar, written out in batches rather than per keystroke
+        self.usage_tracker = UsageTracker(self.root)
+        self.usage_data = self.usage_tracker.counts
+
+        # Pages are rasterized off the Tk thread and kept for revisits
+        self.render_engine = RenderEngine(self.root)
+        self.page_cache_mb = self.app_state.get('page_cache_mb', 256)
+        self.page_cache = PageCache(self.page_cache_mb * 1024 * 1024)
+        self.prefetcher = Prefetcher(self.root, self.render_engine, self.page_cache, self.on_page_rendered)
+        self.page_render_ticket = None
+        self.prepared_photos = {}
+        # Tk photos are reused between pages rather than allocated per page turn
+        self.spare_photos = []
+        self.displayed_result = None
+
+        # Zoom clicks show a rescaled preview, the real render waits until clicking stops
+        self.zoom_settle_delay = 300
+        self.zoom_render_id = None
+
+        # Large pages are drawn as tiles covering only the visible region
+        self.tiled_rendering = self.app_state.get('tiled_rendering', True)
+        self.tiled_page = None
+        self.tiled_size = (0, 0)
+        self.tile_items = {}
+        self.tile_tickets = {}
+        self.view_update_id = None
+
+        # Continuous mode stacks every page, but only pages near the viewport get canvas items
+        self.continuous_mode = self.app_state.get('continuous_scroll', False)
+        self.page_sizes = []
+        self.continuous_layout = None
+        self.continuous_slots = {}  # page -> (frame item, image item, photo)
+        self.free_slots = []
+        self.continuous_tickets = {}
+        self.programmatic_scroll_top = None
+
+        self.show_thumbnails = self.app_state.get('show_thumbnails', True)
+        self.show_navigation = self.app_state.get('show_navigation', True)
+        # Seconds of typing inactivity before the current page's notes are saved
+        self.auto_save_delay = self.app_state.get('auto_save_delay', 2)
+
+        # Full-text search, the index is built in the background when a book is opened
+        self.search_index = None
+        self.search_indexer = None
+        self.search_load_ticket = None
+        self.search_hits = []
+        self.search_hit_index = 0
+
+        # Highlights and sticky notes drawn over the page, stored per book in page coordinates
+        self.annotation_store = None
+        self.annotated_pages = set()
+        self.annotation_drag = None
+        self.hovered_annotation = None
+
+        # Hot-path timings are only recorded while the performance overlay is switched on
+        perf.recorder.enabled = self.app_state.get('perf_overlay', False)
+        self.page_turn_start = None
+        self.perf_overlay_id = None
+
+        # Create the main interface, the calendar, settings and about pages are built when first opened
         self.create_navbar()
         self.create_main_content()
-        self.create_calendar_page()
-        self.create_settings_page()
-        self.create_about_page()  # New About page
+        self.show_main_view()
+        if perf.recorder.enabled:
+            self.show_perf_overlay()
 
-        # Load last book if available
+        # Load last book if available, it is opened in the background while the window comes up
+        self.open_ticket = None
         if self.current_book_path and os.path.exists(self.current_book_path):
-            self.load_book(self.current_book_path, restore_state=True)
+            startup_timing.expect_page = True
+            self.restore_last_book()
         else:
             self.show_welcome_screen()
-            self.show_main_view()
 
         # Auto-save setup
         self.auto_save_id = None
         self.setup_auto_save()
 
+    def restore_last_book(self):
+        """Reopen the last book where reading stopped, the window is usable while a worker reads it"""
+        title = os.path.splitext(os.path.basename(self.current_book_path))[0]
+        self.title_label.config(text=f"Opening {title}...")
+        self.pdf_canvas.create_text(20, 20, anchor=tk.NW, text=f"Opening {title}...",
+                                    fill="#7f8c8d", font=("Segoe UI", 11))
+        # Nothing typed before the book is open would have a page to belong to
+        self.notes_text.config(state="disabled")
+        self.open_book(self.current_book_path, self.current_page, restore_state=True,
+                       on_failed=self.on_last_book_failed)
+
+    def open_book(self, file_path, page_num=0, restore_state=False, on_open=None, on_failed=None):
+        """Parse a book and render page_num in a worker, then switch to it on the Tk thread and run on_open"""
+        self.cancel_book_open()
+        self.open_ticket = self.render_engine.request_document(
+            file_path, page_num, self.zoom_level,
+            lambda document: self.on_book_read(document, page_num, restore_state, on_open),
+            tiled=self.tiled_rendering and not self.continuous_mode,
+            error_callback=on_failed or self.on_book_open_failed)
+        if hasattr(self, 'doc'):
+            self.status_label.config(text=f"Opening {os.path.basename(file_path)}...", foreground="#3498db")
+
+    def on_book_read(self, document, page_num, restore_state, on_open):
+        info, first_rendering = document
+        self.open_ticket = None
+        self.notes_text.config(state="normal")
+        self.load_book(info, page_num, restore_state=restore_state, first_rendering=first_rendering)
+        if getattr(self, 'doc', None) is not info:
+            # load_book has already reported why
+            startup_timing.report()
+        elif on_open:
+            on_open()
+
+    def on_book_open_failed(self, error):
+        self.open_ticket = None
+        self.status_label.config(text="Ready", foreground="#7f8c8d")
+        messagebox.showerror("Error", f"Failed to load PDF: {str(error)}")
+
+    def on_last_book_failed(self, error):
+        self.open_ticket = None
+        self.notes_text.config(state="normal")
+        self.pdf_canvas.delete("all")
+        self.show_welcome_screen()
+        self.update_status(f"Failed to open the last book: {error}", "red")
+        startup_timing.report()
+
+    def cancel_book_open(self):
+        """Opening another book wins over one still being read"""
+        if self.open_ticket is not None:
+            self.render_engine.cancel(self.open_ticket)
+            self.open_ticket = None
+            self.notes_text.config(state="normal")
+
     def center_window(self):
         """Center the window on the screen"""
         self.root.update_idletasks()
@@ -141,14 +291,18 @@ class BookNoteTakingApp:
 
     def update_text_widget_theme(self, dark_mode):
         if dark_mode:
-            self.notes_text.config(bg="#34495e", fg="#ecf0f1", insertbackground="white")
+            for editor in self.notes_editors.widgets():
+                editor.config(bg="#34495e", fg="#ecf0f1", insertbackground="white")
             self.pdf_canvas.config(bg="#2c3e50")
+            self.thumbnail_strip.set_dark_mode(True)
             if hasattr(self, 'bookmarks_list'):
                 self.bookmarks_list.config(bg="#2c3e50", fg="#ecf0f1")
                 self.highlights_list.config(bg="#2c3e50", fg="#ecf0f1")
         else:
-            self.notes_text.config(bg="white", fg="#2c3e50", insertbackground="black")
+            for editor in self.notes_editors.widgets():
+                editor.config(bg="white", fg="#2c3e50", insertbackground="black")
             self.pdf_canvas.config(bg="white")
+            self.thumbnail_strip.set_dark_mode(False)
             if hasattr(self, 'bookmarks_list'):
                 self.bookmarks_list.config(bg="white", fg="#2c3e50")
                 self.highlights_list.config(bg="white", fg="#2c3e50")
@@ -170,6 +324,12 @@ class BookNoteTakingApp:
         file_menu.menu.add_command(label="📄 Open PDF Book", command=self.new_book, accelerator="Ctrl+O")
         file_menu.menu.add_command(label="📁 Open Notes", command=self.open_notes)
         file_menu.menu.add_command(label="💾 Save Notes As", command=self.save_notes_as, accelerator="Ctrl+S")
+        file_menu.menu.add_command(label="🔎 Search All Notes", command=self.show_notes_search,
+                                   accelerator="Ctrl+Shift+F")
+        file_menu.menu.add_separator()
+        file_menu.menu.add_command(label="📥 Import Notes into Library", command=self.import_notes_to_library)
+        file_menu.menu.add_command(label="📤 Export Notes from Library", command=self.export_notes_from_library)
+        file_menu.menu.add_command(label="📝 Export Notes as Markdown/HTML/PDF", command=self.export_notes)
         file_menu.menu.add_separator()
         file_menu.menu.add_command(label="ℹ️ About", command=self.show_about_view)
         file_menu.menu.add_separator()
@@ -237,26 +397,80 @@ class BookNoteTakingApp:
         ttk.Button(zoom_btn_frame, text="➕", width=3, command=self.zoom_in).pack(side=tk.LEFT, padx=2)
         ttk.Button(zoom_btn_frame, text="Reset", command=self.reset_zoom).pack(side=tk.LEFT, padx=10)
 
+        self.continuous_var = tk.BooleanVar(value=self.continuous_mode)
+        ttk.Checkbutton(control_frame, text="Continuous scroll", variable=self.continuous_var,
+                        command=self.toggle_continuous_mode).pack(side=tk.LEFT, padx=10)
+
+        self.thumbnails_var = tk.BooleanVar(value=self.show_thumbnails)
+        ttk.Checkbutton(control_frame, text="Thumbnails", variable=self.thumbnails_var,
+                        command=self.toggle_thumbnails).pack(side=tk.LEFT, padx=5)
+
         # Page info in control frame
         self.page_label = ttk.Label(control_frame, text="Page: 0 / 0", font=("Segoe UI", 10))
         self.page_label.pack(side=tk.RIGHT)
 
+        # Full-text search
+        search_frame = ttk.Frame(pdf_container)
+        search_frame.pack(side=tk.TOP, fill=tk.X, pady=(0, 10))
+
+        ttk.Label(search_frame, text="Search:", font=("Segoe UI", 10)).pack(side=tk.LEFT)
+        self.search_var = tk.StringVar()
+        self.search_entry = ttk.Entry(search_frame, textvariable=self.search_var, width=30)
+        self.search_entry.pack(side=tk.LEFT, padx=5)
+        self.search_entry.bind("<Return>", lambda e: self.run_search())
+        self.search_entry.bind("<Escape>", lambda e: self.clear_search())
+        ttk.Button(search_frame, text="◀", width=3, command=lambda: self.step_search_hit(-1)).pack(side=tk.LEFT,
+                                                                                                  padx=2)
+        ttk.Button(search_frame, text="▶", width=3, command=lambda: self.step_search_hit(1)).pack(side=tk.LEFT,
+                                                                                                 padx=2)
+        self.search_status_label = ttk.Label(search_frame, text="", font=("Segoe UI", 9), foreground="#7f8c8d")
+        self.search_status_label.pack(side=tk.LEFT, padx=10)
+
+        # Annotation tools, drag to highlight or click to place a sticky note
+        self.annotation_tool_var = tk.StringVar(value="off")
+        for text, value in (("Sticky note", "note"), ("Highlight", "highlight"), ("Off", "off")):
+            ttk.Radiobutton(search_frame, text=text, variable=self.annotation_tool_var,
+                            value=value).pack(side=tk.RIGHT, padx=2)
+        ttk.Label(search_frame, text="Annotate:", font=("Segoe UI", 10)).pack(side=tk.RIGHT, padx=(10, 2))
+
         # PDF canvas with professional styling
         canvas_frame = ttk.Frame(pdf_container)
         canvas_frame.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
 
-        v_scrollbar = ttk.Scrollbar(canvas_frame, orient=tk.VERTICAL)
-        h_scrollbar = ttk.Scrollbar(canvas_frame, orient=tk.HORIZONTAL)
+        # Thumbnail strip for visual navigation
+        self.thumbnail_strip = ThumbnailStrip(canvas_frame, self.root, self.render_engine, self.on_thumbnail_select)
+        if self.show_thumbnails:
+            self.thumbnail_strip.frame.pack(side=tk.LEFT, fill=tk.Y, padx=(0, 5))
+
+        self.pdf_v_scrollbar = ttk.Scrollbar(canvas_frame, orient=tk.VERTICAL)
+        self.pdf_h_scrollbar = ttk.Scrollbar(canvas_frame, orient=tk.HORIZONTAL)
 
         self.pdf_canvas = tk.Canvas(canvas_frame, bg="white", relief="sunken", borderwidth=1,
-                                    yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
+                                    yscrollcommand=self.on_pdf_canvas_yscroll,
+                                    xscrollcommand=self.on_pdf_canvas_xscroll)
 
-        v_scrollbar.config(command=self.pdf_canvas.yview)
-        h_scrollbar.config(command=self.pdf_canvas.xview)
+        self.pdf_v_scrollbar.config(command=self.pdf_canvas.yview)
+        self.pdf_h_scrollbar.config(command=self.pdf_canvas.xview)
 
         self.pdf_canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        v_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        h_scrollbar.pack(side=tk.BOTTOM, fill=tk.X)
+        self.pdf_v_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.pdf_h_scrollbar.pack(side=tk.BOTTOM, fill=tk.X)
+
+        # Tiled and continuous views load more of the document as the visible region changes
+        self.pdf_canvas.bind("<Configure>", lambda e: self.schedule_view_update())
+        self.pdf_canvas.bind("<MouseWheel>", self.on_pdf_canvas_wheel)
+        self.pdf_canvas.bind("<Button-4>", lambda e: self.pdf_canvas.yview_scroll(-3, "units"))
+        self.pdf_canvas.bind("<Button-5>", lambda e: self.pdf_canvas.yview_scroll(3, "units"))
+        self.pdf_canvas.bind("<ButtonPress-1>", self.on_annotation_press)
+        self.pdf_canvas.bind("<B1-Motion>", self.on_annotation_drag)
+        self.pdf_canvas.bind("<ButtonRelease-1>", self.on_annotation_release)
+        self.pdf_canvas.bind("<Double-Button-1>", self.on_annotation_double_click)
+        self.pdf_canvas.bind("<Button-3>", self.on_annotation_right_click)
+        self.pdf_canvas.bind("<Motion>", self.on_annotation_hover)
+
+        # Recent hot-path latencies, floated over the page while the overlay is on (F12)
+        self.perf_overlay = tk.Label(self.pdf_canvas, font=("Courier New", 9), justify=tk.LEFT,
+                                     bg="#1e1e1e", fg="#7CFC00", padx=6, pady=4)
 
         # Notes container with formatting toolbar
         notes_container = ttk.LabelFrame(self.paned_window, text="Notes & Annotations")
@@ -275,6 +489,7 @@ class BookNoteTakingApp:
         # Notes text area
         text_container = ttk.Frame(notes_content_frame)
         text_container.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True)
+        self.notes_text_container = text_container
 
         # Notes header with save status
         notes_header = ttk.Frame(text_container)
@@ -288,25 +503,55 @@ class BookNoteTakingApp:
         text_frame = ttk.Frame(text_container)
         text_frame.pack(fill=tk.BOTH, expand=True)
 
-        self.notes_text = tk.Text(text_frame, wrap=tk.WORD, font=(self.current_font_family, self.current_font_size),
-                                  undo=True, maxundo=-1, spacing2=3, spacing3=3,
-                                  relief="solid", borderwidth=1, padx=10, pady=10,
-                                  selectbackground="#3498db")
-        notes_scrollbar = ttk.Scrollbar(text_frame, orient=tk.VERTICAL, command=self.notes_text.yview)
-        self.notes_text.configure(yscrollcommand=notes_scrollbar.set)
+        self.notes_text_frame = text_frame
+        self.notes_scrollbar = ttk.Scrollbar(text_frame, orient=tk.VERTICAL)
+        self.notes_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
+        # Recently visited pages keep their own editor, notes_text is the one on screen
+        self.notes_editors = EditorCache(self.create_notes_editor)
+        self.notes_text = self.create_notes_editor()
         self.notes_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        notes_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.notes_scrollbar.config(command=self.notes_text.yview)
+        self.notes_editors.recycle(self.notes_text)
 
         # Enhanced page navigation
         self.create_page_navigation()
 
+    def create_notes_editor(self):
+        """A notes Text widget with the current font, theme and tag styles"""
+        text = tk.Text(self.notes_text_frame, wrap=tk.WORD, font=(self.current_font_family, self.current_font_size),
+                       undo=True, maxundo=500, spacing2=3, spacing3=3,
+                       relief="solid", borderwidth=1, padx=10, pady=10,
+                       selectbackground="#3498db", yscrollcommand=self.notes_scrollbar.set)
+        if self.dark_mode:
+            text.config(bg="#34495e", fg="#ecf0f1", insertbackground="white")
+
         # Bind events
-        self.notes_text.bind("<KeyPress>", self.on_notes_change)
-        self.notes_text.bind("<ButtonRelease-1>", self.on_text_select)
+        text.bind("<KeyPress>", self.on_notes_change)
+        text.bind("<ButtonRelease-1>", self.on_text_select)
 
         # Configure text tags
-        self.apply_formatting()
+        self.configure_note_tags(text)
+        return text
+
+    def show_notes_editor(self, editor):
+        """Put a page's editor in place of the one on screen"""
+        previous = self.notes_text
+        if editor is previous:
+            return
+        had_focus = self.root.focus_get() is previous
+        if previous.winfo_exists():
+            previous.pack_forget()
+        editor.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.notes_scrollbar.config(command=editor.yview)
+        self.notes_text = editor
+        if had_focus:
+            editor.focus_set()
+
+    def reset_notes_editors(self):
+        """Forget every cached editor once current_notes was replaced from elsewhere"""
+        self.cancel_tag_load()
+        self.notes_editors.clear()
 
     def create_formatting_toolbar(self, parent):
         toolbar = ttk.Frame(parent)
@@ -350,8 +595,15 @@ class BookNoteTakingApp:
     def create_notes_navigation(self, parent):
         # Notes navigation sidebar
         nav_frame = ttk.LabelFrame(parent, text="Navigation", width=200)
-        nav_frame.pack(side=tk.LEFT, fill=tk.Y, padx=(0, 10))
+        if self.show_navigation:
+            nav_frame.pack(side=tk.LEFT, fill=tk.Y, padx=(0, 10))
         nav_frame.pack_propagate(False)
+        self.notes_nav_frame = nav_frame
+
+        # Selecting a mark shows it, double-click goes on to edit there, Delete removes it
+        self.marks_page_only_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(nav_frame, text="This page only", variable=self.marks_page_only_var,
+                        command=self.fill_mark_lists).pack(anchor="w", padx=10, pady=(5, 0))
 
         # Bookmarks section
         ttk.Label(nav_frame, text="Bookmarks", font=("Segoe UI", 10, "bold")).pack(anchor="w", pady=(10, 5), padx=10)
@@ -365,6 +617,8 @@ class BookNoteTakingApp:
         self.bookmarks_list.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         bookmarks_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         self.bookmarks_list.bind("<<ListboxSelect>>", self.on_bookmark_select)
+        self.bookmarks_list.bind("<Delete>", lambda e: self.remove_selected_mark("bookmark"))
+        self.bookmarks_list.bind("<Double-Button-1>", lambda e: self.notes_text.focus_set())
 
         # Highlights section
         ttk.Label(nav_frame, text="Highlights", font=("Segoe UI", 10, "bold")).pack(anchor="w", pady=(10, 5), padx=10)
@@ -378,6 +632,8 @@ class BookNoteTakingApp:
         self.highlights_list.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         highlights_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         self.highlights_list.bind("<<ListboxSelect>>", self.on_highlight_select)
+        self.highlights_list.bind("<Delete>", lambda e: self.remove_selected_mark("highlight"))
+        self.highlights_list.bind("<Double-Button-1>", lambda e: self.notes_text.focus_set())
 
     def create_page_navigation(self):
         nav_frame = ttk.Frame(self.main_frame, relief="solid", borderwidth=1)
@@ -401,6 +657,8 @@ class BookNoteTakingApp:
         self.progress_var = tk.DoubleVar()
         self.progress_bar = ttk.Progressbar(info_frame, variable=self.progress_var, maximum=100, length=150)
         self.progress_bar.pack(side=tk.TOP, pady=2)
+        # Only shown while notes are being exported, the bar then shows the export's progress
+        self.export_cancel_btn = ttk.Button(info_frame, text="Cancel Export", command=self.cancel_notes_export)
 
         # Page jump controls
         jump_frame = ttk.Frame(nav_frame)
@@ -420,6 +678,9 @@ class BookNoteTakingApp:
         self.root.bind("<Control-s>", lambda e: self.save_notes())
         self.root.bind("<Control-b>", lambda e: self.toggle_bold())
         self.root.bind("<Control-i>", lambda e: self.toggle_italic())
+        self.root.bind("<Control-f>", lambda e: self.search_entry.focus_set())
+        self.root.bind("<Control-F>", lambda e: self.show_notes_search())
+        self.root.bind("<F12>", lambda e: self.toggle_perf_overlay(not perf.recorder.enabled))
 
     def create_calendar_page(self):
         self.calendar_frame = ttk.Frame(self.root)
@@ -453,20 +714,30 @@ class BookNoteTakingApp:
         nav_frame = ttk.Frame(self.calendar_frame)
         nav_frame.pack(fill=tk.X, padx=20, pady=10)
 
-        ttk.Button(nav_frame, text="◀ Previous Month", command=self.prev_calendar_month).pack(side=tk.LEFT)
+        self.calendar_prev_btn = ttk.Button(nav_frame, text="◀ Previous Month", command=self.prev_calendar_month)
+        self.calendar_prev_btn.pack(side=tk.LEFT)
 
         self.month_year_label = ttk.Label(nav_frame, text="", font=("Segoe UI", 14, "bold"))
         self.month_year_label.pack(side=tk.LEFT, expand=True)
 
-        ttk.Button(nav_frame, text="Next Month ▶", command=self.next_calendar_month).pack(side=tk.RIGHT)
+        self.calendar_next_btn = ttk.Button(nav_frame, text="Next Month ▶", command=self.next_calendar_month)
+        self.calendar_next_btn.pack(side=tk.RIGHT)
         ttk.Button(nav_frame, text="Today", command=self.show_current_month).pack(side=tk.RIGHT, padx=10)
 
-        # Calendar container
+        self.calendar_mode_var = tk.StringVar(value="month")
+        ttk.Radiobutton(nav_frame, text="Year", variable=self.calendar_mode_var, value="year",
+                        command=self.change_calendar_mode).pack(side=tk.RIGHT, padx=5)
+        ttk.Radiobutton(nav_frame, text="Month", variable=self.calendar_mode_var, value="month",
+                        command=self.change_calendar_mode).pack(side=tk.RIGHT, padx=5)
+
+        # Calendar container, both views are single canvases that are only redrawn in place
         cal_container = ttk.Frame(self.calendar_frame)
         cal_container.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
 
-        self.calendar_grid = tk.Frame(cal_container, bg=self.light_bg)
-        self.calendar_grid.pack(fill=tk.BOTH, expand=True)
+        from calendar_view import MonthCalendar, YearHeatmap
+        self.month_calendar = MonthCalendar(cal_container)
+        self.month_calendar.canvas.pack(fill=tk.BOTH, expand=True)
+        self.year_heatmap = YearHeatmap(cal_container)
 
         self.current_calendar_date = datetime.now()
 
@@ -518,17 +789,56 @@ class BookNoteTakingApp:
 
         ttk.Label(auto_save_frame, text="Auto-save delay (seconds):", font=("Segoe UI", 10)).pack(anchor="w",
                                                                                                   pady=(10, 5))
-        self.auto_save_delay_var = tk.StringVar(value="2")
+        self.auto_save_delay_var = tk.StringVar(value=str(self.auto_save_delay))
         ttk.Entry(auto_save_frame, textvariable=self.auto_save_delay_var, width=10).pack(anchor="w")
 
         # Notes settings
         notes_frame = ttk.LabelFrame(settings_content, text="Notes")
         notes_frame.pack(fill=tk.X, pady=10)
 
-        self.show_navigation_var = tk.BooleanVar(value=True)
+        self.show_navigation_var = tk.BooleanVar(value=self.show_navigation)
         ttk.Checkbutton(notes_frame, text="Show navigation sidebar", variable=self.show_navigation_var,
                         command=self.toggle_navigation).pack(anchor="w")
 
+        self.notes_library_var = tk.BooleanVar(value=self.notes_store is not None)
+        ttk.Checkbutton(notes_frame, text="Keep notes in the notes library (data/notes.db)",
+                        variable=self.notes_library_var, command=self.toggle_notes_library).pack(anchor="w")
+
+        # Rendering settings
+        rendering_frame = ttk.LabelFrame(settings_content, text="Rendering")
+        rendering_frame.pack(fill=tk.X, pady=10)
+
+        ttk.Label(rendering_frame, text="Page cache size (MB):", font=("Segoe UI", 10)).pack(anchor="w",
+                                                                                         pady=(10, 5))
+        self.page_cache_var = tk.StringVar(value=str(self.page_cache_mb))
+        ttk.Entry(rendering_frame, textvariable=self.page_cache_var, width=10).pack(anchor="w")
+
+        self.tiled_rendering_var = tk.BooleanVar(value=self.tiled_rendering)
+        ttk.Checkbutton(rendering_frame, text="Render large pages as tiles of the visible area",
+                        variable=self.tiled_rendering_var, command=self.toggle_tiled_rendering).pack(anchor="w",
+                                                                                                   pady=(10, 0))
+
+        self.cache_stats_label = ttk.Label(rendering_frame, text="", font=("Segoe UI", 9), foreground="#7f8c8d")
+        self.cache_stats_label.pack(anchor="w", pady=5)
+
+        # Performance settings
+        perf_frame = ttk.LabelFrame(settings_content, text="Performance")
+        perf_frame.pack(fill=tk.X, pady=10)
+
+        self.perf_overlay_var = tk.BooleanVar(value=perf.recorder.enabled)
+        ttk.Checkbutton(perf_frame, text="Record timings and show the performance overlay (F12)",
+                        variable=self.perf_overlay_var,
+                        command=lambda: self.toggle_perf_overlay(self.perf_overlay_var.get())).pack(anchor="w")
+
+        self.perf_stats_label = ttk.Label(perf_frame, text="", font=("Courier New", 9), foreground="#7f8c8d",
+                                          justify=tk.LEFT)
+        self.perf_stats_label.pack(anchor="w", pady=5)
+
+        perf_buttons = ttk.Frame(perf_frame)
+        perf_buttons.pack(fill=tk.X, pady=(0, 5))
+        ttk.Button(perf_buttons, text="Export Trace...", command=self.export_perf_trace).pack(side=tk.LEFT)
+        ttk.Button(perf_buttons, text="Clear", command=self.clear_perf_timings).pack(side=tk.LEFT, padx=10)
+
         # Reset settings
         reset_frame = ttk.Frame(settings_content)
         reset_frame.pack(fill=tk.X, pady=20)
@@ -617,17 +927,22 @@ your reading statistics. All data is stored locally on your computer."""
     def change_font_family(self, event=None):
         self.current_font_family = self.font_family_var.get()
         self.apply_formatting()
+        self.save_app_state()
 
     def change_font_size(self, event=None):
         try:
             self.current_font_size = int(self.font_size_var.get())
             self.apply_formatting()
+            self.save_app_state()
         except ValueError:
             pass
 
     def change_default_font(self, event=None):
         self.current_font_family = self.settings_font_family.get()
-        self.notes_text.config(font=(self.current_font_family, self.current_font_size))
+        self.font_family_var.set(self.current_font_family)
+        for editor in self.notes_editors.widgets():
+            editor.config(font=(self.current_font_family, self.current_font_size))
+        self.save_app_state()
 
     def toggle_bold(self):
         try:
@@ -636,6 +951,7 @@ your reading statistics. All data is stored locally on your computer."""
                 self.notes_text.tag_remove("bold", "sel.first", "sel.last")
             else:
                 self.notes_text.tag_add("bold", "sel.first", "sel.last")
+            self.on_notes_change()
         except tk.TclError:
             pass
 
@@ -646,6 +962,7 @@ your reading statistics. All data is stored locally on your computer."""
                 self.notes_text.tag_remove("italic", "sel.first", "sel.last")
             else:
                 self.notes_text.tag_add("italic", "sel.first", "sel.last")
+            self.on_notes_change()
         except tk.TclError:
             pass
 
@@ -656,6 +973,7 @@ your reading statistics. All data is stored locally on your computer."""
                 self.notes_text.tag_remove("underline", "sel.first", "sel.last")
             else:
                 self.notes_text.tag_add("underline", "sel.first", "sel.last")
+            self.on_notes_change()
         except tk.TclError:
             pass
 
@@ -667,96 +985,124 @@ your reading statistics. All data is stored locally on your computer."""
 
             # Apply new heading
             self.notes_text.tag_add(f"heading{level}", "sel.first", "sel.last")
+            self.on_notes_change()
         except tk.TclError:
             pass
 
     def choose_text_color(self):
+        from tkinter import colorchooser
         color = colorchooser.askcolor(title="Choose text color", initialcolor=self.current_font_color)
         if color and color[1]:
             self.current_font_color = color[1]
             try:
                 self.notes_text.tag_add("color", "sel.first", "sel.last")
+                self.on_notes_change()
             except tk.TclError:
                 pass
 
     def choose_highlight_color(self):
+        from tkinter import colorchooser
         color = colorchooser.askcolor(title="Choose highlight color", initialcolor="#ffff00")
         if color and color[1]:
             try:
                 self.notes_text.tag_add("highlight", "sel.first", "sel.last")
-                self.notes_text.tag_config("highlight", background=color[1])
+                self.current_highlight_color = color[1]
+                self.apply_formatting()
+                self.on_notes_change()
             except tk.TclError:
                 pass
 
     def clear_formatting(self):
         try:
-            for tag in ["bold", "italic", "underline", "heading1", "heading2", "heading3", "color", "highlight"]:
+            for tag in FORMAT_TAGS:
                 self.notes_text.tag_remove(tag, "sel.first", "sel.last")
+            self.on_notes_change()
         except tk.TclError:
             pass
 
     def apply_formatting(self):
+        for editor in self.notes_editors.widgets():
+            self.configure_note_tags(editor)
+
+    def configure_note_tags(self, text):
         # Configure text tags
-        self.notes_text.tag_config("bold", font=(self.current_font_family, self.current_font_size, "bold"))
-        self.notes_text.tag_config("italic", font=(self.current_font_family, self.current_font_size, "italic"))
-        self.notes_text.tag_config("underline", font=(self.current_font_family, self.current_font_size, "underline"))
-        self.notes_text.tag_config("heading1", font=("Segoe UI", 18, "bold"), foreground="#2c3e50")
-        self.notes_text.tag_config("heading2", font=("Segoe UI", 16, "bold"), foreground="#34495e")
-        self.notes_text.tag_config("heading3", font=("Segoe UI", 14, "bold"), foreground="#7f8c8d")
-        self.notes_text.tag_config("color", foreground=self.current_font_color)
-        self.notes_text.tag_config("highlight", background="#ffff00")
+        text.tag_config("bold", font=(self.current_font_family, self.current_font_size, "bold"))
+        text.tag_config("italic", font=(self.current_font_family, self.current_font_size, "italic"))
+        text.tag_config("underline", font=(self.current_font_family, self.current_font_size, "underline"))
+        text.tag_config("heading1", font=("Segoe UI", 18, "bold"), foreground="#2c3e50")
+        text.tag_config("heading2", font=("Segoe UI", 16, "bold"), foreground="#34495e")
+        text.tag_config("heading3", font=("Segoe UI", 14, "bold"), foreground="#7f8c8d")
+        text.tag_config("color", foreground=self.current_font_color)
+        text.tag_config("highlight", background=self.current_highlight_color)
 
     def add_bookmark(self):
-        try:
-            text = self.notes_text.get("sel.first", "sel.last")
-            if text.strip():
-                bookmark_id = f"bookmark_{len(self.bookmarks)}"
-                self.bookmarks[bookmark_id] = {
-                    "text": text[:50] + "..." if len(text) > 50 else text,
-                    "position": self.notes_text.index("sel.first")
-                }
-                self.update_bookmarks_list()
-        except tk.TclError:
-            messagebox.showinfo("Bookmark", "Please select text to bookmark")
+        self.add_mark("bookmark", "Bookmark", "Please select text to bookmark")
 
     def add_highlight(self):
+        self.add_mark("highlight", "Highlight", "Please select text to highlight")
+
+    def add_mark(self, kind, title, hint):
+        if not self.mark_store:
+            return
         try:
             text = self.notes_text.get("sel.first", "sel.last")
             if text.strip():
-                highlight_id = f"highlight_{len(self.highlights)}"
-                self.highlights[highlight_id] = {
-                    "text": text[:50] + "..." if len(text) > 50 else text,
-                    "position": self.notes_text.index("sel.first")
-                }
-                self.update_highlights_list()
+                mark = self.mark_store.add(kind, self.current_page, self.notes_text.index("sel.first"),
+                                           text[:50] + "..." if len(text) > 50 else text)
+                # New marks have the highest id, so they belong at the end of either listing
+                self.mark_list(kind).insert(tk.END, self.mark_label(mark))
+                self.mark_rows[kind].append(mark.id)
         except tk.TclError:
-            messagebox.showinfo("Highlight", "Please select text to highlight")
-
-    def update_bookmarks_list(self):
-        self.bookmarks_list.delete(0, tk.END)
-        for bookmark_id, bookmark in self.bookmarks.items():
-            self.bookmarks_list.insert(tk.END, f"📖 {bookmark['text']}")
-
-    def update_highlights_list(self):
-        self.highlights_list.delete(0, tk.END)
-        for highlight_id, highlight in self.highlights.items():
-            self.highlights_list.insert(tk.END, f"🖍️ {highlight['text']}")
+            messagebox.showinfo(title, hint)
+
+    def mark_list(self, kind):
+        return self.bookmarks_list if kind == "bookmark" else self.highlights_list
+
+    @staticmethod
+    def mark_label(mark):
+        icon = "📖" if mark.kind == "bookmark" else "🖍️"
+        return f"p.{mark.page + 1}  {icon} {mark.text}"
+
+    def fill_mark_lists(self):
+        """Refill both lists for the book or the current page, each in a single Listbox call"""
+        page_only = self.marks_page_only_var.get()
+        for kind in KINDS:
+            if not self.mark_store:
+                marks = []
+            elif page_only:
+                marks = list(self.mark_store.on_page(kind, self.current_page))
+            else:
+                marks = list(self.mark_store.of_kind(kind))
+            listbox = self.mark_list(kind)
+            listbox.delete(0, tk.END)
+            if marks:
+                listbox.insert(tk.END, *[self.mark_label(mark) for mark in marks])
+            self.mark_rows[kind] = [mark.id for mark in marks]
+
+    def remove_selected_mark(self, kind):
+        listbox = self.mark_list(kind)
+        selection = listbox.curselection()
+        if selection and self.mark_store:
+            row = selection[0]
+            self.mark_store.remove(self.mark_rows[kind].pop(row))
+            listbox.delete(row)
+
+    def go_to_mark(self, kind):
+        selection = self.mark_list(kind).curselection()
+        if not selection or not self.mark_store:
+            return
+        mark = self.mark_store.get(self.mark_rows[kind][selection[0]])
+        if mark.page != self.current_page:
+            self.save_current_notes()
+            self.show_page(mark.page)
+        self.notes_text.see(mark.position)
+        self.notes_text.mark_set(tk.INSERT, mark.position)
 
     def on_bookmark_select(self, event):
-        selection = self.bookmarks_list.curselection()
-        if selection:
-            bookmark_id = list(self.bookmarks.keys())[selection[0]]
-            position = self.bookmarks[bookmark_id]["position"]
-            self.notes_text.see(position)
-            self.notes_text.focus_set()
+        self.go_to_mark("bookmark")
 
     def on_highlight_select(self, event):
-        selection = self.highlights_list.curselection()
-        if selection:
-            highlight_id = list(self.highlights.keys())[selection[0]]
-            position = self.highlights[highlight_id]["position"]
-            self.notes_text.see(position)
-            self.notes_text.focus_set()
+        self.go_to_mark("highlight")
 
     def on_text_select(self, event):
         # Update formatting buttons based on current selection
@@ -777,22 +1123,140 @@ your reading statistics. All data is stored locally on your computer."""
             if self.auto_save_id:
                 self.root.after_cancel(self.auto_save_id)
 
+    def toggle_tiled_rendering(self):
+        self.tiled_rendering = self.tiled_rendering_var.get()
+        if hasattr(self, 'doc'):
+            self.show_page(self.current_page)
+
+    def toggle_notes_library(self):
+        self.save_current_notes(silent=True)
+        if self.notes_library_var.get():
+            self.notes_store = SqliteNotesStore()
+            # An open notes file stays the place this book's notes are saved
+            if hasattr(self, 'doc') and not hasattr(self, 'notes_file_path'):
+                page_notes = PageNotes(self.notes_store, self.current_book_path)
+                # Carry over notes typed before the library was switched on
+                for page, notes in self.current_notes.items():
+                    if notes and page not in page_notes:
+                        page_notes[page] = notes
+                self.current_notes = page_notes
+                # Pages the library already had notes for may read differently now
+                self.reset_notes_editors()
+                self.load_page_notes(self.current_page)
+        elif self.notes_store:
+            if self.current_notes.store is self.notes_store:
+                self.current_notes = memory_notes(self.current_book_path, dict(self.current_notes))
+            self.notes_store.close()
+            self.notes_store = None
+        self.save_app_state()
+
+    def toggle_perf_overlay(self, enabled):
+        perf.recorder.enabled = enabled
+        if hasattr(self, 'perf_overlay_var'):
+            self.perf_overlay_var.set(enabled)
+        if enabled:
+            self.show_perf_overlay()
+        else:
+            if self.perf_overlay_id:
+                self.root.after_cancel(self.perf_overlay_id)
+                self.perf_overlay_id = None
+            self.perf_overlay.place_forget()
+            self.page_turn_start = None
+        self.save_app_state()
+
+    def show_perf_overlay(self):
+        self.perf_overlay.place(relx=1.0, x=-8, y=8, anchor="ne")
+        if self.perf_overlay_id is None:
+            self.update_perf_overlay()
+
+    def update_perf_overlay(self):
+        """Refresh the overlay (and the Settings panel) twice a second while recording"""
+        text = self.format_perf_stats()
+        self.perf_overlay.config(text=text)
+        if self.current_view == "settings":
+            self.perf_stats_label.config(text=text)
+        self.perf_overlay_id = self.root.after(500, self.update_perf_overlay)
+
+    def format_perf_stats(self):
+        stats = perf.recorder.stats()
+        if not stats:
+            return "No timings recorded yet" if perf.recorder.enabled else "Recording is off"
+        lines = [f"{'ms':<16}{'last':>8}{'p50':>8}{'p95':>8}{'p99':>8}{'n':>6}"]
+        for name in sorted(stats):
+            entry = stats[name]
+            lines.append(f"{name:<16}{entry['last']:>8.1f}{entry['p50']:>8.1f}{entry['p95']:>8.1f}"
+                         f"{entry['p99']:>8.1f}{entry['count']:>6}")
+        return "\n".join(lines)
+
+    def update_perf_stats(self):
+        self.perf_stats_label.config(text=self.format_perf_stats())
+
+    def export_perf_trace(self):
+        file_path = filedialog.asksaveasfilename(
+            title="Export Performance Trace",
+            defaultextension=".json",
+            initialfile="mynotes-trace.json",
+            filetypes=[("Chrome trace", "*.json"), ("All files", "*.*")]
+        )
+        if not file_path:
+            return
+        try:
+            count = perf.recorder.export_chrome_trace(file_path)
+            self.update_status(f"Exported {count} timings, open them in chrome://tracing or Perfetto", "green")
+        except OSError as e:
+            messagebox.showerror("Error", f"Failed to export trace: {str(e)}")
+
+    def clear_perf_timings(self):
+        perf.recorder.clear()
+        self.update_perf_stats()
+
     def toggle_navigation(self):
-        # This would show/hide the navigation sidebar
-        pass
+        self.show_navigation = self.show_navigation_var.get()
+        if self.show_navigation:
+            self.notes_nav_frame.pack(side=tk.LEFT, fill=tk.Y, padx=(0, 10), before=self.notes_text_container)
+        else:
+            self.notes_nav_frame.pack_forget()
+        self.save_app_state()
 
     def reset_settings(self):
         self.theme_var.set("Light")
         self.auto_save_var.set(True)
         self.show_navigation_var.set(True)
+        self.toggle_navigation()
         self.auto_save_delay_var.set("2")
+        self.page_cache_var.set("256")
+        self.tiled_rendering_var.set(True)
+        self.toggle_tiled_rendering()
         self.settings_font_family.set("Segoe UI")
         self.apply_theme()
         self.change_default_font()
 
     def save_settings(self):
+        try:
+            self.page_cache_mb = max(0, int(self.page_cache_var.get()))
+        except ValueError:
+            messagebox.showerror("Error", "Page cache size must be a whole number of megabytes")
+            return
+        try:
+            auto_save_delay = float(self.auto_save_delay_var.get())
+            if auto_save_delay <= 0:
+                raise ValueError
+        except ValueError:
+            messagebox.showerror("Error", "Auto-save delay must be a positive number of seconds")
+            return
+        self.auto_save_delay = auto_save_delay
+        self.page_cache.set_budget(self.page_cache_mb * 1024 * 1024)
+        self.update_cache_stats()
+        self.save_app_state()
         self.update_status("Settings saved", "green")
 
+    def update_cache_stats(self):
+        stats = self.page_cache.stats()
+        self.cache_stats_label.config(
+            text=f"Cache: {stats['hits']} hits / {stats['misses']} misses ({stats['hit_rate']:.0%}), "
+                 f"{stats['entries']} pages, {stats['used_bytes'] / 1048576:.1f} of "
+                 f"{stats['budget_bytes'] / 1048576:.0f} MB")
+
     # View management methods
     def show_main_view(self):
         self.current_view = "main"
@@ -803,6 +1267,8 @@ your reading statistics. All data is stored locally on your computer."""
     def show_calendar_view(self):
         self.current_view = "calendar"
         self.hide_all_views()
+        if not hasattr(self, 'calendar_frame'):
+            self.create_calendar_page()
         self.calendar_frame.pack(fill=tk.BOTH, expand=True)
         self.update_calendar()
         self.update_stats()
@@ -811,20 +1277,29 @@ your reading statistics. All data is stored locally on your computer."""
     def show_settings_view(self):
         self.current_view = "settings"
         self.hide_all_views()
+        if not hasattr(self, 'settings_frame'):
+            self.create_settings_page()
         self.settings_frame.pack(fill=tk.BOTH, expand=True)
+        self.update_cache_stats()
+        self.update_perf_stats()
         self.update_button_states()
 
     def show_about_view(self):
         self.current_view = "about"
         self.hide_all_views()
+        if not hasattr(self, 'about_frame'):
+            self.create_about_page()
         self.about_frame.pack(fill=tk.BOTH, expand=True)
         self.update_button_states()
 
     def hide_all_views(self):
+        # Switching views is a quiet moment to write out pending usage
+        self.usage_tracker.flush()
         self.main_frame.pack_forget()
-        self.calendar_frame.pack_forget()
-        self.settings_frame.pack_forget()
-        self.about_frame.pack_forget()
+        # The other views only exist once they have been opened
+        for name in ('calendar_frame', 'settings_frame', 'about_frame'):
+            if hasattr(self, name):
+                getattr(self, name).pack_forget()
 
     def update_button_states(self):
         self.notes_btn.config(state="normal")
@@ -846,12 +1321,34 @@ your reading statistics. All data is stored locally on your computer."""
         self.current_calendar_date = datetime.now()
         self.update_calendar()
 
+    def change_calendar_mode(self):
+        if self.calendar_mode_var.get() == "year":
+            self.month_calendar.canvas.pack_forget()
+            self.year_heatmap.canvas.pack(anchor="n", pady=20)
+            self.calendar_prev_btn.config(text="◀ Previous Year")
+            self.calendar_next_btn.config(text="Next Year ▶")
+        else:
+            self.year_heatmap.canvas.pack_forget()
+            self.month_calendar.canvas.pack(fill=tk.BOTH, expand=True)
+            self.calendar_prev_btn.config(text="◀ Previous Month")
+            self.calendar_next_btn.config(text="Next Month ▶")
+        self.update_calendar()
+
     def prev_calendar_month(self):
-        self.current_calendar_date = self.current_calendar_date.replace(day=1) - timedelta(days=1)
-        self.current_calendar_date = self.current_calendar_date.replace(day=1)
+        if self.calendar_mode_var.get() == "year":
+            self.current_calendar_date = self.current_calendar_date.replace(
+                year=self.current_calendar_date.year - 1, day=1)
+        else:
+            self.current_calendar_date = self.current_calendar_date.replace(day=1) - timedelta(days=1)
+            self.current_calendar_date = self.current_calendar_date.replace(day=1)
         self.update_calendar()
 
     def next_calendar_month(self):
+        if self.calendar_mode_var.get() == "year":
+            self.current_calendar_date = self.current_calendar_date.replace(
+                year=self.current_calendar_date.year + 1, day=1)
+            self.update_calendar()
+            return
         next_month = self.current_calendar_date.month + 1
         next_year = self.current_calendar_date.year
         if next_month > 12:
@@ -860,52 +1357,17 @@ your reading statistics. All data is stored locally on your computer."""
         self.current_calendar_date = self.current_calendar_date.replace(year=next_year, month=next_month, day=1)
         self.update_calendar()
 
+    @perf.timed("update_calendar")
     def update_calendar(self):
-        for widget in self.calendar_grid.winfo_children():
-            widget.destroy()
-
-        self.month_year_label.config(text=self.current_calendar_date.strftime("%B %Y"))
-
-        cal = cal_module.monthcalendar(self.current_calendar_date.year, self.current_calendar_date.month)
-
-        # Enhanced day headers
-        days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-        for i, day in enumerate(days):
-            label = ttk.Label(self.calendar_grid, text=day[:3], font=("Segoe UI", 10, "bold"),
-                              anchor="center", relief="solid", borderwidth=1)
-            label.grid(row=0, column=i, sticky="nsew", padx=1, pady=1)
-
-        # Enhanced day cells
-        for week_num, week in enumerate(cal):
-            for day_num, day in enumerate(week):
-                if day == 0:
-                    continue
-
-                bg_color = self.light_secondary if not self.dark_mode else self.dark_secondary
-                day_frame = tk.Frame(self.calendar_grid, relief="solid", borderwidth=1, bg=bg_color)
-                day_frame.grid(row=week_num + 1, column=day_num, sticky="nsew", padx=1, pady=1)
-
-                day_label = tk.Label(day_frame, text=str(day), font=("Segoe UI", 10, "bold"),
-                                     bg=bg_color, fg=self.light_fg if not self.dark_mode else self.dark_fg)
-                day_label.pack(anchor="nw", padx=5, pady=5)
-
-                date_str = f"{self.current_calendar_date.year}-{self.current_calendar_date.month:02d}-{day:02d}"
-                if date_str in self.usage_data:
-                    usage_count = self.usage_data[date_str]
-                    usage_text = "✓" if usage_count == 1 else f"{usage_count}✓"
-                    usage_indicator = tk.Label(day_frame, text=usage_text, font=("Segoe UI", 9),
-                                               fg="green", bg=bg_color)
-                    usage_indicator.pack(anchor="ne", padx=5, pady=5)
-
-                    highlight_color = "#d4edda" if not self.dark_mode else "#155724"
-                    day_frame.config(bg=highlight_color)
-                    day_label.config(bg=highlight_color)
-                    usage_indicator.config(bg=highlight_color)
-
-        for i in range(7):
-            self.calendar_grid.columnconfigure(i, weight=1)
-        for i in range(len(cal) + 1):
-            self.calendar_grid.rowconfigure(i, weight=1)
+        from calendar_view import DARK_COLORS, LIGHT_COLORS
+        colors = DARK_COLORS if self.dark_mode else LIGHT_COLORS
+        year = self.current_calendar_date.year
+        if self.calendar_mode_var.get() == "year":
+            self.month_year_label.config(text=str(year))
+            self.year_heatmap.show(year, self.usage_data, colors)
+        else:
+            self.month_year_label.config(text=self.current_calendar_date.strftime("%B %Y"))
+            self.month_calendar.show(year, self.current_calendar_date.month, self.usage_data, colors)
 
     def update_stats(self):
         days_used = len(self.usage_data)
@@ -925,7 +1387,8 @@ your reading statistics. All data is stored locally on your computer."""
         self.current_streak_label.config(text=f"Current streak: {streak} days")
 
         # Additional stats
-        total_notes = sum(1 for note in self.current_notes.values() if note.strip())
+        # Only pages with notes are stored
+        total_notes = len(self.current_notes)
         self.total_notes_label.config(text=f"Total notes: {total_notes}")
 
         # Calculate average pages per session (simplified)
@@ -946,23 +1409,65 @@ your reading statistics. All data is stored locally on your computer."""
     # PDF and notes methods
     def zoom_in(self):
         if self.zoom_level < 3.0:
-            self.zoom_level = min(3.0, self.zoom_level + 0.1)
-            self.update_zoom_display()
-            if hasattr(self, 'doc'):
-                self.show_page(self.current_page)
+            self.set_zoom(round(min(3.0, self.zoom_level + 0.1), 2))
 
     def zoom_out(self):
         if self.zoom_level > 0.5:
-            self.zoom_level = max(0.5, self.zoom_level - 0.1)
-            self.update_zoom_display()
-            if hasattr(self, 'doc'):
-                self.show_page(self.current_page)
+            self.set_zoom(round(max(0.5, self.zoom_level - 0.1), 2))
 
     def reset_zoom(self):
-        self.zoom_level = 1.5
+        self.set_zoom(1.5)
+
+    def set_zoom(self, zoom_level):
+        """Preview the new zoom immediately and render it properly once zooming settles"""
+        self.zoom_level = zoom_level
         self.update_zoom_display()
-        if hasattr(self, 'doc'):
+        if not hasattr(self, 'doc'):
+            return
+
+        if self.zoom_render_id:
+            self.root.after_cancel(self.zoom_render_id)
+            self.zoom_render_id = None
+
+        # Already rendered at this zoom, nothing to wait for
+        if PageCache.key(self.current_page, zoom_level) in self.page_cache:
             self.show_page(self.current_page)
+            return
+
+        self.preview_zoom()
+        self.zoom_render_id = self.root.after(self.zoom_settle_delay, self.render_settled_zoom)
+
+    def preview_zoom(self):
+        """Rescale the page on screen to the new zoom while the crisp render is pending"""
+        # Renders at intermediate zoom levels are out of date now
+        if self.page_render_ticket is not None:
+            self.render_engine.cancel(self.page_render_ticket)
+            self.page_render_ticket = None
+
+        # Continuous scrolling keeps the old zoom until zooming settles and its pages are laid out again,
+        # rescaling every visible page on each click would cost about as much as rendering them
+        result = self.displayed_result
+        if not result or result.page_num != self.current_page or self.tiled_page or self.continuous_layout:
+            return
+
+        # Always scale the last crisp render so previews don't blur further with each click
+        scale = self.zoom_level / result.zoom
+        size = (max(1, int(result.width * scale)), max(1, int(result.height * scale)))
+        # PIL is only needed for previews, so it isn't loaded at startup
+        from PIL import Image, ImageTk
+        img = Image.frombuffer("RGB", (result.width, result.height), result.samples, "raw", "RGB", 0, 1)
+        self.page_image = ImageTk.PhotoImage(img.resize(size, Image.BILINEAR))
+
+        self.pdf_canvas.delete("all")
+        self.pdf_canvas.create_image(0, 0, anchor=tk.NW, image=self.page_image)
+        self.pdf_canvas.config(scrollregion=(0, 0, size[0], size[1]))
+        # Both are placed at the current zoom, so they line up with the preview
+        self.draw_annotations()
+        self.draw_search_hits()
+
+    def render_settled_zoom(self):
+        self.zoom_render_id = None
+        self.show_page(self.current_page)
 
     def update_zoom_display(self):
         self.zoom_label.config(text=f"{int(self.zoom_level * 100)}%")
@@ -973,7 +1478,7 @@ your reading statistics. All data is stored locally on your computer."""
             filetypes=[("PDF files", "*.pdf"), ("All files", "*.*")]
         )
         if file_path:
-            self.load_book(file_path)
+            self.open_book(file_path)
 
     def open_notes(self):
         file_path = filedialog.askopenfilename(
@@ -983,53 +1488,100 @@ your reading statistics. All data is stored locally on your computer."""
         if file_path:
             self.load_notes_file(file_path)
 
-    def load_notes_file(self, file_path):
+    def load_notes_file(self, file_path, page_num=None):
         try:
             with open(file_path, 'r') as f:
                 data = json.load(f)
 
             book_path = data.get('book_path')
-            notes = data.get('notes', {})
+            # Only pages with notes are kept, older files also list every empty page
+            notes = {page: text for page, text in data.get('notes', {}).items() if text}
             last_page = data.get('last_page', 0)
 
+            # Apply edits made after the snapshot was last compacted
+            journal = NotesJournal(file_path)
+            journal.replay(notes)
+
             if book_path and os.path.exists(book_path):
-                self.load_book(book_path, restore_state=True)
-                self.current_notes = notes
-                self.show_page(last_page)
-                self.update_status("Notes loaded successfully", "green")
+                page_num = last_page if page_num is None else page_num
+
+                def on_open():
+                    self.current_notes = memory_notes(book_path, notes)
+                    self.reset_notes_editors()
+                    # Further edits are journaled against this file
+                    self.notes_file_path = file_path
+                    self.notes_journal = journal
+                    self.show_page(page_num)
+                    self.index_notes_file(file_path)
+                    self.update_status("Notes loaded successfully", "green")
+                self.open_book(book_path, page_num, on_open=on_open)
             else:
                 messagebox.showerror("Error", "The associated PDF file was not found.")
 
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load notes: {str(e)}")
 
-    def load_book(self, file_path, restore_state=False):
+    @perf.timed("load_book")
+    def load_book(self, document, page_num=None, restore_state=False, first_rendering=None):
+        """Switch to a book read by open_book, nothing here touches the PDF itself"""
+        file_path = document.file_path
         try:
-            if hasattr(self, 'doc'):
-                self.doc.close()
+            if not restore_state:
+                # The open notes file belongs to the previous book
+                self.save_current_notes(silent=True)
+                self.close_notes_file()
 
             self.current_book_path = file_path
-            self.doc = fitz.open(file_path)
-            self.total_pages = len(self.doc)
+            self.doc = document
+            self.total_pages = len(document)
+            self.render_engine.set_document(file_path)
+
+            # Page sizes were read once by the worker, the continuous layout is built from them
+            self.page_sizes = document.page_sizes
+            self.clear_continuous_view()
+            self.thumbnail_strip.set_document(document.fingerprint, self.page_sizes)
+            if self.annotation_store:
+                self.annotation_store.close()
+            self.annotation_store = AnnotationStore(self.root, file_path)
+            self.annotated_pages = set()
+            if self.mark_store:
+                self.mark_store.close()
+            self.mark_store = MarkStore(self.root, file_path)
+            self.fill_mark_lists()
+            self.page_cache.clear()
+            if first_rendering:
+                self.page_cache.put(PageCache.key(first_rendering.page_num, first_rendering.zoom), first_rendering)
+            self.prefetcher.clear()
+            self.prepared_photos.clear()
+            self.page_render_ticket = None
+            self.clear_tiles()
+
+            # The previous book's image is no longer a valid stand-in
+            self.page_image = None
+            self.displayed_result = None
+            self.pdf_canvas.delete("all")
             self.book_title = os.path.splitext(os.path.basename(file_path))[0]
             self.title_label.config(text=self.book_title)
 
-            # Initialize or load notes
-            if not restore_state:
-                self.current_notes = {str(i): "" for i in range(self.total_pages)}
-                self.current_page = 0
-            else:
-                # Keep existing notes, fill missing pages
-                for i in range(self.total_pages):
-                    if str(i) not in self.current_notes:
-                        self.current_notes[str(i)] = ""
+            # Initialize or load notes, editors cached for the previous book are stale
+            self.reset_notes_editors()
+            if self.notes_store:
+                # Library notes are read page by page as they are shown
+                self.current_notes = PageNotes(self.notes_store, file_path)
+            elif not restore_state:
+                # Notes are sparse, pages without any are simply missing
+                self.current_notes = memory_notes(file_path)
 
             # Show the appropriate page
-            page_to_show = self.current_page if restore_state else 0
+            if page_num is not None:
+                page_to_show = page_num
+            else:
+                page_to_show = self.current_page if restore_state else 0
             if page_to_show >= self.total_pages:
                 page_to_show = self.total_pages - 1
 
             self.show_page(page_to_show)
+            self.start_search_index(document.fingerprint)
             self.record_usage()
             self.update_status(f"Loaded: {self.book_title}", "green")
 
@@ -1039,44 +1591,672 @@ your reading statistics. All data is stored locally on your computer."""
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load PDF: {str(e)}")
 
+    @perf.timed("show_page")
     def show_page(self, page_num):
         if not hasattr(self, 'doc') or page_num < 0 or page_num >= self.total_pages:
             return
 
+        # page_turn runs from here until the page is on screen, rendering included
+        if perf.recorder.enabled:
+            self.page_turn_start = time.perf_counter()
         self.current_page = page_num
+        self.update_page_labels(page_num)
+        self.usage_tracker.page_viewed(self.current_book_path, page_num)
 
-        # Update UI elements
+        if self.continuous_mode:
+            self.show_continuous_page(page_num)
+        else:
+            self.display_page(page_num)
+
+        self.load_page_notes(page_num)
+
+    def update_page_labels(self, page_num):
         self.page_label.config(text=f"Page: {page_num + 1} / {self.total_pages}")
         self.page_info_label.config(text=f"Page {page_num + 1} of {self.total_pages}")
-        self.progress_var.set(((page_num + 1) / self.total_pages) * 100)
+        if not self.notes_export:
+            self.progress_var.set(((page_num + 1) / self.total_pages) * 100)
+        self.thumbnail_strip.set_current(page_num)
+
+    def display_page(self, page_num):
+        """Show a single page on the canvas"""
+        # Revisits and prefetched pages come from the cache, anything else renders in the background
+        key = PageCache.key(page_num, self.zoom_level)
+        if self.page_render_ticket is not None:
+            self.render_engine.cancel(self.page_render_ticket)
+            self.page_render_ticket = None
+        page_width, page_height = self.page_sizes[page_num]
+        width = int(page_width * self.zoom_level)
+        height = int(page_height * self.zoom_level)
+        tiled = self.tiled_rendering and needs_tiling(width, height)
+
+        self.clear_tiles()
+        if tiled:
+            self.show_tiled_page(page_num, width, height)
+        else:
+            cached = self.page_cache.get(key)
+            if cached:
+                self.display_rendered_page(cached)
+            else:
+                if not getattr(self, 'page_image', None):
+                    self.show_page_placeholder(page_num)
+                # A prefetch of this page may already be on its way
+                if not self.prefetcher.is_pending(key):
+                    self.page_render_ticket = self.render_engine.request(
+                        page_num, self.zoom_level, self.on_page_rendered, error_callback=self.on_render_error)
+        self.prefetcher.page_shown(page_num, self.total_pages, self.zoom_level, prefetch=not tiled)
+
+    def load_page_notes(self, page_num):
+        key = (self.current_book_path, page_num)
+        if key != self.notes_editors.active:
+            # Formatting still being applied belongs to the editor being left
+            self.finish_tag_load()
+            if self.notes_modified:
+                # Edits that were never saved don't match the page's notes, so the editor isn't kept
+                self.notes_editors.discard_active()
+            self.notes_modified = False
+            self.update_save_status(True)
+
+        # A page visited recently comes back with its text, scroll position, cursor and undo history
+        editor, cached = self.notes_editors.activate(key)
+        self.show_notes_editor(editor)
+        if not cached:
+            # Load notes for this page
+            notes = self.current_notes.get(str(page_num), "")
+            self.notes_text.insert(1.0, plain_text(notes))
+            self.notes_text.edit_reset()
+            # Formatting follows in batches, a heavily formatted page mustn't hold up the page turn
+            self.tag_load = tag_batches(notes)
+            self.apply_tag_batches()
+
+        # The book-wide lists stay as they are, the per-page ones follow the page
+        if self.marks_page_only_var.get():
+            self.fill_mark_lists()
 
-        # Display PDF page
-        page = self.doc[page_num]
-        zoom_matrix = fitz.Matrix(self.zoom_level, self.zoom_level)
-        pix = page.get_pixmap(matrix=zoom_matrix)
+        # Save app state
+        self.save_app_state()
 
-        img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-        self.page_image = ImageTk.PhotoImage(img)
+    def apply_tag_batches(self, budget=0.008):
+        """Add tag runs until the frame budget (seconds) is used up, then continue on the next idle moment"""
+        self.tag_load_id = None
+        if self.tag_load is None:
+            return
+        deadline = time.perf_counter() + budget
+        for tag, indices in self.tag_load:
+            self.notes_text.tag_add(tag, *indices)
+            if time.perf_counter() >= deadline:
+                self.tag_load_id = self.root.after(1, self.apply_tag_batches)
+                return
+        self.tag_load = None
+
+    def finish_tag_load(self):
+        """Apply any formatting still pending, before the note is edited or read back"""
+        if self.tag_load_id:
+            self.root.after_cancel(self.tag_load_id)
+        self.apply_tag_batches(budget=float('inf'))
+
+    def cancel_tag_load(self):
+        if self.tag_load_id:
+            self.root.after_cancel(self.tag_load_id)
+            self.tag_load_id = None
+        self.tag_load = None
+
+    def show_page_placeholder(self, page_num):
+        """Shown until the first rendering of a book arrives"""
+        self.pdf_canvas.delete("all")
+        self.pdf_canvas.create_text(20, 20, anchor=tk.NW, text=f"Rendering page {page_num + 1}...",
+                                    font=("Segoe UI", 11), fill="#7f8c8d")
+        self.pdf_canvas.config(scrollregion=(0, 0, 0, 0))
+
+    def on_page_rendered(self, result):
+        perf.recorder.add("rasterize", result.started, result.render_time, perf.WORKER_TRACK)
+        self.page_cache.put(PageCache.key(result.page_num, result.zoom), result)
+        if self.continuous_layout:
+            self.continuous_tickets.pop(result.page_num, None)
+            self.fill_continuous_slot(result)
+        elif result.page_num == self.current_page:
+            self.page_render_ticket = None
+            self.display_rendered_page(result)
+        elif abs(result.page_num - self.current_page) == 1:
+            self.root.after_idle(self.prepare_neighbour_photos)
+
+    @perf.timed("convert")
+    def make_page_photo(self, result, photo=None):
+        """Load a rendering into a Tk photo, reusing a spare one when possible"""
+        if photo is None:
+            photo = self.spare_photos.pop() if self.spare_photos else tk.PhotoImage()
+        # Tk decodes the PPM directly into the photo's own pixel buffer
+        photo.configure(width=result.width, height=result.height, data=result.ppm, format="ppm")
+        return photo
+
+    def release_photo(self, photo):
+        """Keep a photo that is no longer on the canvas for the next page"""
+        if isinstance(photo, tk.PhotoImage) and len(self.spare_photos) < 4:
+            self.spare_photos.append(photo)
+
+    def prepare_neighbour_photos(self):
+        """Convert the adjacent pages ahead of time so a page turn is just an image swap"""
+        keys = [PageCache.key(page_num, self.zoom_level)
+                for page_num in (self.current_page + 1, self.current_page - 1)]
+        for key in list(self.prepared_photos):
+            if key not in keys:
+                self.release_photo(self.prepared_photos.pop(key))
+        for key in keys:
+            result = self.page_cache.peek(key)
+            if result and key not in self.prepared_photos:
+                self.prepared_photos[key] = self.make_page_photo(result)
+
+    def display_rendered_page(self, result):
+        """Swap in a page rendered by the background engine"""
+        # The user may have moved on while this page was rendering
+        if result.page_num != self.current_page or result.zoom != self.zoom_level or self.tiled_page:
+            return
 
+        key = PageCache.key(result.page_num, result.zoom)
+        previous_image = getattr(self, 'page_image', None)
+        self.page_image = self.prepared_photos.pop(key, None) or self.make_page_photo(result)
+        self.displayed_result = result
+
+        blit_start = time.perf_counter() if perf.recorder.enabled else None
         self.pdf_canvas.delete("all")
         self.pdf_canvas.create_image(0, 0, anchor=tk.NW, image=self.page_image)
-        self.pdf_canvas.config(scrollregion=(0, 0, pix.width, pix.height))
+        if previous_image is not self.page_image:
+            self.release_photo(previous_image)
+        self.pdf_canvas.config(scrollregion=(0, 0, result.width, result.height))
+        self.draw_annotations()
+        self.draw_search_hits()
+        if blit_start is not None:
+            now = time.perf_counter()
+            perf.recorder.add("blit", blit_start, now - blit_start)
+            self.record_page_turn(now)
+        startup_timing.page_shown()
+        self.root.after_idle(self.prepare_neighbour_photos)
+
+    # Tiled rendering of large pages
+    def show_tiled_page(self, page_num, width, height):
+        """Lay out a page too large to render whole, tiles are filled in as they come into view"""
+        self.page_image = None
+        self.displayed_result = None
+        self.tiled_page = (page_num, self.zoom_level)
+        self.tiled_size = (width, height)
 
-        # Load notes for this page
-        self.notes_text.delete(1.0, tk.END)
-        notes = self.current_notes.get(str(page_num), "")
-        self.notes_text.insert(1.0, notes)
-        self.update_save_status(True)
-        self.notes_modified = False
+        self.pdf_canvas.delete("all")
+        self.pdf_canvas.create_rectangle(0, 0, width, height, fill="white", outline="")
+        self.pdf_canvas.config(scrollregion=(0, 0, width, height))
+        self.draw_annotations()
+        self.draw_search_hits()
+        self.update_visible_tiles()
+
+    def clear_tiles(self):
+        for ticket in self.tile_tickets.values():
+            self.render_engine.cancel(ticket)
+        self.tile_tickets.clear()
+        for item, photo in self.tile_items.values():
+            self.pdf_canvas.delete(item)
+            self.release_photo(photo)
+        self.tile_items.clear()
+        self.tiled_page = None
+
+    def on_pdf_canvas_yscroll(self, first, last):
+        self.pdf_v_scrollbar.set(first, last)
+        self.schedule_view_update()
+
+    def on_pdf_canvas_xscroll(self, first, last):
+        self.pdf_h_scrollbar.set(first, last)
+        self.schedule_view_update()
+
+    def on_pdf_canvas_wheel(self, event):
+        self.pdf_canvas.yview_scroll(int(-event.delta / 120) * 3, "units")
+
+    def schedule_view_update(self):
+        if (self.tiled_page or self.continuous_layout) and self.view_update_id is None:
+            self.view_update_id = self.root.after_idle(self.update_view)
+
+    def update_view(self):
+        self.view_update_id = None
+        if self.continuous_layout:
+            self.update_continuous_pages()
+        elif self.tiled_page:
+            self.update_visible_tiles()
+
+    def update_visible_tiles(self):
+        """Request the tiles around the visible region and free those that scrolled away"""
+
+        page_num, zoom = self.tiled_page
+        left = self.pdf_canvas.canvasx(0)
+        top = self.pdf_canvas.canvasy(0)
+        view = (left, top, left + self.pdf_canvas.winfo_width(), top + self.pdf_canvas.winfo_height())
+        tiles = visible_tiles(view, *self.tiled_size)
+        wanted = set(tiles)
+
+        for tile in list(self.tile_items):
+            if tile not in wanted:
+                item, photo = self.tile_items.pop(tile)
+                self.pdf_canvas.delete(item)
+                self.release_photo(photo)
+        for tile in list(self.tile_tickets):
+            if tile not in wanted:
+                self.render_engine.cancel(self.tile_tickets.pop(tile))
+
+        for tile in tiles:
+            if tile in self.tile_items or tile in self.tile_tickets:
+                continue
+            cached = self.page_cache.get(PageCache.key(page_num, zoom, tile))
+            if cached:
+                self.display_tile(tile, cached)
+            else:
+                self.tile_tickets[tile] = self.render_engine.request(
+                    page_num, zoom, lambda result, t=tile: self.on_tile_rendered(t, result),
+                    clip=tile_clip(tile, zoom), error_callback=self.on_render_error)
+
+    def on_tile_rendered(self, tile, result):
+        perf.recorder.add("rasterize", result.started, result.render_time, perf.WORKER_TRACK)
+        self.tile_tickets.pop(tile, None)
+        self.page_cache.put(PageCache.key(result.page_num, result.zoom, tile), result)
+        if self.tiled_page == (result.page_num, result.zoom):
+            self.display_tile(tile, result)
+
+    def display_tile(self, tile, result):
+        photo = self.make_page_photo(result)
+        item = self.pdf_canvas.create_image(result.x, result.y, anchor=tk.NW, image=photo)
+        self.tile_items[tile] = (item, photo)
+        self.pdf_canvas.tag_raise("annotation")
+        self.pdf_canvas.tag_raise("search_hit")
+        startup_timing.page_shown()
+        if self.page_turn_start is not None:
+            self.record_page_turn(time.perf_counter())
+
+    def record_page_turn(self, now):
+        """The first pixels of the new page are on screen"""
+        if self.page_turn_start is not None:
+            perf.recorder.add("page_turn", self.page_turn_start, now - self.page_turn_start)
+            self.page_turn_start = None
+
+    def toggle_thumbnails(self):
+        self.show_thumbnails = self.thumbnails_var.get()
+        if self.show_thumbnails:
+            self.thumbnail_strip.frame.pack(side=tk.LEFT, fill=tk.Y, padx=(0, 5), before=self.pdf_canvas)
+        else:
+            self.thumbnail_strip.frame.pack_forget()
 
-        # Clear navigation lists when changing pages
-        self.bookmarks.clear()
-        self.highlights.clear()
-        self.update_bookmarks_list()
-        self.update_highlights_list()
+    def on_thumbnail_select(self, page_num):
+        if page_num != self.current_page:
+            self.save_current_notes()
+            self.show_page(page_num)
 
-        # Save app state
-        self.save_app_state()
+    # Continuous scrolling
+    def toggle_continuous_mode(self):
+        self.save_current_notes()
+        self.continuous_mode = self.continuous_var.get()
+        self.clear_tiles()
+        self.clear_continuous_view()
+        self.pdf_canvas.delete("all")
+        self.page_image = None
+        self.displayed_result = None
+        if hasattr(self, 'doc'):
+            self.show_page(self.current_page)
+
+    def build_continuous_view(self):
+        """Lay out the whole book at the current zoom without rendering anything yet"""
+        self.clear_tiles()
+        self.clear_continuous_view()
+        self.pdf_canvas.delete("all")
+        self.page_image = None
+        self.displayed_result = None
+
+        self.continuous_layout = PageLayout(self.page_sizes, self.zoom_level)
+        self.pdf_canvas.config(scrollregion=(0, 0, self.continuous_layout.width, self.continuous_layout.height))
+
+    def clear_continuous_view(self):
+        for ticket in self.continuous_tickets.values():
+            self.render_engine.cancel(ticket)
+        self.continuous_tickets.clear()
+        for frame, image, photo in self.continuous_slots.values():
+            self.pdf_canvas.delete(frame, image)
+        self.continuous_slots.clear()
+        for frame, image, photo in self.free_slots:
+            self.pdf_canvas.delete(frame, image)
+        self.free_slots.clear()
+        self.continuous_layout = None
+
+    def show_continuous_page(self, page_num):
+        """Scroll the stacked pages so page_num is at the top of the viewport"""
+        layout = self.continuous_layout
+        if not layout or layout.zoom != self.zoom_level:
+            self.build_continuous_view()
+            layout = self.continuous_layout
+
+        top = layout.bounds(page_num)[1] - layout.gap
+        self.pdf_canvas.yview_moveto(top / layout.height)
+        # Scrolling there ourselves must not make another visible page current
+        self.programmatic_scroll_top = self.pdf_canvas.canvasy(0)
+        self.update_continuous_pages()
+        self.draw_search_hits()
+        self.prefetcher.page_shown(page_num, self.total_pages, self.zoom_level)
+
+    def update_continuous_pages(self):
+        """Give canvas items to the pages near the viewport and recycle the ones that left it"""
+        layout = self.continuous_layout
+        top = self.pdf_canvas.canvasy(0)
+        height = self.pdf_canvas.winfo_height()
+        near = set(layout.pages_between(top - height // 2, top + height + height // 2))
+
+        for page_num in list(self.continuous_slots):
+            if page_num not in near:
+                # The slot keeps its photo so the next page can be decoded into it
+                frame, image, photo = self.continuous_slots.pop(page_num)
+                self.pdf_canvas.itemconfig(frame, state="hidden")
+                self.pdf_canvas.itemconfig(image, image="", state="hidden")
+                self.free_slots.append((frame, image, photo))
+        for page_num in list(self.continuous_tickets):
+            if page_num not in near:
+                self.render_engine.cancel(self.continuous_tickets.pop(page_num))
+
+        for page_num in sorted(near):
+            if page_num in self.continuous_slots:
+                continue
+
+            bounds = layout.bounds(page_num)
+            if self.free_slots:
+                frame, image, photo = self.free_slots.pop()
+                self.pdf_canvas.coords(frame, *bounds)
+                self.pdf_canvas.coords(image, bounds[0], bounds[1])
+                self.pdf_canvas.itemconfig(frame, state="normal")
+            else:
+                frame = self.pdf_canvas.create_rectangle(*bounds, fill="white", outline="#bdc3c7")
+                image = self.pdf_canvas.create_image(bounds[0], bounds[1], anchor=tk.NW, state="hidden")
+                photo = None
+            self.continuous_slots[page_num] = (frame, image, photo)
+
+            key = PageCache.key(page_num, layout.zoom)
+            cached = self.page_cache.get(key)
+            if cached:
+                self.fill_continuous_slot(cached)
+            elif not self.prefetcher.is_pending(key) and page_num not in self.continuous_tickets:
+                self.continuous_tickets[page_num] = self.render_engine.request(
+                    page_num, layout.zoom, self.on_page_rendered, error_callback=self.on_render_error)
+
+        # Annotations are drawn for every page with a slot
+        if set(self.continuous_slots) != self.annotated_pages:
+            self.draw_annotations()
+
+        # The current page follows the scroll position once the user scrolls
+        if top != self.programmatic_scroll_top:
+            self.programmatic_scroll_top = None
+            page_num = layout.page_at(top + height / 2)
+            if page_num != self.current_page:
+                self.follow_scrolled_page(page_num)
+
+    def fill_continuous_slot(self, result):
+        slot = self.continuous_slots.get(result.page_num)
+        if not slot or result.zoom != self.continuous_layout.zoom:
+            return
+
+        frame, image, photo = slot
+        photo = self.make_page_photo(result, photo)
+        self.pdf_canvas.itemconfig(image, image=photo, state="normal")
+        self.continuous_slots[result.page_num] = (frame, image, photo)
+        self.pdf_canvas.tag_raise("annotation")
+        self.pdf_canvas.tag_raise("search_hit")
+        startup_timing.page_shown()
+        if self.page_turn_start is not None and result.page_num == self.current_page:
+            self.record_page_turn(time.perf_counter())
+
+    def follow_scrolled_page(self, page_num):
+        """Make the page in the middle of the viewport the current one"""
+        self.save_current_notes()
+        self.current_page = page_num
+        self.update_page_labels(page_num)
+        self.usage_tracker.page_viewed(self.current_book_path, page_num)
+        self.prefetcher.page_shown(page_num, self.total_pages, self.zoom_level)
+        self.draw_search_hits()
+        self.load_page_notes(page_num)
+
+    # Annotations on the page
+    def page_origin(self, page_num):
+        """Canvas position of a page's top left corner, or None when it isn't on the canvas"""
+        if self.continuous_layout:
+            if page_num not in self.continuous_slots:
+                return None
+            return self.continuous_layout.bounds(page_num)[:2]
+        return (0, 0) if page_num == self.current_page else None
+
+    def canvas_to_page(self, event):
+        """(page, x, y) in page coordinates under a mouse event, or None off the pages"""
+        if not hasattr(self, 'doc'):
+            return None
+        x = self.pdf_canvas.canvasx(event.x)
+        y = self.pdf_canvas.canvasy(event.y)
+        page_num = self.continuous_layout.page_at(y) if self.continuous_layout else self.current_page
+        origin = self.page_origin(page_num)
+        if origin is None:
+            return None
+        page_x = (x - origin[0]) / self.zoom_level
+        page_y = (y - origin[1]) / self.zoom_level
+        width, height = self.page_sizes[page_num]
+        if not (0 <= page_x <= width and 0 <= page_y <= height):
+            return None
+        return page_num, page_x, page_y
+
+    def draw_annotations(self):
+        """Redraw the annotations of the pages on the canvas in one pass"""
+        self.pdf_canvas.delete("annotation")
+        self.hovered_annotation = None
+        if not self.annotation_store:
+            self.annotated_pages = set()
+            return
+        pages = set(self.continuous_slots) if self.continuous_layout else {self.current_page}
+        self.annotated_pages = pages
+
+        zoom = self.zoom_level
+        for page_num in pages:
+            left, top = self.page_origin(page_num)
+            for annotation in self.annotation_store.on_page(page_num):
+                x0, y0, x1, y1 = annotation.rect
+                coords = (left + x0 * zoom, top + y0 * zoom, left + x1 * zoom, top + y1 * zoom)
+                if annotation.kind == "highlight":
+                    self.pdf_canvas.create_rectangle(*coords, fill=annotation.color, stipple="gray50",
+                                                     outline="", tags="annotation")
+                else:
+                    self.pdf_canvas.create_rectangle(*coords, fill=annotation.color, outline="#b7950b",
+                                                     tags="annotation")
+                    self.pdf_canvas.create_text((coords[0] + coords[2]) / 2, (coords[1] + coords[3]) / 2,
+                                                text="✎", font=("Segoe UI", max(6, int(8 * zoom))),
+                                                fill="#7d6608", tags="annotation")
+        self.pdf_canvas.tag_raise("search_hit")
+
+    def on_annotation_press(self, event):
+        tool = self.annotation_tool_var.get()
+        if tool == "off" or not self.annotation_store:
+            return
+        point = self.canvas_to_page(event)
+        if not point:
+            return
+        if tool == "highlight":
+            x = self.pdf_canvas.canvasx(event.x)
+            y = self.pdf_canvas.canvasy(event.y)
+            draft = self.pdf_canvas.create_rectangle(x, y, x, y, outline="#f39c12", dash=(3, 2),
+                                                     tags="annotation_draft")
+            self.annotation_drag = (point, draft)
+        else:
+            from tkinter import simpledialog
+            text = simpledialog.askstring("Sticky Note", "Note:", parent=self.root)
+            if text:
+                page_num, x, y = point
+                self.annotation_store.add(page_num, "note", (x, y, x + NOTE_SIZE, y + NOTE_SIZE), "#f7dc6f", text)
+                self.draw_annotations()
+
+    def on_annotation_drag(self, event):
+        if self.annotation_drag:
+            _, draft = self.annotation_drag
+            x0, y0 = self.pdf_canvas.coords(draft)[:2]
+            self.pdf_canvas.coords(draft, x0, y0, self.pdf_canvas.canvasx(event.x), self.pdf_canvas.canvasy(event.y))
+
+    def on_annotation_release(self, event):
+        if not self.annotation_drag:
+            return
+        (page_num, x0, y0), draft = self.annotation_drag
+        self.annotation_drag = None
+        self.pdf_canvas.delete(draft)
+
+        # Clamped to the page the drag started on
+        origin = self.page_origin(page_num)
+        if origin is None:
+            return
+        width, height = self.page_sizes[page_num]
+        x1 = min(max((self.pdf_canvas.canvasx(event.x) - origin[0]) / self.zoom_level, 0), width)
+        y1 = min(max((self.pdf_canvas.canvasy(event.y) - origin[1]) / self.zoom_level, 0), height)
+        rect = (min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1))
+        # A click without a drag isn't a highlight
+        if (rect[2] - rect[0]) * self.zoom_level < 4 or (rect[3] - rect[1]) * self.zoom_level < 4:
+            return
+        self.annotation_store.add(page_num, "highlight", rect, self.current_highlight_color)
+        self.draw_annotations()
+
+    def annotation_at(self, event):
+        point = self.canvas_to_page(event)
+        if not point or not self.annotation_store:
+            return None
+        return self.annotation_store.hit_test(*point)
+
+    def on_annotation_double_click(self, event):
+        annotation = self.annotation_at(event)
+        if annotation and annotation.kind == "note":
+            from tkinter import simpledialog
+            text = simpledialog.askstring("Sticky Note", "Note:", initialvalue=annotation.text, parent=self.root)
+            if text is not None:
+                self.annotation_store.update_text(annotation.id, text)
+
+    def on_annotation_right_click(self, event):
+        annotation = self.annotation_at(event)
+        if annotation and messagebox.askyesno("Remove Annotation", f"Remove this {annotation.kind}?"):
+            self.annotation_store.remove(annotation.id)
+            self.draw_annotations()
+
+    def on_annotation_hover(self, event):
+        """Show a sticky note's text while the pointer is over it"""
+        annotation = self.annotation_at(event)
+        if annotation is self.hovered_annotation:
+            return
+        self.hovered_annotation = annotation
+        self.pdf_canvas.delete("annotation_tip")
+        self.pdf_canvas.config(cursor="hand2" if annotation else "")
+        if not annotation:
+            return
+
+        text = annotation.text if annotation.kind == "note" else "Highlight (right-click to remove)"
+        x = self.pdf_canvas.canvasx(event.x) + 12
+        y = self.pdf_canvas.canvasy(event.y) + 12
+        tip = self.pdf_canvas.create_text(x + 6, y + 4, anchor=tk.NW, text=text, width=280,
+                                          font=("Segoe UI", 9), fill="#2c3e50", tags="annotation_tip")
+        self.pdf_canvas.create_rectangle(*self.pdf_canvas.bbox(tip), fill="#fdfefe", outline="#bdc3c7",
+                                         tags="annotation_tip")
+        self.pdf_canvas.tag_raise(tip)
+
+    # Full-text search
+    def start_search_index(self, fingerprint):
+        """Read the book's saved search index in a worker, searching is off until it is back"""
+        if self.search_indexer:
+            self.search_indexer.cancel()
+            self.search_indexer = None
+        if self.search_load_ticket is not None:
+            self.render_engine.cancel(self.search_load_ticket)
+        self.clear_search()
+        self.search_index = None
+        self.search_entry.config(state="disabled")
+        self.search_status_label.config(text="Loading search index...")
+
+        index_path = index_path_for(fingerprint)
+        self.search_load_ticket = self.render_engine.request_search_index(
+            index_path, lambda index: self.on_search_index_loaded(index, index_path),
+            error_callback=lambda error: self.on_search_index_loaded(None, index_path))
+
+    def on_search_index_loaded(self, index, index_path):
+        """Use the saved index if it still fits the book, otherwise extract the text in the background"""
+        self.search_load_ticket = None
+        self.search_entry.config(state="normal")
+        self.search_status_label.config(text="")
+        if index and index.page_count == self.total_pages:
+            self.search_index = index
+            return
+
+        self.search_index = SearchIndex(self.total_pages)
+        self.search_indexer = SearchIndexer(self.render_engine, self.search_index, index_path,
+                                            self.on_search_index_progress, self.on_search_index_done,
+                                            self.on_search_index_error)
+        self.search_indexer.start()
+
+    def on_search_index_progress(self, pages_done, total_pages):
+        if not self.search_hits:
+            self.search_status_label.config(text=f"Indexing text... {pages_done} / {total_pages} pages")
+
+    def on_search_index_done(self):
+        self.search_indexer = None
+        if not self.search_hits:
+            self.search_status_label.config(text="")
+
+    def on_search_index_error(self, error):
+        self.search_indexer = None
+        self.search_status_label.config(text=f"Text indexing failed: {error}")
+
+    def run_search(self):
+        if not self.search_index:
+            return
+
+        query = self.search_var.get().strip()
+        if not query:
+            self.clear_search()
+            return
+
+        self.search_hits = self.search_index.search(query)
+        self.search_hit_index = 0
+        if not self.search_hits:
+            self.search_status_label.config(text="No matches")
+            self.draw_search_hits()
+            return
+        self.show_search_hit()
+
+    def step_search_hit(self, step):
+        if self.search_hits:
+            self.search_hit_index = (self.search_hit_index + step) % len(self.search_hits)
+            self.show_search_hit()
+
+    def show_search_hit(self):
+        hit = self.search_hits[self.search_hit_index]
+        text = f"Match {self.search_hit_index + 1} of {len(self.search_hits)} pages"
+        if not self.search_index.complete:
+            text += f" (indexed {self.search_index.indexed_pages} / {self.search_index.page_count})"
+        self.search_status_label.config(text=text)
+
+        if hit.page_num != self.current_page:
+            self.save_current_notes()
+            self.show_page(hit.page_num)
+        else:
+            self.draw_search_hits()
+
+    def clear_search(self):
+        self.search_hits = []
+        self.search_hit_index = 0
+        self.search_status_label.config(text="")
+        self.pdf_canvas.delete("search_hit")
+
+    def draw_search_hits(self):
+        """Outline the words of the current page that match the search"""
+        self.pdf_canvas.delete("search_hit")
+        hit = next((hit for hit in self.search_hits if hit.page_num == self.current_page), None)
+        if not hit:
+            return
+
+        zoom = self.zoom_level
+        left, top = 0, 0
+        if self.continuous_layout:
+            left, top = self.continuous_layout.bounds(hit.page_num)[:2]
+        for x0, y0, x1, y1 in self.search_index.hit_rects(hit):
+            self.pdf_canvas.create_rectangle(left + x0 * zoom - 1, top + y0 * zoom - 1,
+                                             left + x1 * zoom + 1, top + y1 * zoom + 1,
+                                             outline="#f39c12", width=2, tags="search_hit")
+
+    def on_render_error(self, error):
+        self.update_status(f"Failed to render page: {error}", "red")
 
     def prev_page(self):
         if self.current_page > 0:
@@ -1103,16 +2283,18 @@ your reading statistics. All data is stored locally on your computer."""
         if not hasattr(self, 'doc'):
             return
 
+        # Pending formatting would land in the wrong place once the text moves
+        self.finish_tag_load()
         self.notes_modified = True
         self.update_save_status(False)
-        self.record_usage()
+        self.usage_tracker.keystroke()
 
         # Cancel previous auto-save
         if self.auto_save_id:
             self.root.after_cancel(self.auto_save_id)
 
-        # Schedule auto-save after 2 seconds of inactivity
-        self.auto_save_id = self.root.after(2000, self.auto_save_notes)
+        # Schedule auto-save after a few seconds of inactivity
+        self.auto_save_id = self.root.after(int(self.auto_save_delay * 1000), self.auto_save_notes)
 
     def auto_save_notes(self):
         if self.notes_modified and hasattr(self, 'doc'):
@@ -1122,8 +2304,13 @@ your reading statistics. All data is stored locally on your computer."""
         if not hasattr(self, 'doc') or not self.notes_modified:
             return
 
-        current_notes = self.notes_text.get(1.0, tk.END).strip()
-        self.current_notes[str(self.current_page)] = current_notes
+        self.finish_tag_load()
+        # A plain string, or the text with its formatting runs when it has any
+        current_notes = read_widget(self.notes_text)
+        if current_notes:
+            self.current_notes[str(self.current_page)] = current_notes
+        else:
+            self.current_notes.pop(str(self.current_page), None)
 
         self.notes_modified = False
         self.update_save_status(True)
@@ -1131,9 +2318,22 @@ your reading statistics. All data is stored locally on your computer."""
         if not silent:
             self.update_status("Notes auto-saved", "green")
 
-        # Save to file if we have a path
+        # Journal just this page, the whole file is only rewritten when the journal is compacted
         if hasattr(self, 'notes_file_path'):
-            self.save_notes(silent=True)
+            try:
+                self.notes_journal.append(str(self.current_page), current_notes)
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to save notes: {str(e)}")
+                return
+            if self.notes_journal.needs_compaction():
+                self.save_notes(silent=True)
+
+        try:
+            self.notes_index.update_page(self.current_book_path, self.current_page, current_notes,
+                                         getattr(self, 'notes_file_path', None))
+        except sqlite3.Error:
+            # The index only helps searching, saving the notes already succeeded
+            pass
 
     def save_notes_as(self):
         if not hasattr(self, 'doc'):
@@ -1149,9 +2349,12 @@ your reading statistics. All data is stored locally on your computer."""
         )
 
         if file_path:
+            self.close_notes_file()
             self.notes_file_path = file_path
+            self.notes_journal = NotesJournal(file_path)
             self.save_notes()
 
+    @perf.timed("save_notes")
     def save_notes(self, silent=False):
         if not hasattr(self, 'doc'):
             return
@@ -1159,15 +2362,21 @@ your reading statistics. All data is stored locally on your computer."""
         data = {
             'title': self.book_title,
             'book_path': self.current_book_path,
-            'notes': self.current_notes,
+            'notes': {page: notes for page, notes in self.current_notes.items() if notes},
             'last_page': self.current_page,
             'last_saved': datetime.now().isoformat(),
             'zoom_level': self.zoom_level
         }
 
         try:
-            with open(self.notes_file_path, 'w') as f:
-                json.dump(data, f, indent=2)
+            # Written atomically, then the journal it supersedes is dropped
+            atomic_write_json(self.notes_file_path, data, indent=2)
+            self.notes_journal.reset()
+            self.last_compaction = time.monotonic()
+            try:
+                self.notes_index.update_source(self.current_book_path, self.notes_file_path)
+            except sqlite3.Error:
+                pass
 
             if not silent:
                 messagebox.showinfo("Success", "Notes saved successfully!")
@@ -1176,6 +2385,162 @@ your reading statistics. All data is stored locally on your computer."""
         except Exception as e:
             messagebox.showerror("Error", f"Failed to save notes: {str(e)}")
 
+    # Search across all notes
+    def index_notes_file(self, file_path):
+        try:
+            self.notes_index.index_notes_file(file_path)
+        except (OSError, ValueError, sqlite3.Error):
+            pass
+
+    def show_notes_search(self):
+        if self.notes_search_window and self.notes_search_window.window.winfo_exists():
+            self.notes_search_window.window.lift()
+            return
+        self.notes_search_window = NotesSearchWindow(self.root, self.notes_index, self.open_notes_search_result)
+
+    def open_notes_search_result(self, book, page_num, source):
+        if hasattr(self, 'doc') and book == book_key(self.current_book_path):
+            self.save_current_notes()
+            self.show_page(page_num)
+        elif source and os.path.exists(source):
+            self.load_notes_file(source, page_num)
+        elif os.path.exists(book):
+            self.open_book(book, page_num)
+        else:
+            messagebox.showwarning("Warning", f"The book could not be found:\n{book}")
+
+    def import_notes_to_library(self):
+        if not self.notes_store:
+            messagebox.showinfo("Notes Library", "Turn on the notes library in Settings first.")
+            return
+
+        file_path = filedialog.askopenfilename(
+            title="Import Notes into Library",
+            filetypes=[("JSON files", "*.json"), ("All files", "*.*")]
+        )
+        if not file_path:
+            return
+
+        try:
+            book, count = self.notes_store.import_json(file_path)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to import notes: {str(e)}")
+            return
+
+        # Pick up the imported pages if they belong to the book being read
+        if (self.current_notes.store is self.notes_store
+                and SqliteNotesStore.book_key(book) == SqliteNotesStore.book_key(self.current_book_path)):
+            self.current_notes = PageNotes(self.notes_store, self.current_book_path)
+            self.reset_notes_editors()
+            self.load_page_notes(self.current_page)
+        self.update_status(f"Imported notes for {count} pages", "green")
+
+    def export_notes_from_library(self):
+        if not self.notes_store or not hasattr(self, 'doc'):
+            messagebox.showwarning("Warning", "Open a book with the notes library turned on first.")
+            return
+
+        self.save_current_notes(silent=True)
+        file_path = filedialog.asksaveasfilename(
+            title="Export Notes from Library",
+            defaultextension=".json",
+            filetypes=[("JSON files", "*.json"), ("All files", "*.*")]
+        )
+        if not file_path:
+            return
+
+        try:
+            count = self.notes_store.export_json(self.current_book_path, file_path, title=self.book_title,
+                                                 last_page=self.current_page, zoom_level=self.zoom_level)
+            self.update_status(f"Exported notes for {count} pages", "green")
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to export notes: {str(e)}")
+
+    def export_notes(self):
+        if not hasattr(self, 'doc'):
+            messagebox.showwarning("Warning", "Please open a PDF book first.")
+            return
+        if self.notes_export:
+            messagebox.showinfo("Export", "An export is already running.")
+            return
+
+        self.save_current_notes(silent=True)
+        file_path = filedialog.asksaveasfilename(
+            title="Export Notes",
+            defaultextension=".md",
+            initialfile=f"{self.book_title} notes",
+            filetypes=[("Markdown", "*.md"), ("HTML", "*.html"), ("PDF with notes attached", "*.pdf")]
+        )
+        if not file_path:
+            return
+        if os.path.splitext(file_path)[1].lower() not in FORMATS:
+            messagebox.showerror("Error", "Notes can be exported as .md, .html or .pdf files.")
+            return
+        if os.path.abspath(file_path) == os.path.abspath(self.current_book_path):
+            messagebox.showerror("Error", "Choose a different file than the book itself.")
+            return
+
+        # Only the page numbers are listed up front, each page's notes are read as the export reaches it
+        # Bound here, the export keeps reading this book's notes if another book is opened meanwhile
+        book_notes = self.current_notes
+        pages = sorted((page for page in book_notes if page.isdigit()), key=int)
+        self.notes_export = NotesExport(
+            self.root, file_path, self.book_title, self.current_book_path,
+            ((int(page), note) for page, note in book_notes.stream(pages)), len(pages),
+            self.on_export_progress, self.on_export_done, self.on_export_error)
+        try:
+            self.notes_export.start()
+        except Exception as e:
+            self.notes_export.abort()
+            self.notes_export = None
+            messagebox.showerror("Error", f"Failed to export notes: {str(e)}")
+            return
+
+        self.progress_var.set(0)
+        self.export_cancel_btn.pack(side=tk.TOP, pady=2)
+        self.status_label.config(text="Exporting notes...", foreground="#3498db")
+
+    def on_export_progress(self, done, total):
+        self.progress_var.set(done / total * 100 if total else 100)
+        if done == total and self.notes_export.format == "pdf":
+            text = "Exporting notes... saving the PDF"
+        else:
+            text = f"Exporting notes... {done} / {total} pages"
+        self.status_label.config(text=text, foreground="#3498db")
+
+    def on_export_done(self, count):
+        file_path = self.notes_export.file_path
+        self.finish_notes_export()
+        self.update_status(f"Exported notes to {os.path.basename(file_path)}", "green")
+
+    def on_export_error(self, error):
+        self.finish_notes_export()
+        self.update_status("Export failed", "red")
+        messagebox.showerror("Error", f"Failed to export notes: {str(error)}")
+
+    def cancel_notes_export(self):
+        if self.notes_export:
+            self.notes_export.cancel()
+            self.finish_notes_export()
+            self.update_status("Export cancelled", "orange")
+
+    def finish_notes_export(self):
+        """Hand the progress bar back to reading progress"""
+        self.notes_export = None
+        self.export_cancel_btn.pack_forget()
+        if hasattr(self, 'doc'):
+            self.update_page_labels(self.current_page)
+        else:
+            self.progress_var.set(0)
+
+    def close_notes_file(self):
+        """Fold the journal into the notes file and stop saving to it"""
+        if hasattr(self, 'notes_file_path'):
+            if self.notes_journal.entries:
+                self.save_notes(silent=True)
+            del self.notes_file_path
+            self.notes_journal = None
+
     def setup_auto_save(self):
         # Periodic backup save every 60 seconds
         self.root.after(60000, self.periodic_auto_save)
@@ -1183,85 +2548,66 @@ your reading statistics. All data is stored locally on your computer."""
     def periodic_auto_save(self):
         if hasattr(self, 'doc') and self.notes_modified:
             self.save_current_notes(silent=True)
+
+        # Compact the journal now and then so it never grows large
+        if (hasattr(self, 'notes_file_path') and self.notes_journal.entries
+                and time.monotonic() - self.last_compaction >= self.compaction_interval):
+            self.save_notes(silent=True)
         self.root.after(60000, self.periodic_auto_save)
 
+    @perf.timed("record_usage")
     def record_usage(self):
-        today = datetime.now().strftime("%Y-%m-%d")
-        if today not in self.usage_data:
-            self.usage_data[today] = 0
-        self.usage_data[today] += 1
-        self.save_usage_data()
+        self.usage_tracker.record()
 
         if self.current_view == "calendar":
             self.update_stats()
 
-    def load_usage_data(self):
-        try:
-            data_dir = "data"
-            if not os.path.exists(data_dir):
-                os.makedirs(data_dir)
-            usage_file = os.path.join(data_dir, "usage_data.json")
-            if os.path.exists(usage_file):
-                with open(usage_file, 'r') as f:
-                    return json.load(f)
-        except:
-            pass
-        return {}
-
-    def save_usage_data(self):
-        try:
-            data_dir = "data"
-            if not os.path.exists(data_dir):
-                os.makedirs(data_dir)
-            usage_file = os.path.join(data_dir, "usage_data.json")
-            with open(usage_file, 'w') as f:
-                json.dump(self.usage_data, f, indent=2)
-        except:
-            pass
-
-    def load_app_state(self):
-        try:
-            data_dir = "data"
-            if not os.path.exists(data_dir):
-                os.makedirs(data_dir)
-            state_file = os.path.join(data_dir, "app_state.json")
-            if os.path.exists(state_file):
-                with open(state_file, 'r') as f:
-                    return json.load(f)
-        except:
-            pass
-        return {}
-
+    @perf.timed("save_app_state")
     def save_app_state(self):
-        try:
-            data_dir = "data"
-            if not os.path.exists(data_dir):
-                os.makedirs(data_dir)
-            state_file = os.path.join(data_dir, "app_state.json")
-            state = {
-                'last_book_path': self.current_book_path,
-                'last_page': self.current_page,
-                'zoom_level': self.zoom_level,
-                'dark_mode': self.dark_mode,
-                'last_saved': datetime.now().isoformat()
-            }
-            with open(state_file, 'w') as f:
-                json.dump(state, f, indent=2)
-        except:
-            pass
+        # Cheap enough for every page turn, the file itself is written at most every couple of seconds
+        self.app_state.update({
+            'last_book_path': self.current_book_path,
+            'last_page': self.current_page,
+            'zoom_level': self.zoom_level,
+            'dark_mode': self.dark_mode,
+            'page_cache_mb': self.page_cache_mb,
+            'tiled_rendering': self.tiled_rendering,
+            'continuous_scroll': self.continuous_mode,
+            'show_thumbnails': self.show_thumbnails,
+            'notes_library': self.notes_store is not None,
+            'font_family': self.current_font_family,
+            'font_size': self.current_font_size,
+            'auto_save_delay': self.auto_save_delay,
+            'show_navigation': self.show_navigation,
+            'perf_overlay': perf.recorder.enabled
+        })
 
     def cleanup_and_exit(self):
+        # An unfinished export leaves no partial file behind
+        if self.notes_export:
+            self.notes_export.cancel()
         # Save everything before exiting
         if hasattr(self, 'doc'):
             self.save_current_notes(silent=True)
+            self.close_notes_file()
             self.save_app_state()
-            self.doc.close()
+        self.thumbnail_strip.close()
+        # A failed write is reported, it must not keep the app from exiting
+        stores = ((self.annotation_store, "annotations"), (self.mark_store, "bookmarks and highlights"))
+        for store, contents in stores:
+            if store:
+                try:
+                    store.close()
+                except OSError as e:
+                    messagebox.showerror("Error", f"Failed to save {contents}: {str(e)}")
+        self.usage_tracker.close()
+        self.app_state.flush()
+        self.render_engine.shutdown()
+        if self.notes_store:
+            self.notes_store.close()
+        self.notes_index.close()
         self.root.quit()
 
-    def __del__(self):
-        if hasattr(self, 'doc'):
-            self.doc.close()
-
 
 def main():
     root = tk.Tk()
@@ -1274,4 +2620,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # Needed by the render worker processes in the frozen build
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
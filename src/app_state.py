@@ -0,0 +1,52 @@
+"""
+Application state kept in memory and written to data/app_state.json at most once per interval
+"""
+
+import json
+import os
+from datetime import datetime
+
+from fileio import atomic_write_json
+
+STATE_PATH = os.path.join("data", "app_state.json")
+
+
+class AppState:
+    """Last book, page and settings, persisted in the background as they change"""
+
+    def __init__(self, root, state_path=STATE_PATH, write_interval=2000):
+        self.root = root
+        self.state_path = state_path
+        self.write_interval = write_interval
+        self.write_id = None
+
+        try:
+            with open(state_path, 'r') as f:
+                self.state = json.load(f)
+        except (OSError, ValueError):
+            self.state = {}
+
+    def get(self, key, default=None):
+        return self.state.get(key, default)
+
+    def update(self, values):
+        """Record new values, the file is written once the interval has passed"""
+        changed = any(self.state.get(key) != value for key, value in values.items())
+        if not changed:
+            return
+        self.state.update(values)
+        if self.write_id is None:
+            self.write_id = self.root.after(self.write_interval, self.flush)
+
+    def flush(self):
+        """Write pending changes now, also called on exit"""
+        if self.write_id is None:
+            return
+        self.root.after_cancel(self.write_id)
+        self.write_id = None
+
+        self.state['last_saved'] = datetime.now().isoformat()
+        try:
+            atomic_write_json(self.state_path, self.state, indent=2)
+        except OSError:
+            pass
@@ -0,0 +1,68 @@
+"""
+Per-book JSON files of user data, such as annotations and marks
+
+Each store keeps one book's items in memory with ids that are never reused,
+so they stay stable across saves and deletions, and writes them back a
+moment after a change rather than on every one.
+"""
+
+import json
+from abc import ABC, abstractmethod
+
+from fileio import atomic_write_json, book_data_path
+
+
+class BookDataStore(ABC):
+    """Base of the per-book stores, subclasses keep their own indexes and say how items map to JSON"""
+
+    # Name of the item list in the file
+    items_key = "items"
+
+    def __init__(self, root, book_path, directory, write_interval=2000):
+        self.root = root
+        self.write_interval = write_interval
+        self.path = book_data_path(directory, book_path)
+        self.book_path = book_path
+        self.next_id = 1
+        self.write_id = None
+
+    def load(self):
+        """Read the saved items, a missing or damaged file is an empty store"""
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        ids = [self.insert_json(entry) for entry in data.get(self.items_key, [])]
+        self.next_id = max(data.get('next_id', 1), max(ids, default=0) + 1)
+
+    @abstractmethod
+    def insert_json(self, entry):
+        """Index one saved item, returns its id"""
+
+    @abstractmethod
+    def items_json(self):
+        """Every item as saved to the file"""
+
+    def new_id(self):
+        item_id = self.next_id
+        self.next_id += 1
+        return item_id
+
+    def schedule_write(self):
+        if self.write_id is None:
+            self.write_id = self.root.after(self.write_interval, self.flush)
+
+    def flush(self):
+        if self.write_id is not None:
+            self.root.after_cancel(self.write_id)
+            self.write_id = None
+        atomic_write_json(self.path, {
+            'book_path': self.book_path,
+            'next_id': self.next_id,
+            self.items_key: self.items_json()
+        })
+
+    def close(self):
+        if self.write_id is not None:
+            self.flush()
@@ -0,0 +1,202 @@
+"""
+Reading calendar views drawn on a single canvas each
+
+The canvas items are created once and only re-coloured and re-labelled as the
+user moves between months or years, so paging through years of history
+creates no widgets at all.
+"""
+
+import calendar
+import tkinter as tk
+from datetime import date, timedelta
+
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+LIGHT_COLORS = {
+    'bg': "#ffffff", 'cell': "#ecf0f1", 'fg': "#2c3e50", 'border': "#bdc3c7",
+    'used': "#d4edda", 'used_fg': "green", 'muted': "#7f8c8d",
+    'levels': ["#ebedf0", "#c6e48b", "#7bc96f", "#239a3b", "#196127"],
+}
+DARK_COLORS = {
+    'bg': "#2c3e50", 'cell': "#34495e", 'fg': "#ecf0f1", 'border': "#7f8c8d",
+    'used': "#155724", 'used_fg': "#7CFC00", 'muted': "#95a5a6",
+    'levels': ["#3d566e", "#0e4429", "#006d32", "#26a641", "#39d353"],
+}
+
+
+class MonthCalendar:
+    """A month as a 6x7 grid of day cells, laid out to fill the canvas"""
+
+    HEADER_HEIGHT = 28
+    PAD = 2
+
+    def __init__(self, parent):
+        self.canvas = tk.Canvas(parent, highlightthickness=0)
+        self.weeks = 6
+
+        self.headers = [self.canvas.create_text(0, 0, text=name, font=("Segoe UI", 10, "bold"))
+                        for name in WEEKDAYS]
+        # (rectangle, day number, usage mark) for each of the 42 cells
+        self.cells = []
+        for _ in range(6 * 7):
+            rect = self.canvas.create_rectangle(0, 0, 0, 0, width=1)
+            day = self.canvas.create_text(0, 0, anchor=tk.NW, font=("Segoe UI", 10, "bold"))
+            mark = self.canvas.create_text(0, 0, anchor=tk.NE, font=("Segoe UI", 9))
+            self.cells.append((rect, day, mark))
+
+        self.canvas.bind("<Configure>", lambda e: self.layout())
+
+    def layout(self):
+        """Position the cells for the canvas size and the number of weeks shown"""
+        width = self.canvas.winfo_width()
+        height = self.canvas.winfo_height()
+        cell_width = width / 7
+        cell_height = max(1, height - self.HEADER_HEIGHT) / self.weeks
+
+        for column, header in enumerate(self.headers):
+            self.canvas.coords(header, (column + 0.5) * cell_width, self.HEADER_HEIGHT / 2)
+        for index, (rect, day, mark) in enumerate(self.cells):
+            row, column = divmod(index, 7)
+            x0 = column * cell_width + self.PAD
+            y0 = self.HEADER_HEIGHT + row * cell_height + self.PAD
+            x1 = (column + 1) * cell_width - self.PAD
+            y1 = self.HEADER_HEIGHT + (row + 1) * cell_height - self.PAD
+            self.canvas.coords(rect, x0, y0, x1, y1)
+            self.canvas.coords(day, x0 + 5, y0 + 5)
+            self.canvas.coords(mark, x1 - 5, y0 + 5)
+
+    def show(self, year, month, usage, colors):
+        """Fill in a month, usage maps "YYYY-MM-DD" to that day's activity count"""
+        weeks = calendar.monthcalendar(year, month)
+        days = [day for week in weeks for day in week]
+        days += [0] * (len(self.cells) - len(days))
+
+        self.canvas.config(bg=colors['bg'])
+        for header in self.headers:
+            self.canvas.itemconfig(header, fill=colors['fg'])
+
+        for (rect, day_item, mark), day in zip(self.cells, days):
+            if day == 0:
+                self.canvas.itemconfig(rect, state="hidden")
+                self.canvas.itemconfig(day_item, state="hidden")
+                self.canvas.itemconfig(mark, state="hidden")
+                continue
+
+            count = usage.get(f"{year}-{month:02d}-{day:02d}")
+            self.canvas.itemconfig(rect, state="normal", outline=colors['border'],
+                                   fill=colors['used'] if count else colors['cell'])
+            self.canvas.itemconfig(day_item, state="normal", text=str(day), fill=colors['fg'])
+            if count:
+                self.canvas.itemconfig(mark, state="normal", text="✓" if count == 1 else f"{count}✓",
+                                       fill=colors['used_fg'])
+            else:
+                self.canvas.itemconfig(mark, state="hidden")
+
+        if len(weeks) != self.weeks:
+            self.weeks = len(weeks)
+            self.layout()
+
+
+class YearHeatmap:
+    """A year of daily activity as columns of weeks, darker squares for busier days"""
+
+    CELL = 14
+    GAP = 3
+    LEFT = 36
+    TOP = 24
+
+    def __init__(self, parent):
+        step = self.CELL + self.GAP
+        self.canvas = tk.Canvas(parent, highlightthickness=0, width=self.LEFT + 54 * step + 20,
+                                height=self.TOP + 7 * step + 32)
+        self.year = None
+        self.usage = {}
+        self.first_offset = 0
+
+        for row, name in enumerate(WEEKDAYS):
+            if row % 2 == 0:
+                self.canvas.create_text(self.LEFT - 6, self.TOP + row * step + self.CELL / 2, anchor=tk.E,
+                                        text=name, font=("Segoe UI", 8), tags="label")
+        self.month_labels = [self.canvas.create_text(0, self.TOP - 8, anchor=tk.W, font=("Segoe UI", 8),
+                                                     text=calendar.month_abbr[month], tags="label")
+                             for month in range(1, 13)]
+
+        # Column-major like the weeks they stand for: cell week * 7 + weekday
+        self.cells = []
+        for week in range(54):
+            for row in range(7):
+                x = self.LEFT + week * step
+                y = self.TOP + row * step
+                self.cells.append(self.canvas.create_rectangle(x, y, x + self.CELL, y + self.CELL, width=0))
+
+        bottom = self.TOP + 7 * step + 16
+        self.info = self.canvas.create_text(self.LEFT, bottom, anchor=tk.W, font=("Segoe UI", 9), tags="label")
+        self.legend = []
+        legend_x = self.LEFT + 54 * step - 5 * step
+        for level in range(5):
+            x = legend_x + level * step
+            self.legend.append(self.canvas.create_rectangle(x, bottom - self.CELL / 2, x + self.CELL,
+                                                            bottom + self.CELL / 2, width=0))
+        self.canvas.create_text(legend_x - 6, bottom, anchor=tk.E, text="Less", font=("Segoe UI", 8), tags="label")
+        self.canvas.create_text(legend_x + 5 * step + 2, bottom, anchor=tk.W, text="More", font=("Segoe UI", 8),
+                                tags="label")
+
+        self.canvas.bind("<Motion>", self.on_motion)
+        self.canvas.bind("<Leave>", lambda e: self.canvas.itemconfig(self.info, text=self.summary()))
+
+    def show(self, year, usage, colors):
+        """Colour every day of a year in one pass over the existing squares"""
+        self.year = year
+        self.usage = usage
+        first = date(year, 1, 1)
+        self.first_offset = first.weekday()
+        days_in_year = 366 if calendar.isleap(year) else 365
+
+        counts = [usage.get((first + timedelta(days=day)).isoformat(), 0) for day in range(days_in_year)]
+        busiest = max(counts) or 1
+        levels = colors['levels']
+
+        self.canvas.config(bg=colors['bg'])
+        self.canvas.itemconfig("label", fill=colors['muted'])
+        for index, cell in enumerate(self.cells):
+            day = index - self.first_offset
+            if 0 <= day < days_in_year:
+                count = counts[day]
+                # Scaled to the year's busiest day, any activity at all gets at least the lightest shade
+                level = 0 if not count else max(1, min(4, -(-4 * count // busiest)))
+                self.canvas.itemconfig(cell, state="normal", fill=levels[level])
+            else:
+                self.canvas.itemconfig(cell, state="hidden")
+        for level, item in enumerate(self.legend):
+            self.canvas.itemconfig(item, fill=levels[level])
+
+        step = self.CELL + self.GAP
+        for month, label in enumerate(self.month_labels, start=1):
+            week = (date(year, month, 1).toordinal() - first.toordinal() + self.first_offset) // 7
+            self.canvas.coords(label, self.LEFT + week * step, self.TOP - 8)
+        self.canvas.itemconfig(self.info, text=self.summary())
+
+    def summary(self):
+        if self.year is None:
+            return ""
+        prefix = f"{self.year}-"
+        active = [count for day, count in self.usage.items() if day.startswith(prefix)]
+        return f"{len(active)} active days in {self.year}, {sum(active)} activities"
+
+    def on_motion(self, event):
+        """Describe the day under the pointer, found from its position rather than an item lookup"""
+        step = self.CELL + self.GAP
+        week, x = divmod(event.x - self.LEFT, step)
+        row, y = divmod(event.y - self.TOP, step)
+        if self.year is None or not (0 <= week < 54 and 0 <= row < 7) or x >= self.CELL or y >= self.CELL:
+            text = self.summary()
+        else:
+            first = date(self.year, 1, 1)
+            day = first + timedelta(days=week * 7 + row - self.first_offset)
+            if day.year != self.year:
+                text = self.summary()
+            else:
+                count = self.usage.get(day.isoformat(), 0)
+                text = f"{day.strftime('%a %d %B %Y')}: {count} activities" if count else \
+                    f"{day.strftime('%a %d %B %Y')}: no reading"
+        self.canvas.itemconfig(self.info, text=text)
@@ -0,0 +1,279 @@
+"""
+Streaming export of a book's notes to Markdown, HTML or an annotated copy of the PDF
+
+Pages are pulled one at a time from a (page, note) iterator and written out as
+they come, a time slice per Tk idle moment, so exporting thousands of pages
+neither holds them all in memory nor freezes the window. For a PDF the notes
+are spooled to a file the same way, then a separate process opens the book,
+attaches them and saves the copy. Output goes to a temporary file that only
+replaces the destination once the export finished.
+"""
+
+import html
+import json
+import multiprocessing
+import os
+import re
+import time
+
+from rich_text import decode_runs, note_tags, plain_text
+
+FORMATS = {".md": "markdown", ".markdown": "markdown", ".html": "html", ".htm": "html", ".pdf": "pdf"}
+
+MARKDOWN_SPECIAL = re.compile(r"([\\`*_<\[\]])")
+# Characters that start a heading, quote, list or rule when they begin a line, and numbered list items
+MARKDOWN_LINE_START = re.compile(r"(?m)^(\s*)([#>+=-])")
+MARKDOWN_NUMBERED = re.compile(r"(?m)^(\s*\d+)([.)])")
+# A single newline between two lines of text, which Markdown would join into one line
+MARKDOWN_SOFT_BREAK = re.compile(r"(?<=\S)[ \t]*\n(?=[ \t]*\S)")
+HTML_TAGS = {
+    'bold': ("<strong>", "</strong>"),
+    'italic': ("<em>", "</em>"),
+    'underline': ("<u>", "</u>"),
+    'heading1': ('<span class="h1">', "</span>"),
+    'heading2': ('<span class="h2">', "</span>"),
+    'heading3': ('<span class="h3">', "</span>"),
+    'color': ('<span class="color">', "</span>"),
+    'highlight': ("<mark>", "</mark>"),
+}
+# Markdown has no underline, colour or inline heading, those runs are written as bold or left plain
+MARKDOWN_TAGS = {'bold': "**", 'heading1': "**", 'heading2': "**", 'heading3': "**", 'italic': "*"}
+
+
+def format_for(file_path):
+    return FORMATS.get(os.path.splitext(file_path)[1].lower())
+
+
+def segments(note):
+    """(text, tags) pieces of a note split wherever a formatting run starts or ends, linear in the runs"""
+    text = plain_text(note)
+    tags = note_tags(note)
+    if not tags:
+        yield text, ()
+        return
+
+    boundaries = {0, len(text)}
+    runs = []
+    for tag, encoded in tags.items():
+        for start, end in decode_runs(encoded):
+            runs.append((start, end, tag))
+            boundaries.update((start, end))
+    edges = sorted(boundaries)
+    # Runs of a tag never overlap, so each piece's tags are those whose run covers its start
+    starts = {}
+    for start, end, tag in runs:
+        starts.setdefault(start, []).append((end, tag))
+    active = []
+    for start, end in zip(edges, edges[1:]):
+        active = [(run_end, tag) for run_end, tag in active if run_end > start] + starts.get(start, [])
+        yield text[start:end], tuple(sorted(tag for _, tag in active))
+
+
+def markdown_escape(text):
+    text = MARKDOWN_SPECIAL.sub(r"\\\1", text)
+    text = MARKDOWN_LINE_START.sub(r"\1\\\2", text)
+    return MARKDOWN_NUMBERED.sub(r"\1\\\2", text)
+
+
+def markdown_note(note):
+    parts = []
+    for text, tags in segments(note):
+        escaped = markdown_escape(text)
+        markers = []
+        for tag in tags:
+            marker = MARKDOWN_TAGS.get(tag)
+            if marker and marker not in markers:
+                markers.append(marker)
+        stripped = escaped.strip()
+        if markers and stripped:
+            # Emphasis markers must hug the text, surrounding whitespace stays outside them
+            lead = escaped[:len(escaped) - len(escaped.lstrip())]
+            trail = escaped[len(escaped.rstrip()):]
+            opening = "".join(markers)
+            escaped = lead + opening + stripped + opening[::-1] + trail
+        parts.append(escaped)
+    # Lines of a note stay lines, blank lines between them already make paragraphs
+    return MARKDOWN_SOFT_BREAK.sub("\\\\\n", "".join(parts))
+
+
+def html_note(note):
+    parts = []
+    for text, tags in segments(note):
+        escaped = html.escape(text)
+        for tag in tags:
+            opening, closing = HTML_TAGS.get(tag, ("", ""))
+            escaped = opening + escaped + closing
+        parts.append(escaped)
+    return "".join(parts)
+
+
+class MarkdownWriter:
+    def __init__(self, output, title, book_path):
+        self.output = output
+        self.output.write(f"# {markdown_escape(title)}\n\nNotes on {markdown_escape(book_path)}\n")
+
+    def write_page(self, page_num, note):
+        self.output.write(f"\n## Page {page_num + 1}\n\n{markdown_note(note)}\n")
+
+    def finish(self):
+        pass
+
+
+class HtmlWriter:
+    def __init__(self, output, title, book_path):
+        self.output = output
+        self.output.write(
+            "<!DOCTYPE html>\n<html>\n<head>\n<meta charset=\"utf-8\">\n"
+            f"<title>{html.escape(title)}</title>\n"
+            "<style>\n"
+            "body { font-family: 'Segoe UI', sans-serif; max-width: 50em; margin: 2em auto; color: #2c3e50; }\n"
+            ".note { white-space: pre-wrap; line-height: 1.5; }\n"
+            ".h1 { font-size: 1.6em; font-weight: bold; } .h2 { font-size: 1.4em; font-weight: bold; }\n"
+            ".h3 { font-size: 1.2em; font-weight: bold; color: #7f8c8d; } mark { background: #ffff00; }\n"
+            "</style>\n</head>\n<body>\n"
+            f"<h1>{html.escape(title)}</h1>\n<p>Notes on {html.escape(book_path)}</p>\n")
+
+    def write_page(self, page_num, note):
+        self.output.write(f"<section>\n<h2>Page {page_num + 1}</h2>\n"
+                          f"<div class=\"note\">{html_note(note)}</div>\n</section>\n")
+
+    def finish(self):
+        self.output.write("</body>\n</html>\n")
+
+
+class PdfWriter:
+    """Spools each page's notes as a JSON line, the annotated copy of the book is made from them by write_pdf"""
+
+    def __init__(self, output):
+        self.output = output
+
+    def write_page(self, page_num, note):
+        self.output.write(json.dumps([page_num, plain_text(note)]) + "\n")
+
+    def finish(self):
+        pass
+
+
+def write_pdf(book_path, spool_path, output_path, errors):
+    """Copy of the book with each spooled page's notes as a note annotation in its top left corner (runs in its
+    own process, MuPDF holds the GIL and saves the whole file in one call)"""
+    try:
+        import fitz  # PyMuPDF
+        with fitz.open(book_path) as doc, open(spool_path, 'r', encoding='utf-8') as spool:
+            for line in spool:
+                page_num, text = json.loads(line)
+                if page_num < len(doc):
+                    annotation = doc[page_num].add_text_annot((12, 12), text)
+                    annotation.set_info(title="Notes")
+                    annotation.update()
+            doc.save(output_path, garbage=1, deflate=True)
+    except Exception as e:
+        errors.put(str(e))
+        raise SystemExit(1)
+
+
+class NotesExport:
+    """Writes pages from an iterator a time slice at a time on the Tk thread, with progress and cancellation,
+    a PDF is then saved by write_pdf in its own process that root.after polls"""
+
+    def __init__(self, root, file_path, title, book_path, pages, total, on_progress, on_done, on_error,
+                 budget=0.015):
+        self.root = root
+        self.file_path = file_path
+        self.temp_path = file_path + ".tmp"
+        self.spool_path = file_path + ".notes.tmp"
+        self.format = format_for(file_path)
+        self.title = title
+        self.book_path = book_path
+        self.pages = pages
+        self.total = total
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.on_error = on_error
+        self.budget = budget
+        self.done = 0
+        self.output = None
+        self.writer = None
+        self.step_id = None
+        self.process = None
+        self.errors = None
+
+    def start(self):
+        if self.format == "pdf":
+            self.output = open(self.spool_path, 'w', encoding='utf-8')
+            self.writer = PdfWriter(self.output)
+        else:
+            self.output = open(self.temp_path, 'w', encoding='utf-8')
+            writer_class = MarkdownWriter if self.format == "markdown" else HtmlWriter
+            self.writer = writer_class(self.output, self.title, self.book_path)
+        self.step_id = self.root.after_idle(self.step)
+
+    def step(self):
+        self.step_id = None
+        deadline = time.perf_counter() + self.budget
+        try:
+            for page_num, note in self.pages:
+                if note:
+                    self.writer.write_page(page_num, note)
+                self.done += 1
+                if time.perf_counter() >= deadline:
+                    self.on_progress(self.done, self.total)
+                    self.step_id = self.root.after(1, self.step)
+                    return
+            self.writer.finish()
+            self.output.close()
+            if self.format == "pdf":
+                self.start_pdf()
+                return
+            os.replace(self.temp_path, self.file_path)
+        except Exception as e:
+            self.abort()
+            self.on_error(e)
+            return
+        self.on_done(self.done)
+
+    def start_pdf(self):
+        self.on_progress(self.done, self.total)
+        context = multiprocessing.get_context("spawn")
+        self.errors = context.SimpleQueue()
+        self.process = context.Process(target=write_pdf, daemon=True,
+                                       args=(self.book_path, self.spool_path, self.temp_path, self.errors))
+        self.process.start()
+        self.step_id = self.root.after(100, self.poll_pdf)
+
+    def poll_pdf(self):
+        self.step_id = None
+        if self.process.is_alive():
+            self.step_id = self.root.after(100, self.poll_pdf)
+            return
+
+        if self.process.exitcode == 0:
+            try:
+                os.replace(self.temp_path, self.file_path)
+                os.remove(self.spool_path)
+            except OSError as e:
+                self.abort()
+                self.on_error(e)
+                return
+            self.on_done(self.done)
+        else:
+            message = self.errors.get() if not self.errors.empty() else f"exit code {self.process.exitcode}"
+            self.abort()
+            self.on_error(RuntimeError(message))
+
+    def cancel(self):
+        if self.step_id:
+            self.root.after_cancel(self.step_id)
+            self.step_id = None
+        self.abort()
+
+    def abort(self):
+        """Drop the partial output, the destination is left as it was"""
+        if self.output:
+            self.output.close()
+        if self.process and self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        for path in (self.temp_path, self.spool_path):
+            if os.path.exists(path):
+                os.remove(path)
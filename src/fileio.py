@@ -0,0 +1,58 @@
+"""
+Crash-safe file helpers shared by everything that persists to data/
+"""
+
+import hashlib
+import json
+import os
+
+# Bytes hashed from each end of a PDF to tell apart files with equal size and mtime
+FINGERPRINT_SAMPLE = 1024 * 1024
+
+
+def atomic_write(file_path, data):
+    """Write bytes through a temp file, fsync and rename so readers never see a partial file"""
+    directory = os.path.dirname(file_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    temp_path = file_path + ".tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, file_path)
+
+
+def atomic_write_json(file_path, data, indent=None):
+    atomic_write(file_path, json.dumps(data, indent=indent).encode("utf-8"))
+
+
+def book_fingerprint(file_path):
+    """Identify a PDF by path, size, mtime and a hash of its first and last megabyte"""
+    stat = os.stat(file_path)
+    digest = hashlib.sha1(f"{os.path.abspath(file_path)}|{stat.st_size}|{stat.st_mtime_ns}".encode("utf-8"))
+    with open(file_path, 'rb') as f:
+        digest.update(f.read(FINGERPRINT_SAMPLE))
+        if stat.st_size > FINGERPRINT_SAMPLE:
+            f.seek(max(FINGERPRINT_SAMPLE, stat.st_size - FINGERPRINT_SAMPLE))
+            digest.update(f.read(FINGERPRINT_SAMPLE))
+    return digest.hexdigest()
+
+
+def book_data_path(directory, book_path, suffix=".json"):
+    """Per-book file of user data, keyed by the book's path so it survives the PDF being touched"""
+    key = hashlib.sha1(os.path.normcase(os.path.abspath(book_path)).encode("utf-8")).hexdigest()
+    return os.path.join(directory, key + suffix)
+
+
+def prune_cache_dir(cache_dir, keep, index_suffix, data_suffix):
+    """Keep the most recently used entries of a per-book cache, each an index file plus a data file"""
+    indexes = [os.path.join(cache_dir, name) for name in os.listdir(cache_dir) if name.endswith(index_suffix)]
+    indexes.sort(key=os.path.getmtime, reverse=True)
+    for index_path in indexes[keep:]:
+        for path in (index_path, index_path[:-len(index_suffix)] + data_suffix):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -3,7 +3,6 @@
 My Notes - Professional PDF Reader and a Note Taking Application
 """
 
-import tkinter as tk
 import os
 import sys
 
@@ -12,18 +11,30 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 if current_dir not in sys.path:
     sys.path.insert(0, current_dir)
 
-try:
-    from app import BookNoteTakingApp
-except ImportError as e:
-    print(f"Import error: {e}")
-    print("Available files in directory:")
-    for file in os.listdir(current_dir):
-        print(f"  - {file}")
-    input("Press Enter to exit...")
-    sys.exit(1)
+import startup_timing
+startup_timing.mark("start")
+
+import tkinter as tk
+import multiprocessing
+
+
+def import_app():
+    # Imported on demand so render worker processes, which re-run this module, don't load the UI
+    try:
+        from app import BookNoteTakingApp
+    except ImportError as e:
+        print(f"Import error: {e}")
+        print("Available files in directory:")
+        for file in os.listdir(current_dir):
+            print(f"  - {file}")
+        input("Press Enter to exit...")
+        sys.exit(1)
+    startup_timing.mark("imports")
+    return BookNoteTakingApp
 
 def main():
     """Main entry point for the application"""
+    BookNoteTakingApp = import_app()
     try:
         # Create data directory if it doesn't exist
         data_dir = "data"
@@ -40,6 +51,8 @@ def main():
 
         root = tk.Tk()
         app = BookNoteTakingApp(root)
+        startup_timing.mark("window_built")
+        root.after_idle(startup_timing.window_shown)
 
         # Handle window close event properly
         root.protocol("WM_DELETE_WINDOW", app.cleanup_and_exit)
@@ -52,4 +65,6 @@ def main():
         sys.exit(1)
 
 if __name__ == "__main__":
+    # Needed by the render worker processes in the frozen build
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
@@ -0,0 +1,88 @@
+"""
+Bookmarks and highlights in a book's notes, kept for the whole book
+
+Each mark points at a position in one page's notes. Marks have ids that are
+never reused, and are indexed both per page and book-wide so either listing,
+and any lookup by id, is a dict access. A book's marks are saved in
+data/marks/, one JSON file per book.
+"""
+
+import os
+
+from book_data import BookDataStore
+
+MARKS_DIR = os.path.join("data", "marks")
+KINDS = ("bookmark", "highlight")
+
+
+class Mark:
+    """A bookmark or highlight: a text index in the notes of a page, with a preview of the marked text"""
+
+    def __init__(self, mark_id, kind, page, position, text):
+        self.id = mark_id
+        self.kind = kind
+        self.page = page
+        self.position = position
+        self.text = text
+
+    def to_json(self):
+        return {'id': self.id, 'kind': self.kind, 'page': self.page, 'position': self.position, 'text': self.text}
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(data['id'], data['kind'], data['page'], data['position'], data['text'])
+
+
+class MarkStore(BookDataStore):
+    """Every mark of one book by id, by kind and by page, written back shortly after each change"""
+
+    items_key = 'marks'
+
+    def __init__(self, root, book_path, directory=MARKS_DIR, write_interval=2000):
+        super().__init__(root, book_path, directory, write_interval)
+        self.marks = {}  # id -> Mark
+        # Both in creation order: kind -> {id: Mark}, (kind, page) -> {id: Mark}
+        self.by_kind = {kind: {} for kind in KINDS}
+        self.by_page = {}
+        self.load()
+
+    def insert_json(self, entry):
+        mark = Mark.from_json(entry)
+        self._insert(mark)
+        return mark.id
+
+    def items_json(self):
+        return [mark.to_json() for mark in self.marks.values()]
+
+    def _insert(self, mark):
+        self.marks[mark.id] = mark
+        self.by_kind[mark.kind][mark.id] = mark
+        self.by_page.setdefault((mark.kind, mark.page), {})[mark.id] = mark
+
+    def add(self, kind, page, position, text):
+        mark = Mark(self.new_id(), kind, page, position, text)
+        self._insert(mark)
+        self.schedule_write()
+        return mark
+
+    def remove(self, mark_id):
+        mark = self.marks.pop(mark_id, None)
+        if mark is None:
+            return None
+        del self.by_kind[mark.kind][mark_id]
+        on_page = self.by_page[(mark.kind, mark.page)]
+        del on_page[mark_id]
+        if not on_page:
+            del self.by_page[(mark.kind, mark.page)]
+        self.schedule_write()
+        return mark
+
+    def get(self, mark_id):
+        return self.marks.get(mark_id)
+
+    def of_kind(self, kind):
+        """Book-wide listing, oldest first"""
+        return self.by_kind[kind].values()
+
+    def on_page(self, kind, page):
+        return self.by_page.get((kind, page), {}).values()
@@ -0,0 +1,100 @@
+"""
+Notes editors of recently visited pages, kept alive between page turns
+
+Each cached page keeps its own Text widget, so its text, formatting, scroll
+position, cursor and undo history survive flipping away and back without
+rebuilding anything. Memory is bounded by a character budget: the undo
+histories of the least recently used pages are dropped first, whole editors
+only after that.
+"""
+
+from collections import OrderedDict
+
+from rich_text import chars_between
+
+
+def text_length(widget):
+    """Characters in a Text widget, counted by Tk rather than by fetching the text"""
+    return chars_between(widget, "1.0", "end")
+
+
+class EditorCache:
+    """LRU of per-page Text widgets made by create_editor"""
+
+    def __init__(self, create_editor, max_editors=8, budget_chars=2000000):
+        self.create_editor = create_editor
+        self.max_editors = max_editors
+        self.budget_chars = budget_chars
+        self.editors = OrderedDict()  # key -> [widget, characters, keeps undo]
+        self.active = None
+        # One emptied editor is kept for the next page rather than destroyed
+        self.spare = None
+
+    def activate(self, key):
+        """The editor for key and whether it already holds that page"""
+        previous = self.editors.get(self.active)
+        if previous and self.active != key:
+            # Sized as it is left, typing on the active page costs nothing
+            previous[1] = text_length(previous[0])
+
+        entry = self.editors.get(key)
+        if entry:
+            self.editors.move_to_end(key)
+            widget = entry[0]
+        else:
+            widget = self.spare or self.create_editor()
+            self.spare = None
+            self.editors[key] = [widget, 0, True]
+        self.active = key
+        self.trim()
+        return widget, entry is not None
+
+    def discard_active(self):
+        """Drop the active page's editor, its contents no longer match the saved notes"""
+        entry = self.editors.pop(self.active, None)
+        self.active = None
+        if entry:
+            self.recycle(entry[0])
+
+    def clear(self):
+        active = self.editors.pop(self.active, None)
+        if active:
+            # Recycled first so the editor on screen becomes the spare
+            self.recycle(active[0])
+        for widget, _, _ in self.editors.values():
+            self.recycle(widget)
+        self.editors.clear()
+        self.active = None
+
+    def recycle(self, widget):
+        if self.spare is None:
+            widget.delete("1.0", "end")
+            widget.edit_reset()
+            self.spare = widget
+        else:
+            widget.destroy()
+
+    def used_chars(self):
+        # An undo history holds roughly another copy of what was typed
+        return sum(chars * 2 if undo else chars for _, chars, undo in self.editors.values())
+
+    def trim(self):
+        for key, entry in self.editors.items():
+            if self.used_chars() <= self.budget_chars:
+                break
+            if key != self.active and entry[2]:
+                entry[0].edit_reset()
+                entry[2] = False
+
+        while len(self.editors) > self.max_editors or self.used_chars() > self.budget_chars:
+            key = next((key for key in self.editors if key != self.active), None)
+            if key is None:
+                break
+            self.recycle(self.editors.pop(key)[0])
+
+    def widgets(self):
+        """Every live editor, for changes of theme, font or tag styles"""
+        widgets = [entry[0] for entry in self.editors.values()]
+        if self.spare is not None:
+            widgets.append(self.spare)
+        return widgets
@@ -0,0 +1,258 @@
+"""
+Search across the notes of every book, kept in a SQLite FTS5 index
+
+Pages are indexed one at a time as their notes are saved, so keeping the
+index current costs no more than the edit itself.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import time
+import tkinter as tk
+from tkinter import ttk, filedialog
+
+from notes_journal import NotesJournal
+from rich_text import plain_text
+
+NOTES_INDEX_PATH = os.path.join("data", "notes_index.db")
+
+# Quoted phrases, or single words with an optional trailing * for prefix matches
+QUERY_TOKEN_RE = re.compile(r'"([^"]*)"|(\S+)')
+WORD_RE = re.compile(r"\w+")
+
+
+def build_match_query(query):
+    """Turn what the user typed into an FTS5 query: words are AND-ed, "quoted text" is a phrase, word* a prefix"""
+    parts = []
+    for phrase, word in QUERY_TOKEN_RE.findall(query):
+        if phrase:
+            words = WORD_RE.findall(phrase)
+            if words:
+                parts.append('"' + " ".join(words) + '"')
+        else:
+            words = WORD_RE.findall(word)
+            if words:
+                suffix = "*" if word.endswith("*") else ""
+                parts.append('"' + " ".join(words) + '"' + suffix)
+    return " AND ".join(parts)
+
+
+def book_key(path):
+    """How a book or notes file is identified in the index, the same file under another spelling is one key"""
+    return os.path.normcase(os.path.abspath(path))
+
+
+class NotesIndex:
+    """Full-text index of (book, page) notes with the file each book's notes are saved in"""
+
+    def __init__(self, db_path=NOTES_INDEX_PATH):
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.connection = sqlite3.connect(db_path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        with self.connection:
+            self.connection.execute("""
+                CREATE TABLE IF NOT EXISTS pages (
+                    id INTEGER PRIMARY KEY,
+                    book TEXT NOT NULL,
+                    page INTEGER NOT NULL,
+                    UNIQUE (book, page)
+                )""")
+            self.connection.execute("""
+                CREATE TABLE IF NOT EXISTS books (
+                    book TEXT PRIMARY KEY,
+                    source TEXT,
+                    signature TEXT
+                )""")
+            # The FTS rowid is pages.id, so a page is replaced without scanning the index
+            self.connection.execute("CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5(notes)")
+
+    def update_page(self, book, page, notes, source=None):
+        """Re-index one page after its notes were saved"""
+        # One transaction, so a search never sees the page dropped but not yet re-added
+        with self.connection:
+            self._put_page(book_key(book), int(page), notes)
+            self._put_source(book, source)
+
+    def update_source(self, book, source):
+        """Record where a book's notes are saved, as of now, so reopening that file needn't re-index it"""
+        with self.connection:
+            self._put_source(book, source)
+
+    def _put_source(self, book, source):
+        source = book_key(source) if source else None
+        signature = self.file_signature(source) if source else None
+        self.connection.execute("INSERT OR REPLACE INTO books (book, source, signature) VALUES (?, ?, ?)",
+                                (book_key(book), source, signature))
+
+    def _put_page(self, book, page, notes):
+        # Only the words are indexed, formatting runs are left out
+        notes = plain_text(notes)
+        row = self.connection.execute("SELECT id FROM pages WHERE book = ? AND page = ?", (book, page)).fetchone()
+        if row:
+            self.connection.execute("DELETE FROM notes_fts WHERE rowid = ?", row)
+            if not notes.strip():
+                self.connection.execute("DELETE FROM pages WHERE id = ?", row)
+                return
+            page_id = row[0]
+        elif not notes.strip():
+            return
+        else:
+            page_id = self.connection.execute("INSERT INTO pages (book, page) VALUES (?, ?)", (book, page)).lastrowid
+        self.connection.execute("INSERT INTO notes_fts (rowid, notes) VALUES (?, ?)", (page_id, notes))
+
+    def index_book(self, book, notes, source=None, signature=None):
+        """Replace everything indexed for a book with its notes dict"""
+        book = book_key(book)
+        source = book_key(source) if source else None
+        with self.connection:
+            rows = self.connection.execute("SELECT id FROM pages WHERE book = ?", (book,)).fetchall()
+            self.connection.executemany("DELETE FROM notes_fts WHERE rowid = ?", rows)
+            self.connection.execute("DELETE FROM pages WHERE book = ?", (book,))
+            for page, note in notes.items():
+                if plain_text(note).strip():
+                    self._put_page(book, int(page), note)
+            self.connection.execute(
+                "INSERT OR REPLACE INTO books (book, source, signature) VALUES (?, ?, ?)", (book, source, signature))
+
+    def index_notes_file(self, file_path):
+        """Index a notes file written by "Save Notes As", skipped when it hasn't changed since last time"""
+        signature = self.file_signature(file_path)
+        row = self.connection.execute("SELECT book FROM books WHERE source = ? AND signature = ?",
+                                      (book_key(file_path), signature)).fetchone()
+        if row:
+            return row[0]
+
+        with open(file_path, 'r') as f:
+            data = json.load(f)
+        book = data.get('book_path')
+        if not book:
+            raise ValueError("The notes file does not name its book")
+        notes = data.get('notes', {})
+        NotesJournal(file_path).replay(notes)
+        self.index_book(book, notes, file_path, signature)
+        return book_key(book)
+
+    @staticmethod
+    def file_signature(file_path):
+        parts = []
+        for path in (file_path, NotesJournal(file_path).path):
+            try:
+                stat = os.stat(path)
+                parts.append(f"{stat.st_mtime_ns}:{stat.st_size}")
+            except OSError:
+                parts.append("-")
+        return "|".join(parts)
+
+    def search(self, query, limit=100):
+        """(book, page, snippet, source) of the best matching pages"""
+        match = build_match_query(query)
+        if not match:
+            return []
+        return self.connection.execute("""
+            SELECT pages.book, pages.page, snippet(notes_fts, 0, '[', ']', '…', 12), books.source
+            FROM notes_fts
+            JOIN pages ON pages.id = notes_fts.rowid
+            LEFT JOIN books ON books.book = pages.book
+            WHERE notes_fts MATCH ?
+            ORDER BY rank
+            LIMIT ?""", (match, limit)).fetchall()
+
+    def close(self):
+        self.connection.close()
+
+
+class NotesSearchWindow:
+    """Window that searches all indexed notes as you type and opens the selected page"""
+
+    def __init__(self, root, index, on_open):
+        self.root = root
+        self.index = index
+        self.on_open = on_open
+        self.results = []
+        self.search_id = None
+
+        self.window = tk.Toplevel(root)
+        self.window.title("Search All Notes")
+        self.window.geometry("640x420")
+
+        top = ttk.Frame(self.window)
+        top.pack(fill=tk.X, padx=10, pady=10)
+        self.query_var = tk.StringVar()
+        entry = ttk.Entry(top, textvariable=self.query_var)
+        entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        entry.focus_set()
+        self.query_var.trace_add("write", lambda *args: self.schedule_search())
+        ttk.Button(top, text="Add Notes Files...", command=self.add_notes_files).pack(side=tk.RIGHT, padx=(10, 0))
+
+        ttk.Label(self.window, text='Words must all appear; "quoted words" match a phrase, word* a prefix',
+                  font=("Segoe UI", 9), foreground="#7f8c8d").pack(anchor="w", padx=10)
+
+        list_frame = ttk.Frame(self.window)
+        list_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        self.results_list = tk.Listbox(list_frame, font=("Segoe UI", 9))
+        scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=self.results_list.yview)
+        self.results_list.configure(yscrollcommand=scrollbar.set)
+        self.results_list.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.results_list.bind("<Double-Button-1>", lambda e: self.open_selected())
+        self.results_list.bind("<Return>", lambda e: self.open_selected())
+        entry.bind("<Return>", lambda e: self.open_selected(first=True))
+
+        self.status_label = ttk.Label(self.window, text="", font=("Segoe UI", 9))
+        self.status_label.pack(anchor="w", padx=10, pady=(0, 10))
+
+    def schedule_search(self):
+        if self.search_id:
+            self.root.after_cancel(self.search_id)
+        self.search_id = self.root.after(150, self.run_search)
+
+    def run_search(self):
+        self.search_id = None
+        start = time.perf_counter()
+        try:
+            self.results = self.index.search(self.query_var.get())
+        except sqlite3.OperationalError:
+            # Half-typed queries FTS5 can't parse yet
+            self.results = []
+        elapsed = (time.perf_counter() - start) * 1000
+
+        self.results_list.delete(0, tk.END)
+        for book, page, snippet, _ in self.results:
+            title = os.path.splitext(os.path.basename(book))[0]
+            self.results_list.insert(tk.END, f"{title}  p.{page + 1}:  {' '.join(snippet.split())}")
+        self.status_label.config(text=f"{len(self.results)} pages ({elapsed:.1f} ms)")
+
+    def open_selected(self, first=False):
+        selection = self.results_list.curselection()
+        if selection:
+            index = selection[0]
+        elif first and self.results:
+            index = 0
+        else:
+            return
+        book, page, _, source = self.results[index]
+        self.on_open(book, page, source)
+
+    def add_notes_files(self):
+        file_paths = filedialog.askopenfilenames(
+            parent=self.window,
+            title="Add Notes Files to the Index",
+            filetypes=[("JSON files", "*.json"), ("All files", "*.*")]
+        )
+        added = 0
+        for file_path in file_paths:
+            try:
+                self.index.index_notes_file(file_path)
+                added += 1
+            except (OSError, ValueError, sqlite3.Error):
+                pass
+        if file_paths:
+            self.status_label.config(text=f"Indexed {added} of {len(file_paths)} notes files")
+            if self.query_var.get():
+                self.run_search()
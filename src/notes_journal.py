@@ -0,0 +1,62 @@
+"""
+Append-only journal of note edits, kept next to a notes snapshot file
+"""
+
+import json
+import os
+
+
+class NotesJournal:
+    """Records each page whose notes changed so auto-save never rewrites the whole book"""
+
+    def __init__(self, notes_path, compact_after=200):
+        self.path = notes_path + ".journal"
+        self.compact_after = compact_after
+        self.entries = 0
+
+    def append(self, page, notes):
+        """Durably record the new notes of one page"""
+        line = json.dumps({'page': page, 'notes': notes}) + "\n"
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        self.entries += 1
+
+    def replay(self, notes):
+        """Apply journaled edits newer than the snapshot to its notes dict"""
+        self.entries = 0
+        if not os.path.exists(self.path):
+            return 0
+
+        good_end = 0
+        with open(self.path, 'rb+') as f:
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("unterminated line")
+                    entry = json.loads(line)
+                except ValueError:
+                    # A crash mid-append leaves at most one torn line at the end
+                    break
+                if entry['notes']:
+                    notes[entry['page']] = entry['notes']
+                else:
+                    notes.pop(entry['page'], None)
+                self.entries += 1
+                good_end += len(line)
+            # Cut the torn line off, or the next append would be glued onto it and lost too
+            if f.seek(0, os.SEEK_END) > good_end:
+                f.truncate(good_end)
+                f.flush()
+                os.fsync(f.fileno())
+        return self.entries
+
+    def needs_compaction(self):
+        return self.entries >= self.compact_after
+
+    def reset(self):
+        """Forget the journal once its edits are part of a new snapshot"""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.entries = 0
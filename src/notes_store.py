@@ -0,0 +1,211 @@
+"""
+Notes storage backends
+
+The JSON notes files written by "Save Notes As" hold a whole book in one
+dict, kept in a MemoryNotesStore while the file is open. The notes library
+keeps every book in one SQLite database instead, one row per book and page,
+so pages are read when they are shown rather than all up front. A page's
+formatting runs are kept as JSON next to its plain text.
+"""
+
+import json
+import os
+import sqlite3
+from abc import ABC, abstractmethod
+from collections.abc import MutableMapping
+from datetime import datetime
+
+from fileio import atomic_write_json
+from notes_journal import NotesJournal
+from rich_text import make_note, note_tags, plain_text
+
+LIBRARY_PATH = os.path.join("data", "notes.db")
+
+
+class NotesStore(ABC):
+    """Storage interface for the per-page notes of any number of books"""
+
+    @abstractmethod
+    def get_page(self, book, page):
+        """A page's notes, or None when it has none"""
+
+    @abstractmethod
+    def put_page(self, book, page, notes):
+        """Store a page's notes, empty notes remove the page"""
+
+    @abstractmethod
+    def book_pages(self, book):
+        """Pages of a book that have notes"""
+
+    def close(self):
+        pass
+
+
+class MemoryNotesStore(NotesStore):
+    """Notes held in a dict per book, for JSON notes files which are read and written whole"""
+
+    def __init__(self):
+        self.books = {}  # book -> {page: notes}
+
+    def get_page(self, book, page):
+        return self.books.get(book, {}).get(page)
+
+    def put_page(self, book, page, notes):
+        if notes:
+            self.books.setdefault(book, {})[page] = notes
+        else:
+            self.books.get(book, {}).pop(page, None)
+
+    def book_pages(self, book):
+        return list(self.books.get(book, {}))
+
+
+class SqliteNotesStore(NotesStore):
+    """Notes library in SQLite (WAL mode), one row per book and page"""
+
+    def __init__(self, db_path=LIBRARY_PATH):
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.connection = sqlite3.connect(db_path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS notes (
+                book TEXT NOT NULL,
+                page TEXT NOT NULL,
+                notes TEXT NOT NULL,
+                updated TEXT NOT NULL,
+                tags TEXT,
+                PRIMARY KEY (book, page)
+            ) WITHOUT ROWID""")
+        columns = [row[1] for row in self.connection.execute("PRAGMA table_info(notes)")]
+        if 'tags' not in columns:
+            # Libraries created before formatting was saved
+            self.connection.execute("ALTER TABLE notes ADD COLUMN tags TEXT")
+        self.connection.commit()
+
+    @staticmethod
+    def book_key(book):
+        return os.path.normcase(os.path.abspath(book))
+
+    @staticmethod
+    def to_row(note):
+        """(plain text, formatting runs as JSON or None) of a note"""
+        tags = note_tags(note)
+        return plain_text(note), json.dumps(tags, separators=(",", ":")) if tags else None
+
+    @staticmethod
+    def from_row(text, tags):
+        return make_note(text, json.loads(tags)) if tags else text
+
+    def get_page(self, book, page):
+        row = self.connection.execute("SELECT notes, tags FROM notes WHERE book = ? AND page = ?",
+                                      (self.book_key(book), page)).fetchone()
+        return self.from_row(*row) if row else None
+
+    def put_page(self, book, page, notes):
+        with self.connection:
+            if notes:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO notes (book, page, notes, tags, updated) VALUES (?, ?, ?, ?, ?)",
+                    (self.book_key(book), page, *self.to_row(notes), datetime.now().isoformat()))
+            else:
+                # Empty pages are not stored at all
+                self.connection.execute("DELETE FROM notes WHERE book = ? AND page = ?",
+                                        (self.book_key(book), page))
+
+    def book_pages(self, book):
+        rows = self.connection.execute("SELECT page FROM notes WHERE book = ?", (self.book_key(book),))
+        return [row[0] for row in rows]
+
+    def import_json(self, file_path):
+        """Copy a JSON notes file (and its journal) into the library, returns (book, pages imported)"""
+        with open(file_path, 'r') as f:
+            data = json.load(f)
+
+        book = data.get('book_path')
+        if not book:
+            raise ValueError("The notes file does not name its book")
+        notes = data.get('notes', {})
+        NotesJournal(file_path).replay(notes)
+
+        now = datetime.now().isoformat()
+        rows = [(self.book_key(book), str(page), *self.to_row(note), now) for page, note in notes.items() if note]
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO notes (book, page, notes, tags, updated) VALUES (?, ?, ?, ?, ?)", rows)
+        return book, len(rows)
+
+    def export_json(self, book, file_path, **metadata):
+        """Write a book's notes in the format "Save Notes As" uses"""
+        rows = self.connection.execute("SELECT page, notes, tags FROM notes WHERE book = ?", (self.book_key(book),))
+        data = {
+            'title': os.path.splitext(os.path.basename(book))[0],
+            'book_path': book,
+            'notes': {page: self.from_row(text, tags) for page, text, tags in rows},
+            'last_page': 0,
+            'last_saved': datetime.now().isoformat()
+        }
+        data.update(metadata)
+        atomic_write_json(file_path, data, indent=2)
+        return len(data['notes'])
+
+    def close(self):
+        self.connection.close()
+
+
+class PageNotes(MutableMapping):
+    """Dict-like view of one book's notes in a store, pages are fetched on first access"""
+
+    def __init__(self, store, book):
+        self.store = store
+        self.book = book
+        self._pages = set(store.book_pages(book))
+        self._loaded = {}
+
+    def __getitem__(self, page):
+        if page in self._loaded:
+            return self._loaded[page]
+        if page not in self._pages:
+            raise KeyError(page)
+        notes = self.store.get_page(self.book, page)
+        self._loaded[page] = notes
+        return notes
+
+    def __setitem__(self, page, notes):
+        self.store.put_page(self.book, page, notes)
+        if notes:
+            self._pages.add(page)
+            self._loaded[page] = notes
+        else:
+            # Empty notes are no notes, the page is gone rather than cached as ""
+            self._pages.discard(page)
+            self._loaded.pop(page, None)
+
+    def __delitem__(self, page):
+        if page not in self._pages:
+            raise KeyError(page)
+        self[page] = ""
+
+    def __contains__(self, page):
+        return page in self._pages
+
+    def __iter__(self):
+        return iter(list(self._pages))
+
+    def stream(self, pages):
+        """(page, notes) for each page read straight from the store, without keeping them loaded"""
+        for page in pages:
+            yield page, self._loaded[page] if page in self._loaded else self.store.get_page(self.book, page)
+
+    def __len__(self):
+        return len(self._pages)
+
+
+def memory_notes(book, notes=None):
+    """PageNotes of a book in a MemoryNotesStore of its own, starting from a {page: notes} dict"""
+    store = MemoryNotesStore()
+    store.books[book] = {page: note for page, note in (notes or {}).items() if note}
+    return PageNotes(store, book)
@@ -0,0 +1,75 @@
+"""
+Memory-bounded LRU cache of rendered pages
+"""
+
+from collections import OrderedDict
+
+
+class PageCache:
+    """Keeps recent renderings keyed by (page, zoom, tile), evicting by size in bytes"""
+
+    def __init__(self, budget_bytes):
+        self.budget_bytes = budget_bytes
+        self.used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    @staticmethod
+    def key(page_num, zoom, tile=None):
+        # Zoom steps accumulate float error, so compare them at percent precision
+        return (page_num, round(zoom, 2), tile)
+
+    def get(self, key):
+        result = self._entries.get(key)
+        if result is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return result
+
+    def peek(self, key):
+        """Look up an entry without counting it or refreshing its position"""
+        return self._entries.get(key)
+
+    def put(self, key, result):
+        size = len(result.ppm)
+        if key in self._entries:
+            self.used_bytes -= len(self._entries.pop(key).ppm)
+        if size > self.budget_bytes:
+            return
+
+        self._entries[key] = result
+        self.used_bytes += size
+        self._evict()
+
+    def set_budget(self, budget_bytes):
+        self.budget_bytes = budget_bytes
+        self._evict()
+
+    def clear(self):
+        self._entries.clear()
+        self.used_bytes = 0
+
+    def _evict(self):
+        while self.used_bytes > self.budget_bytes and self._entries:
+            _, result = self._entries.popitem(last=False)
+            self.used_bytes -= len(result.ppm)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': len(self._entries),
+            'used_bytes': self.used_bytes,
+            'budget_bytes': self.budget_bytes
+        }
@@ -0,0 +1,42 @@
+"""
+Stacked page layout for the continuous-scroll reading mode
+"""
+
+import bisect
+
+PAGE_GAP = 12
+
+
+class PageLayout:
+    """Positions of every page stacked vertically at one zoom level"""
+
+    def __init__(self, page_sizes, zoom, gap=PAGE_GAP):
+        self.zoom = zoom
+        self.gap = gap
+        self.sizes = [(int(width * zoom), int(height * zoom)) for width, height in page_sizes]
+
+        # Top edge of each page, so lookups by scroll position are a bisect
+        self.tops = []
+        y = gap
+        for _, height in self.sizes:
+            self.tops.append(y)
+            y += height + gap
+        self.height = y
+        self.width = max((width for width, _ in self.sizes), default=0) + 2 * gap
+
+    def page_at(self, y):
+        """The page covering (or just above) vertical position y"""
+        index = bisect.bisect_right(self.tops, y) - 1
+        return max(0, min(index, len(self.tops) - 1))
+
+    def pages_between(self, top, bottom):
+        if not self.tops:
+            return range(0)
+        return range(self.page_at(top), self.page_at(bottom) + 1)
+
+    def bounds(self, page_num):
+        """Canvas rectangle of a page, centred horizontally"""
+        width, height = self.sizes[page_num]
+        x = (self.width - width) // 2
+        y = self.tops[page_num]
+        return (x, y, x + width, y + height)
@@ -0,0 +1,91 @@
+"""
+Timing of the app's hot paths, kept in a ring buffer while recording is switched on
+
+Spans are (name, start, duration, track) with perf_counter times. Render workers
+time their own rasterizing and the UI records it on a separate track, so an
+exported Chrome trace (chrome://tracing, Perfetto) shows both side by side.
+"""
+
+import functools
+import json
+import os
+import time
+from collections import deque
+
+UI_TRACK = "ui"
+WORKER_TRACK = "render worker"
+
+
+class PerfRecorder:
+    """Ring buffer of timed spans, a single attribute check when recording is off"""
+
+    def __init__(self, capacity=4096):
+        self.enabled = False
+        self.spans = deque(maxlen=capacity)
+
+    def add(self, name, start, duration, track=UI_TRACK):
+        if self.enabled:
+            self.spans.append((name, start, duration, track))
+
+    def stats(self):
+        """name -> count, last, p50, p95 and p99 in milliseconds, for the spans in the buffer"""
+        durations = {}
+        for name, _, duration, _ in self.spans:
+            durations.setdefault(name, []).append(duration * 1000)
+
+        stats = {}
+        for name, values in durations.items():
+            ordered = sorted(values)
+            stats[name] = {
+                'count': len(values),
+                'last': values[-1],
+                'p50': ordered[int(0.50 * (len(ordered) - 1))],
+                'p95': ordered[int(0.95 * (len(ordered) - 1))],
+                'p99': ordered[int(0.99 * (len(ordered) - 1))],
+            }
+        return stats
+
+    def export_chrome_trace(self, file_path):
+        """Write the buffer in the Chrome trace event format"""
+        spans = list(self.spans)
+        origin = min((start for _, start, _, _ in spans), default=0.0)
+        tracks = {UI_TRACK: 1, WORKER_TRACK: 2}
+        pid = os.getpid()
+
+        events = [{'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': track}}
+                  for track, tid in tracks.items()]
+        for name, start, duration, track in spans:
+            events.append({
+                'name': name,
+                'ph': 'X',
+                'pid': pid,
+                'tid': tracks.get(track, 1),
+                'ts': round((start - origin) * 1e6, 1),
+                'dur': round(duration * 1e6, 1),
+            })
+
+        with open(file_path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+        return len(spans)
+
+    def clear(self):
+        self.spans.clear()
+
+
+recorder = PerfRecorder()
+
+
+def timed(name):
+    """Record each call of the decorated function as a span"""
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not recorder.enabled:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                recorder.add(name, start, time.perf_counter() - start)
+        return wrapper
+    return decorate
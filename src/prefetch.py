@@ -0,0 +1,127 @@
+"""
+Predictive prefetching of the pages around the one being read
+"""
+
+import time
+from collections import deque
+
+from page_cache import PageCache
+
+# (seconds between page turns, pages ahead, pages behind), fastest first
+PREFETCH_DEPTHS = [
+    (0.5, 8, 2),   # skimming with key-repeat
+    (3.0, 4, 1),   # reading steadily
+    (20.0, 2, 1),  # reading slowly
+]
+# Depth once the reader has settled on a page, e.g. while typing notes
+DWELL_DEPTH = (1, 0)
+
+
+class Prefetcher:
+    """Watches the reading direction and speed and renders the likely next pages when idle"""
+
+    def __init__(self, root, engine, cache, on_rendered, max_in_flight=2):
+        self.root = root
+        self.engine = engine
+        self.cache = cache
+        self.on_rendered = on_rendered
+        # Only a couple of renders are queued at once, the engine runs them behind the pages on screen
+        self.max_in_flight = max_in_flight
+
+        self._turns = deque(maxlen=6)  # (timestamp, page_num)
+        self._pending = {}  # cache key -> ticket
+        self._plan = []
+        self._zoom = 1.0
+        self._idle_id = None
+
+    def page_shown(self, page_num, total_pages, zoom, prefetch=True):
+        """Record a page turn and re-plan what to render next"""
+        now = time.monotonic()
+        if self._turns and abs(page_num - self._turns[-1][1]) > 1:
+            # A jump says nothing about the reading direction
+            self._turns.clear()
+        if not self._turns or self._turns[-1][1] != page_num:
+            # Re-showing the same page at another zoom is not a page turn
+            self._turns.append((now, page_num))
+
+        self._zoom = zoom
+        # Pages drawn as tiles are too large to render ahead whole
+        self._plan = self.plan(page_num, total_pages) if prefetch else []
+
+        # Drop queued prefetches that are no longer part of the plan. A prefetch of
+        # the page now on screen is kept, it is the fastest way to get that page.
+        wanted = {PageCache.key(p, zoom) for p in [page_num] + self._plan}
+        for key in list(self._pending):
+            if key not in wanted:
+                self.engine.cancel(self._pending.pop(key))
+        current = self._pending.get(PageCache.key(page_num, zoom))
+        if current is not None:
+            # Now the page on screen, it goes ahead of other background work
+            self.engine.promote(current)
+
+        self._schedule()
+
+    def direction(self):
+        if len(self._turns) < 2:
+            return 1
+        return 1 if self._turns[-1][1] >= self._turns[-2][1] else -1
+
+    def depth(self):
+        """Pages (ahead, behind) to prefetch given how fast the user is turning"""
+        if len(self._turns) < 2:
+            return PREFETCH_DEPTHS[1][1:]
+
+        intervals = [b[0] - a[0] for a, b in zip(self._turns, list(self._turns)[1:])]
+        average = sum(intervals) / len(intervals)
+        for limit, ahead, behind in PREFETCH_DEPTHS:
+            if average <= limit:
+                return ahead, behind
+        return DWELL_DEPTH
+
+    def plan(self, page_num, total_pages):
+        """Pages to prefetch around page_num, most likely first"""
+        ahead, behind = self.depth()
+        step = self.direction()
+
+        pages = []
+        for distance in range(1, max(ahead, behind) + 1):
+            for offset, limit in ((distance * step, ahead), (-distance * step, behind)):
+                target = page_num + offset
+                if distance <= limit and 0 <= target < total_pages:
+                    pages.append(target)
+        return pages
+
+    def is_pending(self, key):
+        return key in self._pending
+
+    def clear(self):
+        """Forget everything, e.g. when another book is opened"""
+        for ticket in self._pending.values():
+            self.engine.cancel(ticket)
+        self._pending.clear()
+        self._turns.clear()
+        self._plan = []
+
+    def _schedule(self):
+        if self._idle_id is None:
+            self._idle_id = self.root.after_idle(self._prefetch)
+
+    def _prefetch(self):
+        self._idle_id = None
+        for page_num in self._plan:
+            if len(self._pending) >= self.max_in_flight:
+                break
+            key = PageCache.key(page_num, self._zoom)
+            if key in self.cache or key in self._pending:
+                continue
+            self._pending[key] = self.engine.request(page_num, self._zoom,
+                                                     lambda result, k=key: self._done(k, result), background=True,
+                                                     error_callback=lambda e, k=key: self._failed(k))
+
+    def _done(self, key, result):
+        self._pending.pop(key, None)
+        self.on_rendered(result)
+        self._schedule()
+
+    def _failed(self, key):
+        self._pending.pop(key, None)
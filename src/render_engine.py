@@ -0,0 +1,282 @@
+"""
+Background page rendering for the PDF viewer
+
+PyMuPDF holds the GIL while it rasterizes, so a render thread would still
+freeze Tk. Pages are rendered in worker processes instead, each keeping its
+own fitz.Document handle, and the finished renderings are handed back to
+the Tk thread by polling with root.after.
+
+Renderings travel as binary PPM straight from MuPDF, which Tk's photo image
+reads natively, so displaying a page needs no intermediate PIL image.
+"""
+
+import itertools
+import multiprocessing
+import queue
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from fileio import book_fingerprint
+from search import SearchIndex
+from tiles import needs_tiling
+
+# Documents opened by the current worker process, keyed by file path
+_worker_docs = {}
+
+
+def _worker_document(file_path):
+    import fitz  # PyMuPDF, only the worker processes need it here
+    doc = _worker_docs.get(file_path)
+    if doc is None:
+        # Only one book is read at a time, so drop handles to older books
+        for old_doc in _worker_docs.values():
+            old_doc.close()
+        _worker_docs.clear()
+        doc = fitz.open(file_path)
+        _worker_docs[file_path] = doc
+    return doc
+
+
+def _warm_up():
+    """Runs once per worker so the first real render doesn't pay for the spawn or the PyMuPDF import"""
+    import fitz  # noqa: F401
+    return True
+
+
+def render_page(file_path, page_num, zoom, clip=None):
+    """Rasterize a page to RGB (runs inside a worker process)"""
+    import fitz
+    started = time.perf_counter()
+    page = _worker_document(file_path)[page_num]
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), clip=clip, alpha=False)
+    result = RenderResult(page_num, zoom, pix.width, pix.height, pix.tobytes("ppm"), pix.x, pix.y)
+    result.started = started
+    result.render_time = time.perf_counter() - started
+    return result
+
+
+class DocumentInfo:
+    """What the Tk thread knows of an open book, read in a worker so the PDF is never parsed on the Tk thread"""
+
+    def __init__(self, file_path, page_sizes, fingerprint):
+        self.file_path = file_path
+        self.page_sizes = page_sizes
+        self.fingerprint = fingerprint
+
+    def __len__(self):
+        return len(self.page_sizes)
+
+
+def read_document(file_path, page_num, zoom, tiled=True):
+    """DocumentInfo of a book plus a first rendering of page_num, if it fits whole (runs inside a worker process)"""
+    doc = _worker_document(file_path)
+    page_sizes = [(page.rect.width, page.rect.height) for page in doc]
+    first = None
+    if 0 <= page_num < len(page_sizes):
+        width, height = page_sizes[page_num]
+        if not (tiled and needs_tiling(int(width * zoom), int(height * zoom))):
+            first = render_page(file_path, page_num, zoom)
+    return DocumentInfo(file_path, page_sizes, book_fingerprint(file_path)), first
+
+
+def render_thumbnail(file_path, page_num, width):
+    """Rasterize a page to a small PNG (runs inside a worker process)"""
+    import fitz
+    page = _worker_document(file_path)[page_num]
+    zoom = width / page.rect.width
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+    return page_num, pix.tobytes("png")
+
+
+def extract_words(file_path, first, last):
+    """Words of pages first..last-1 as (x0, y0, x1, y1, text) in page space (runs inside a worker process)"""
+    import fitz
+    doc = _worker_document(file_path)
+    pages = []
+    for page_num in range(first, last):
+        page = doc[page_num]
+        words = page.get_text("words")
+        if page.rotation:
+            # Text comes out unrotated, the renderings are of the rotated page
+            rects = (fitz.Rect(word[:4]) * page.rotation_matrix for word in words)
+            pages.append((page_num, [(*rect, word[4]) for rect, word in zip(rects, words)]))
+        else:
+            pages.append((page_num, [word[:5] for word in words]))
+    return pages
+
+
+class RenderResult:
+    """A finished rendering of a page (or of a clip of it), as a binary PPM"""
+
+    def __init__(self, page_num, zoom, width, height, ppm, x=0, y=0):
+        self.page_num = page_num
+        self.zoom = zoom
+        self.width = width
+        self.height = height
+        self.ppm = ppm
+        # Position of a clipped rendering within the zoomed page
+        self.x = x
+        self.y = y
+        # When and for how long the worker rasterized it, in perf_counter seconds
+        self.started = 0.0
+        self.render_time = 0.0
+
+    @property
+    def samples(self):
+        """The raw RGB pixels, a view into the PPM rather than a copy"""
+        return memoryview(self.ppm)[len(self.ppm) - self.width * self.height * 3:]
+
+
+class RenderEngine:
+    """Renders pages off the Tk thread and drops results nobody is waiting for
+
+    Requests wait in queues here rather than in the executor, so the pages on
+    screen are handed to a worker first and background work (prefetches,
+    thumbnails, text extraction) never holds every worker at once.
+    """
+
+    def __init__(self, root, workers=2, poll_interval=15):
+        self.root = root
+        self.file_path = None
+        self.poll_interval = poll_interval
+        self.workers = workers
+
+        self._executor = ProcessPoolExecutor(max_workers=workers,
+                                             mp_context=multiprocessing.get_context("spawn"))
+        self._tickets = itertools.count()
+        # ticket -> [future or None while queued, callback, error_callback, background, (function, args)]
+        self._pending = {}
+        self._queued = {False: deque(), True: deque()}  # background -> tickets, oldest first
+        self._running = {}  # ticket -> background, for work handed to the executor
+        self._done = queue.Queue()
+        self._poll_id = None
+
+        for _ in range(workers):
+            self._executor.submit(_warm_up)
+
+    def set_document(self, file_path):
+        """Point the engine at a new book, forgetting renders of the old one"""
+        self.cancel_all()
+        self.file_path = file_path
+
+    def request(self, page_num, zoom, callback, clip=None, error_callback=None, background=False):
+        """Queue a render; callback(result) runs on the Tk thread when it is done"""
+        return self._submit(callback, error_callback, render_page, self.file_path, page_num, zoom, clip,
+                            background=background)
+
+    def request_document(self, file_path, page_num, zoom, callback, tiled=True, error_callback=None):
+        """Queue opening a book, not necessarily the current one; callback((DocumentInfo, rendering of page_num
+        or None)) runs on the Tk thread"""
+        return self._submit(callback, error_callback, read_document, file_path, page_num, zoom, tiled)
+
+    def request_thumbnail(self, page_num, width, callback, error_callback=None):
+        """Queue a thumbnail; callback((page_num, png_bytes)) runs on the Tk thread"""
+        return self._submit(callback, error_callback, render_thumbnail, self.file_path, page_num, width,
+                            background=True)
+
+    def request_text(self, first, last, callback, error_callback=None):
+        """Queue text extraction of a range of pages; callback([(page_num, words), ...]) runs on the Tk thread"""
+        return self._submit(callback, error_callback, extract_words, self.file_path, first, last, background=True)
+
+    def request_search_index(self, index_path, callback, error_callback=None):
+        """Queue reading a saved search index; callback(SearchIndex or None) runs on the Tk thread"""
+        return self._submit(callback, error_callback, SearchIndex.load, index_path, background=True)
+
+    def save_search_index(self, index, index_path):
+        """Write a search index from a worker. Unlike requests, it is not dropped when the book changes,
+        and a failure is ignored: the book stays searchable and its text is extracted again next time"""
+        self._submit(None, None, index.save, index_path, background=True)
+
+    def promote(self, ticket):
+        """Move queued background work to the front, e.g. a prefetch of the page that is now on screen"""
+        entry = self._pending.get(ticket)
+        if entry and entry[0] is None and entry[3]:
+            entry[3] = False
+            self._queued[False].append(ticket)
+            self._dispatch()
+
+    def _submit(self, callback, error_callback, function, *args, background=False):
+        ticket = next(self._tickets)
+        self._pending[ticket] = [None, callback, error_callback, background, (function, args)]
+        self._queued[background].append(ticket)
+        self._dispatch()
+        self._schedule_poll()
+        return ticket
+
+    def _dispatch(self):
+        """Hand queued work to idle workers, pages on screen first"""
+        while len(self._running) < self.workers:
+            ticket = self._next_queued()
+            if ticket is None:
+                break
+            entry = self._pending[ticket]
+            function, args = entry[4]
+            entry[4] = None
+            entry[0] = future = self._executor.submit(function, *args)
+            self._running[ticket] = entry[3]
+            # Runs on the executor's thread, so it only hands the future over
+            future.add_done_callback(lambda f, t=ticket: self._done.put((t, f)))
+
+    def _next_queued(self):
+        for background in (False, True):
+            # One worker is always left for the pages on screen
+            if background and sum(self._running.values()) >= max(1, self.workers - 1):
+                return None
+            queued = self._queued[background]
+            while queued:
+                ticket = queued.popleft()
+                entry = self._pending.get(ticket)
+                # Cancelled and promoted tickets are left behind in their old queue
+                if entry and entry[0] is None and entry[3] == background:
+                    return ticket
+        return None
+
+    def cancel(self, ticket):
+        entry = self._pending.pop(ticket, None)
+        if entry and entry[0]:
+            # Renders that already started still finish, their result is dropped
+            entry[0].cancel()
+
+    def cancel_all(self):
+        for ticket, entry in list(self._pending.items()):
+            # Fire-and-forget work such as saving an index outlives the book it belongs to
+            if entry[1] is not None:
+                self.cancel(ticket)
+
+    def _schedule_poll(self):
+        if self._poll_id is None:
+            self._poll_id = self.root.after(self.poll_interval, self._poll)
+
+    def _poll(self):
+        self._poll_id = None
+        while True:
+            try:
+                ticket, future = self._done.get_nowait()
+            except queue.Empty:
+                break
+
+            self._running.pop(ticket, None)
+            entry = self._pending.pop(ticket, None)
+            if entry is None or entry[1] is None or future.cancelled():
+                continue
+
+            _, callback, error_callback, _, _ = entry
+            try:
+                result = future.result()
+            except Exception as e:
+                if error_callback:
+                    error_callback(e)
+                continue
+            callback(result)
+
+        self._dispatch()
+        if self._pending or self._running:
+            self._schedule_poll()
+
+    def shutdown(self):
+        self.cancel_all()
+        if self._poll_id:
+            self.root.after_cancel(self._poll_id)
+            self._poll_id = None
+        self._executor.shutdown(wait=False, cancel_futures=True)
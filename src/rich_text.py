@@ -0,0 +1,116 @@
+"""
+Rich notes: a page's plain text plus its formatting tags as run-length spans
+
+A page without formatting is stored as a plain string, as it always was. A
+formatted page is stored as
+
+    {"text": "...", "tags": {"bold": [gap, length, gap, length, ...], ...}}
+
+where each gap counts characters since the end of the previous run of that tag
+(the first one since the start of the text). Offsets are turned into Text
+widget positions and back by Tk itself, so reading and writing a note costs
+Python time in proportion to its runs, never to its characters.
+"""
+
+# Tags applied by the formatting toolbar, the only ones saved with a note
+FORMAT_TAGS = ("bold", "italic", "underline", "heading1", "heading2", "heading3", "color", "highlight")
+
+
+def plain_text(note):
+    """The text of a note whether it is a plain string or a rich note"""
+    if isinstance(note, dict):
+        return note.get('text', "")
+    return note or ""
+
+
+def note_tags(note):
+    if isinstance(note, dict):
+        return note.get('tags', {})
+    return {}
+
+
+def make_note(text, tags):
+    """A plain string when there is no formatting, a rich note otherwise"""
+    tags = {tag: runs for tag, runs in tags.items() if runs}
+    if not text or not tags:
+        return text
+    return {'text': text, 'tags': tags}
+
+
+def encode_runs(ranges):
+    """[(start, end), ...] in order -> [gap, length, gap, length, ...]"""
+    runs = []
+    previous_end = 0
+    for start, end in ranges:
+        runs.append(start - previous_end)
+        runs.append(end - start)
+        previous_end = end
+    return runs
+
+
+def decode_runs(runs):
+    """[gap, length, ...] -> (start, end) pairs"""
+    end = 0
+    for index in range(0, len(runs) - 1, 2):
+        start = end + runs[index]
+        end = start + runs[index + 1]
+        yield start, end
+
+
+def chars_between(text_widget, start, end):
+    """Characters from one Text widget index to a later one, counted by Tk"""
+    count = text_widget.count(start, end, "chars")
+    if isinstance(count, tuple):
+        count = count[0]
+    return count or 0
+
+
+def read_widget(text_widget, tags=FORMAT_TAGS):
+    """The note in a Text widget, stripped of surrounding whitespace like plain notes always were"""
+    raw = text_widget.get("1.0", "end-1c")
+    text = raw.strip()
+    if not text:
+        return ""
+    # Whitespace is a single Tk char each, but the kept text is measured by Tk: it counts
+    # characters outside the BMP as two, as it does in the offsets of the tag ranges
+    lead = len(raw) - len(raw.lstrip())
+    length = chars_between(text_widget, "1.0", "end-1c") - lead - (len(raw) - len(raw.rstrip()))
+
+    spans = {}
+    for tag in tags:
+        indices = text_widget.tag_ranges(tag)
+        ranges = []
+        # Each boundary is counted from the previous one, so Tk walks the text once per tag
+        previous, offset = "1.0", 0
+        offsets = []
+        for index in indices:
+            offset += chars_between(text_widget, previous, index)
+            offsets.append(offset - lead)
+            previous = index
+        for position in range(0, len(offsets), 2):
+            # Runs over the stripped whitespace are clipped to the text that is kept
+            start = max(0, offsets[position])
+            end = min(length, offsets[position + 1])
+            if end > start:
+                ranges.append((start, end))
+        if ranges:
+            spans[tag] = encode_runs(ranges)
+    return make_note(text, spans)
+
+
+def tag_batches(note, batch_size=500):
+    """(tag, [start index, end index, ...]) as Tk "1.0 + N chars" indices, batch_size runs at a time"""
+    tags = note_tags(note)
+    if not tags:
+        return
+
+    for tag, runs in tags.items():
+        batch = []
+        for start, end in decode_runs(runs):
+            batch.append(f"1.0 + {start} chars")
+            batch.append(f"1.0 + {end} chars")
+            if len(batch) >= 2 * batch_size:
+                yield tag, batch
+                batch = []
+        if batch:
+            yield tag, batch
@@ -0,0 +1,208 @@
+"""
+Full-text search over a book through an inverted index built in the background
+
+Text is extracted by the render engine's worker processes a few pages at a
+time. The index maps each term to the pages and word positions it occurs at,
+and keeps every word's rectangle so hits can be outlined on the page. It is
+saved under data/search keyed by the book's fingerprint, so a book is only
+extracted once.
+"""
+
+import json
+import math
+import os
+import re
+from array import array
+
+from fileio import atomic_write, atomic_write_json, prune_cache_dir
+
+SEARCH_DIR = os.path.join("data", "search")
+INDEX_VERSION = 1
+MAX_INDEXED_BOOKS = 50
+
+TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+def index_path_for(fingerprint, cache_dir=SEARCH_DIR):
+    return os.path.join(cache_dir, fingerprint + ".json")
+
+
+class SearchHit:
+    """A page matching a query, with the word positions to outline"""
+
+    def __init__(self, page_num, score, positions):
+        self.page_num = page_num
+        self.score = score
+        self.positions = positions
+
+
+class SearchIndex:
+    """Inverted index of one book: term -> page -> word positions, plus word rectangles per page"""
+
+    def __init__(self, page_count):
+        self.page_count = page_count
+        # term -> {page: [positions]}, or the flat [page, positions, ...] list it is saved as
+        self.postings = {}
+        # Four floats (x0, y0, x1, y1) per word in page coordinates, page -> (start, word count)
+        self.rect_data = array('f')
+        self.rect_offsets = {}
+
+    @property
+    def indexed_pages(self):
+        return len(self.rect_offsets)
+
+    @property
+    def complete(self):
+        return self.indexed_pages >= self.page_count
+
+    def add_page(self, page_num, words):
+        """Index the (x0, y0, x1, y1, text) words of a page"""
+        self.rect_offsets[page_num] = (len(self.rect_data), len(words))
+        for position, (x0, y0, x1, y1, text) in enumerate(words):
+            self.rect_data.extend((x0, y0, x1, y1))
+            for term in tokenize(text):
+                self.term_pages(term, create=True).setdefault(page_num, []).append(position)
+
+    def term_pages(self, term, create=False):
+        pages = self.postings.get(term)
+        if pages is None:
+            if not create:
+                return None
+            pages = self.postings[term] = {}
+        elif isinstance(pages, list):
+            # Loaded indexes are only unpacked for the terms actually searched
+            pages = self.postings[term] = dict(zip(pages[::2], pages[1::2]))
+        return pages
+
+    def search(self, query, limit=200):
+        """Pages containing every term of the query, best matches first"""
+        terms = list(dict.fromkeys(tokenize(query)))
+        postings = [self.term_pages(term) for term in terms]
+        if not postings or any(pages is None for pages in postings):
+            return []
+
+        pages = set(min(postings, key=len))
+        for term_pages in postings:
+            pages.intersection_update(term_pages)
+
+        total = max(1, self.indexed_pages)
+        hits = []
+        for page_num in pages:
+            score = 0.0
+            positions = set()
+            for term_pages in postings:
+                term_positions = term_pages[page_num]
+                # tf-idf with a dampened term frequency
+                score += (1 + math.log(len(term_positions))) * math.log(1 + total / len(term_pages))
+                positions.update(term_positions)
+
+            if len(postings) > 1:
+                # The query's words next to each other, in order, count for more
+                following = [set(term_pages[page_num]) for term_pages in postings[1:]]
+                phrases = sum(1 for start in postings[0][page_num]
+                              if all(start + i + 1 in term_set for i, term_set in enumerate(following)))
+                score *= 1 + phrases
+
+            hits.append(SearchHit(page_num, score, sorted(positions)))
+
+        hits.sort(key=lambda hit: (-hit.score, hit.page_num))
+        return hits[:limit]
+
+    def hit_rects(self, hit):
+        """Page-space rectangles of a hit's words"""
+        start, count = self.rect_offsets.get(hit.page_num, (0, 0))
+        rects = []
+        for position in hit.positions:
+            if position < count:
+                i = start + 4 * position
+                rects.append(tuple(self.rect_data[i:i + 4]))
+        return rects
+
+    def save(self, index_path):
+        postings = {}
+        for term, pages in self.postings.items():
+            if isinstance(pages, dict):
+                pages = [item for page_num, positions in pages.items() for item in (page_num, positions)]
+            postings[term] = pages
+
+        # Rectangles first, an index file only ever refers to a complete rectangles file
+        atomic_write(index_path[:-len(".json")] + ".rects", self.rect_data.tobytes())
+        atomic_write_json(index_path, {
+            'version': INDEX_VERSION,
+            'page_count': self.page_count,
+            'rect_offsets': [[page_num, start, count] for page_num, (start, count) in self.rect_offsets.items()],
+            'postings': postings,
+        })
+        prune_cache_dir(os.path.dirname(index_path), MAX_INDEXED_BOOKS, ".json", ".rects")
+
+    @classmethod
+    def load(cls, index_path):
+        """The saved index, or None when there is no usable one"""
+        try:
+            with open(index_path, 'r') as f:
+                data = json.load(f)
+            with open(index_path[:-len(".json")] + ".rects", 'rb') as f:
+                rect_bytes = f.read()
+        except (OSError, ValueError):
+            return None
+        if data.get('version') != INDEX_VERSION:
+            return None
+
+        index = cls(data['page_count'])
+        index.postings = data['postings']
+        index.rect_data.frombytes(rect_bytes)
+        index.rect_offsets = {page_num: (start, count) for page_num, start, count in data['rect_offsets']}
+        # Mark the index as recently used for pruning
+        os.utime(index_path)
+        return index
+
+
+class SearchIndexer:
+    """Fills a SearchIndex from text the render engine extracts a chunk of pages at a time"""
+
+    def __init__(self, engine, index, index_path, on_progress, on_done, on_error, chunk_pages=25):
+        self.engine = engine
+        self.index = index
+        self.index_path = index_path
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.on_error = on_error
+        self.chunk_pages = chunk_pages
+        self.next_page = 0
+        self.ticket = None
+
+    def start(self):
+        self.request_chunk()
+
+    def request_chunk(self):
+        # One chunk at a time leaves the other workers free for page renders
+        last = min(self.next_page + self.chunk_pages, self.index.page_count)
+        self.ticket = self.engine.request_text(self.next_page, last, self.on_chunk, self.on_chunk_error)
+        self.next_page = last
+
+    def on_chunk(self, pages):
+        for page_num, words in pages:
+            self.index.add_page(page_num, words)
+        self.on_progress(self.next_page, self.index.page_count)
+
+        if self.next_page < self.index.page_count:
+            self.request_chunk()
+            return
+
+        self.ticket = None
+        # Encoding and writing a large index would stall the Tk thread, a worker does it
+        self.engine.save_search_index(self.index, self.index_path)
+        self.on_done()
+
+    def on_chunk_error(self, error):
+        self.ticket = None
+        self.on_error(error)
+
+    def cancel(self):
+        if self.ticket is not None:
+            self.engine.cancel(self.ticket)
+            self.ticket = None
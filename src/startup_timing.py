@@ -0,0 +1,59 @@
+"""
+Cold-start timing: imports, window construction and the first rendered page
+
+Stages are marked in milliseconds since main.py started running. The report
+is printed and kept in data/startup_timing.json so regressions can be
+compared between builds.
+"""
+
+import os
+import sys
+import time
+from datetime import datetime
+
+REPORT_PATH = os.path.join("data", "startup_timing.json")
+
+_marks = {}
+_reported = False
+# Set when a book is being opened at startup, the report then waits for its first page
+expect_page = False
+
+
+def mark(stage):
+    """Record when a startup stage finished, later marks of the same stage are ignored"""
+    _marks.setdefault(stage, time.perf_counter())
+
+
+def window_shown():
+    mark("window_shown")
+    if not expect_page:
+        report()
+
+
+def page_shown():
+    if not _reported:
+        mark("first_page")
+        report()
+
+
+def report():
+    global _reported
+    if _reported or "start" not in _marks:
+        return
+    _reported = True
+
+    start = _marks["start"]
+    timings = {stage: round((at - start) * 1000, 1)
+               for stage, at in sorted(_marks.items(), key=lambda item: item[1]) if stage != "start"}
+    print("Startup timing (ms): " + ", ".join(f"{stage} {ms:.0f}" for stage, ms in timings.items()))
+
+    # Imported here so measuring startup doesn't add to it
+    from fileio import atomic_write_json
+    try:
+        atomic_write_json(REPORT_PATH, {
+            'timings_ms': timings,
+            'frozen': getattr(sys, 'frozen', False),
+            'recorded': datetime.now().isoformat()
+        }, indent=2)
+    except OSError:
+        pass
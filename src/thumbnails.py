@@ -0,0 +1,257 @@
+"""
+Page thumbnail sidebar backed by a persistent on-disk cache
+"""
+
+import json
+import os
+import tkinter as tk
+from tkinter import ttk
+
+from fileio import atomic_write_json, prune_cache_dir
+
+THUMBNAIL_DIR = os.path.join("data", "thumbnails")
+THUMB_WIDTH = 100
+ROW_HEIGHT = 150
+# Books whose thumbnails are kept on disk, least recently opened are removed first
+MAX_CACHED_BOOKS = 50
+
+
+class ThumbnailStore:
+    """PNG thumbnails of one book, appended to a single pack file with a JSON offset index"""
+
+    def __init__(self, fingerprint, cache_dir=THUMBNAIL_DIR):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self.pack_path = os.path.join(cache_dir, fingerprint + ".pack")
+        self.index_path = os.path.join(cache_dir, fingerprint + ".json")
+        self.index = {}
+        self.index_dirty = False
+
+        try:
+            with open(self.index_path, 'r') as f:
+                self.index = json.load(f)
+        except (OSError, ValueError):
+            # Without an index the pack can't be read, start it over
+            self.index = {}
+            if os.path.exists(self.pack_path):
+                os.remove(self.pack_path)
+
+        self.pack = open(self.pack_path, 'a+b')
+        # A crash can leave the index pointing past what reached the pack, those pages are rendered again
+        pack_size = os.fstat(self.pack.fileno()).st_size
+        valid = {page: entry for page, entry in self.index.items() if entry[0] + entry[1] <= pack_size}
+        if len(valid) < len(self.index):
+            self.index = valid
+            self.index_dirty = True
+        self.prune()
+
+    def __contains__(self, page_num):
+        return str(page_num) in self.index
+
+    def get(self, page_num):
+        entry = self.index.get(str(page_num))
+        if entry is None:
+            return None
+        offset, length = entry
+        self.pack.seek(offset)
+        return self.pack.read(length)
+
+    def add(self, page_num, png):
+        self.pack.seek(0, os.SEEK_END)
+        offset = self.pack.tell()
+        self.pack.write(png)
+        self.index[str(page_num)] = [offset, len(png)]
+        self.index_dirty = True
+
+    def save_index(self):
+        if self.index_dirty:
+            # The pack must be on disk before an index that refers to it
+            self.pack.flush()
+            os.fsync(self.pack.fileno())
+            atomic_write_json(self.index_path, self.index)
+            self.index_dirty = False
+
+    def close(self):
+        self.save_index()
+        self.pack.close()
+
+    def prune(self):
+        """Drop the thumbnails of the least recently opened books beyond the limit"""
+        # Touch our own index so it counts as recently used
+        if os.path.exists(self.index_path):
+            os.utime(self.index_path)
+
+        prune_cache_dir(self.cache_dir, MAX_CACHED_BOOKS, ".json", ".pack")
+
+
+class ThumbnailStrip:
+    """Virtualized column of page thumbnails, only rows in view get canvas items"""
+
+    def __init__(self, parent, root, engine, on_select, max_in_flight=2):
+        self.root = root
+        self.engine = engine
+        self.on_select = on_select
+        # Kept low so thumbnails never hold up the page being read
+        self.max_in_flight = max_in_flight
+
+        self.frame = ttk.Frame(parent)
+        self.canvas = tk.Canvas(self.frame, width=THUMB_WIDTH + 24, bg="#ecf0f1", highlightthickness=0)
+        scrollbar = ttk.Scrollbar(self.frame, orient=tk.VERTICAL, command=self.canvas.yview)
+        self.canvas.configure(yscrollcommand=lambda first, last: (scrollbar.set(first, last),
+                                                                   self.schedule_update()))
+        self.canvas.pack(side=tk.LEFT, fill=tk.Y)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.canvas.bind("<Configure>", lambda e: self.schedule_update())
+        self.canvas.bind("<Button-1>", self.on_click)
+        self.canvas.bind("<MouseWheel>", lambda e: self.canvas.yview_scroll(int(-e.delta / 120) * 3, "units"))
+        self.canvas.bind("<Button-4>", lambda e: self.canvas.yview_scroll(-3, "units"))
+        self.canvas.bind("<Button-5>", lambda e: self.canvas.yview_scroll(3, "units"))
+
+        self.store = None
+        self.page_sizes = []
+        self.current_page = 0
+        self.rows = {}  # page -> (image item, label item, photo)
+        self.free_rows = []
+        self.pending = {}  # page -> ticket
+        # Pages whose thumbnail could not be rendered, not asked for again until the book is reopened
+        self.failed = set()
+        self.update_id = None
+        self.save_id = None
+        self.current_marker = self.canvas.create_rectangle(0, 0, 0, 0, outline="#3498db", width=3,
+                                                           state="hidden")
+
+    def set_document(self, fingerprint, page_sizes):
+        self.close()
+        self.failed.clear()
+        for page_num in list(self.rows):
+            self.release_row(page_num)
+
+        self.store = ThumbnailStore(fingerprint)
+        self.page_sizes = page_sizes
+        self.canvas.config(scrollregion=(0, 0, THUMB_WIDTH + 24, len(page_sizes) * ROW_HEIGHT))
+        self.canvas.yview_moveto(0)
+        self.schedule_update()
+
+    def set_current(self, page_num):
+        """Mark the page being read and keep it in view"""
+        self.current_page = page_num
+        top = page_num * ROW_HEIGHT
+        self.canvas.coords(self.current_marker, 6, top + 4, THUMB_WIDTH + 18, top + ROW_HEIGHT - 4)
+        self.canvas.itemconfig(self.current_marker, state="normal")
+
+        view_top = self.canvas.canvasy(0)
+        view_bottom = view_top + self.canvas.winfo_height()
+        total = max(1, len(self.page_sizes) * ROW_HEIGHT)
+        if top < view_top or top + ROW_HEIGHT > view_bottom:
+            self.canvas.yview_moveto(max(0, top - ROW_HEIGHT) / total)
+
+    def schedule_update(self):
+        if self.store and self.update_id is None:
+            self.update_id = self.root.after_idle(self.update_rows)
+
+    def update_rows(self):
+        """Materialize the rows in view and recycle the rest"""
+        self.update_id = None
+        if not self.store:
+            return
+
+        top = self.canvas.canvasy(0)
+        first = max(0, int(top // ROW_HEIGHT) - 1)
+        last = min(len(self.page_sizes) - 1, int((top + self.canvas.winfo_height()) // ROW_HEIGHT) + 1)
+        visible = range(first, last + 1)
+
+        for page_num in list(self.rows):
+            if page_num not in visible:
+                self.release_row(page_num)
+        for page_num in list(self.pending):
+            if page_num not in visible:
+                self.engine.cancel(self.pending.pop(page_num))
+
+        for page_num in visible:
+            if page_num not in self.rows:
+                self.create_row(page_num)
+
+        # Thumbnails not on disk yet are rendered a few at a time, nearest first
+        for page_num in visible:
+            if len(self.pending) >= self.max_in_flight:
+                break
+            if (self.rows[page_num][2] is None and page_num not in self.pending and page_num not in self.store
+                    and page_num not in self.failed):
+                self.pending[page_num] = self.engine.request_thumbnail(
+                    page_num, THUMB_WIDTH, self.on_thumbnail_rendered,
+                    error_callback=lambda error, page_num=page_num: self.on_thumbnail_failed(page_num))
+
+    def create_row(self, page_num):
+        top = page_num * ROW_HEIGHT
+        if self.free_rows:
+            image, label = self.free_rows.pop()
+            self.canvas.coords(image, 12 + THUMB_WIDTH // 2, top + 8)
+            self.canvas.coords(label, 12 + THUMB_WIDTH // 2, top + ROW_HEIGHT - 10)
+            self.canvas.itemconfig(label, text=str(page_num + 1), state="normal")
+        else:
+            image = self.canvas.create_image(12 + THUMB_WIDTH // 2, top + 8, anchor=tk.N)
+            label = self.canvas.create_text(12 + THUMB_WIDTH // 2, top + ROW_HEIGHT - 10,
+                                            text=str(page_num + 1), font=("Segoe UI", 8), fill="#7f8c8d")
+
+        photo = None
+        png = self.store.get(page_num)
+        if png:
+            photo = tk.PhotoImage(data=png)
+            self.canvas.itemconfig(image, image=photo, state="normal")
+        self.rows[page_num] = (image, label, photo)
+
+    def release_row(self, page_num):
+        image, label, _ = self.rows.pop(page_num)
+        self.canvas.itemconfig(image, image="", state="hidden")
+        self.canvas.itemconfig(label, state="hidden")
+        self.free_rows.append((image, label))
+
+    def on_thumbnail_rendered(self, thumbnail):
+        page_num, png = thumbnail
+        self.pending.pop(page_num, None)
+        self.store.add(page_num, png)
+        self.schedule_save()
+
+        if page_num in self.rows:
+            image, label, _ = self.rows[page_num]
+            photo = tk.PhotoImage(data=png)
+            self.canvas.itemconfig(image, image=photo, state="normal")
+            self.rows[page_num] = (image, label, photo)
+        self.schedule_update()
+
+    def on_thumbnail_failed(self, page_num):
+        """A damaged page or a crashed worker, the row stays blank and its slot goes to the next page"""
+        self.pending.pop(page_num, None)
+        self.failed.add(page_num)
+        self.schedule_update()
+
+    def schedule_save(self):
+        # The index is rewritten at most every few seconds while thumbnails stream in
+        if self.save_id is None:
+            self.save_id = self.root.after(3000, self.save_index)
+
+    def save_index(self):
+        self.save_id = None
+        if self.store:
+            self.store.save_index()
+
+    def on_click(self, event):
+        page_num = int(self.canvas.canvasy(event.y) // ROW_HEIGHT)
+        if 0 <= page_num < len(self.page_sizes):
+            self.on_select(page_num)
+
+    def set_dark_mode(self, dark_mode):
+        self.canvas.config(bg="#34495e" if dark_mode else "#ecf0f1")
+
+    def close(self):
+        for ticket in self.pending.values():
+            self.engine.cancel(ticket)
+        self.pending.clear()
+        if self.save_id:
+            self.root.after_cancel(self.save_id)
+            self.save_id = None
+        if self.store:
+            self.store.close()
+            self.store = None
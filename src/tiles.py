@@ -0,0 +1,39 @@
+"""
+Tile geometry for viewport-only rendering of large pages
+"""
+
+import math
+
+TILE_SIZE = 512
+# Full-page renders larger than this (RGB bytes) are drawn as tiles instead
+TILED_MIN_BYTES = 8 * 1024 * 1024
+
+
+def needs_tiling(width, height):
+    """Whether a page rendered at this pixel size should be tiled"""
+    return width * height * 3 > TILED_MIN_BYTES
+
+
+def visible_tiles(view, page_width, page_height, tile_size=TILE_SIZE, margin=1):
+    """Tiles (col, row) intersecting the view rectangle plus a margin, nearest the centre first"""
+    x0, y0, x1, y1 = view
+    cols = math.ceil(page_width / tile_size)
+    rows = math.ceil(page_height / tile_size)
+
+    first_col = max(0, int(x0 // tile_size) - margin)
+    last_col = min(cols - 1, int(max(x0, x1 - 1) // tile_size) + margin)
+    first_row = max(0, int(y0 // tile_size) - margin)
+    last_row = min(rows - 1, int(max(y0, y1 - 1) // tile_size) + margin)
+
+    centre_x = (x0 + x1) / 2
+    centre_y = (y0 + y1) / 2
+    tiles = [(col, row) for row in range(first_row, last_row + 1) for col in range(first_col, last_col + 1)]
+    tiles.sort(key=lambda t: ((t[0] + 0.5) * tile_size - centre_x) ** 2 + ((t[1] + 0.5) * tile_size - centre_y) ** 2)
+    return tiles
+
+
+def tile_clip(tile, zoom, tile_size=TILE_SIZE):
+    """The page-space rectangle covered by a tile at the given zoom"""
+    col, row = tile
+    scale = tile_size / zoom
+    return (col * scale, row * scale, (col + 1) * scale, (row + 1) * scale)
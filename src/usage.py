@@ -0,0 +1,104 @@
+"""
+Reading and note-taking usage, collected in memory and written to data/ in batches
+"""
+
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+from fileio import atomic_write_json
+
+USAGE_PATH = os.path.join("data", "usage_data.json")
+EVENTS_PATH = os.path.join("data", "usage_events.jsonl")
+
+
+class UsageTracker:
+    """Daily activity counts for the calendar plus a log of page visits (book, page, duration)"""
+
+    def __init__(self, root, flush_interval=30000, usage_path=USAGE_PATH, events_path=EVENTS_PATH):
+        self.root = root
+        self.flush_interval = flush_interval
+        self.usage_path = usage_path
+        self.events_path = events_path
+        os.makedirs(os.path.dirname(events_path) or ".", exist_ok=True)
+
+        # date -> count, the format usage_data.json has always had
+        self.counts = self.load_counts()
+        self.dirty = False
+        self.events = []
+        self.flush_id = None
+
+        self.visit = None  # [book, page, started at, start monotonic, keystrokes]
+        self.today = None
+        self.day_ends = 0
+        self.update_today()
+
+    def load_counts(self):
+        try:
+            with open(self.usage_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def update_today(self):
+        now = datetime.now()
+        self.today = now.strftime("%Y-%m-%d")
+        midnight = now.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+        self.day_ends = time.time() + (midnight - now).total_seconds()
+
+    def record(self):
+        """Count one unit of activity for today, no I/O"""
+        if time.time() >= self.day_ends:
+            self.update_today()
+        self.counts[self.today] = self.counts.get(self.today, 0) + 1
+        self.dirty = True
+        self.schedule_flush()
+
+    def keystroke(self):
+        self.record()
+        if self.visit:
+            self.visit[4] += 1
+
+    def page_viewed(self, book, page):
+        """Close the current page visit and start timing a new one"""
+        if self.visit and self.visit[0] == book and self.visit[1] == page:
+            return
+        self.end_visit()
+        self.visit = [book, page, datetime.now().isoformat(timespec="seconds"), time.monotonic(), 0]
+
+    def end_visit(self):
+        if not self.visit:
+            return
+        book, page, started, start, keystrokes = self.visit
+        self.events.append({'book': book, 'page': page, 'start': started,
+                            'duration': round(time.monotonic() - start, 1), 'keystrokes': keystrokes})
+        self.visit = None
+        self.schedule_flush()
+
+    def schedule_flush(self):
+        if self.flush_id is None:
+            self.flush_id = self.root.after(self.flush_interval, self.flush)
+
+    def flush(self):
+        """Write pending counts and events, called on a timer, on view changes and on exit"""
+        if self.flush_id is not None:
+            self.root.after_cancel(self.flush_id)
+            self.flush_id = None
+
+        try:
+            if self.dirty:
+                atomic_write_json(self.usage_path, self.counts, indent=2)
+                self.dirty = False
+            if self.events:
+                # One append per batch, a crash can tear at most the last line
+                lines = "".join(json.dumps(event) + "\n" for event in self.events)
+                with open(self.events_path, 'a', encoding='utf-8') as f:
+                    f.write(lines)
+                self.events = []
+        except OSError:
+            pass
+
+    def close(self):
+        self.end_visit()
+        self.flush()